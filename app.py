@@ -1,25 +1,85 @@
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, File, UploadFile, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from starlette.responses import HTMLResponse, RedirectResponse, JSONResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel
 from uvicorn import run as app_run
 import asyncio
 import logging
-from typing import Optional
-from queue import Queue
+from typing import Optional, List
 import threading
 import json
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import pandas as pd
 
 # Importing constants and pipeline modules from the project
-from src.constants import APP_HOST, APP_PORT
-from src.pipline.prediction_pipeline import VehicleData, VehicleDataClassifier
+from src.constants import (APP_HOST, APP_PORT, PREDICTION_INPUT_COLUMNS, PREDICTION_BATCH_MAX_RECORDS,
+                           PREDICT_EXECUTOR_MAX_WORKERS, PREDICT_LATENCY_BUDGET_P50_MS,
+                           PREDICT_LATENCY_BUDGET_P99_MS, PREDICT_LATENCY_WINDOW)
+from src.pipline.prediction_pipeline import VehicleData, VehicleDataBatch, VehicleDataClassifier, get_risk_levels
 from src.pipline.training_pipeline import TrainingPipeline
 from src.logger import logging as custom_logger
+from src.logger.log_stream import AsyncLogChannel, format_sse, get_log_stream_router, bind_log_stream
+from src.utils.latency_tracker import LatencyTracker
+from src.configuration.aws_connection import s3client
+from src.configuration.mongo_db_connection import mongoDB_connection
+
+# Startup warmup state reported by /healthz and /readyz
+app_state = {"ready": False, "warmup": None, "warmup_error": None, "started_at": None}
+
+
+def warm_up() -> dict:
+    """
+    Creates the S3 and Mongo clients, loads the model and runs a dummy prediction.
+    The model is required for readiness; Mongo is only used by training so a failure there is just logged.
+    """
+    start = time.perf_counter()
+    s3client()
+    try:
+        mongoDB_connection()
+    except Exception as e:
+        custom_logger.warning(f"mongo client not created during warmup: {e}")
+    warmup = VehicleDataClassifier().warm_up()
+    warmup["total_time"] = time.perf_counter() - start
+    return warmup
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Warms the model before the server starts accepting requests, so cold start latency
+    never reaches a customer. If warmup fails the app still starts but /readyz stays 503
+    (the model is then loaded lazily by the first request).
+    """
+    app_state["started_at"] = time.time()
+    try:
+        app_state["warmup"] = await run_in_threadpool(warm_up)
+        app_state["ready"] = True
+    except Exception as e:
+        app_state["warmup_error"] = str(e)
+        custom_logger.error(f"startup warmup failed, not ready: {e}")
+    yield
+    predict_executor.shutdown(wait=False)
+
+
+def model_status() -> dict:
+    model_registry = VehicleDataClassifier().model_registry
+    return {
+        "model_loaded": model_registry.is_loaded,
+        "model_version": model_registry.model_version,
+        "model_load_time": model_registry.load_time,
+        "model_loaded_at": model_registry.loaded_at,
+    }
+
 
 # Initialize FastAPI application
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Mount the 'static' directory for serving static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -38,19 +98,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Log lines shown in the SSE streams, each stream only gets the records of its own worker
+sse_log_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s', datefmt='%H:%M:%S')
+log_stream_router = get_log_stream_router()
 
-class QueueHandler(logging.Handler):
-    """
-    Custom logging handler that puts log records into a queue.
-    This allows real-time log streaming to the frontend.
-    """
-    def __init__(self, log_queue):
-        super().__init__()
-        self.log_queue = log_queue
-
-    def emit(self, record):
-        log_entry = self.format(record)
-        self.log_queue.put(log_entry)
+# Bounded pool for /predict and its latency budget tracker
+predict_executor = ThreadPoolExecutor(max_workers=PREDICT_EXECUTOR_MAX_WORKERS, thread_name_prefix="predict")
+predict_latency = LatencyTracker(p50_budget_ms=PREDICT_LATENCY_BUDGET_P50_MS,
+                                 p99_budget_ms=PREDICT_LATENCY_BUDGET_P99_MS,
+                                 window=PREDICT_LATENCY_WINDOW)
 
 
 class DataForm:
@@ -89,6 +145,58 @@ class DataForm:
         self.Vehicle_Damage_Yes = int(form.get("Vehicle_Damage_Yes"))
 
 
+class VehicleRecord(BaseModel):
+    """
+    One applicant, typed the same way as the /predict-stream query parameters.
+    """
+    Gender: int
+    Age: int
+    Driving_License: int
+    Region_Code: float
+    Previously_Insured: int
+    Annual_Premium: float
+    Policy_Sales_Channel: float
+    Vintage: int
+    Vehicle_Age_lt_1_Year: int
+    Vehicle_Age_gt_2_Years: int
+    Vehicle_Damage_Yes: int
+
+
+class BatchPredictionRequest(BaseModel):
+    """
+    JSON body of /predict-batch.
+    """
+    records: List[VehicleRecord]
+
+
+class PredictionResponse(BaseModel):
+    """
+    Response of /predict.
+    """
+    prediction: int
+    risk_level: str
+
+
+def score_record(record: VehicleRecord) -> dict:
+    """
+    Scores one applicant straight from the typed body (raw numpy row, no DataFrame).
+    """
+    vehicle_data = VehicleData(**record.model_dump())
+    model_predictor = VehicleDataClassifier()
+    predictions = model_predictor.predict(dataframe=vehicle_data.get_vehicle_input_array())
+    risk_levels = get_risk_levels(predictions, [record.Previously_Insured], [record.Vehicle_Damage_Yes])
+    return {"prediction": int(predictions[0]), "risk_level": risk_levels[0]}
+
+
+def score_batch(vehicle_df: pd.DataFrame) -> dict:
+    """
+    Scores a columnar frame in a single transform + predict pass.
+    """
+    model_predictor = VehicleDataClassifier()
+    predictions, risk_levels = model_predictor.predict_with_risk(dataframe=vehicle_df)
+    return {"count": len(predictions), "predictions": predictions, "risk_levels": risk_levels}
+
+
 # Route to render the main page
 @app.get("/", tags=["authentication"])
 async def index(request: Request):
@@ -99,65 +207,74 @@ async def index(request: Request):
             "vehicledata.html",{"request": request})
 
 
+# Liveness probe
+@app.get("/healthz")
+async def healthz():
+    """
+    The process is up and serving; reports the loaded model version and its load time.
+    """
+    return {"status": "ok", "ready": app_state["ready"], **model_status()}
+
+
+# Readiness probe
+@app.get("/readyz")
+async def readyz():
+    """
+    200 once the model is loaded (by the startup warmup, or lazily if warmup failed), 503 before that.
+    """
+    status = model_status()
+    ready = status["model_loaded"]
+    body = {"status": "ready" if ready else "not ready", **status,
+            "warmup": app_state["warmup"], "warmup_error": app_state["warmup_error"]}
+    return JSONResponse(status_code=200 if ready else 503, content=body)
+
+
 # SSE endpoint for training with real-time logs
 @app.get("/train-stream")
 async def train_stream():
     """
     Endpoint to stream training logs in real-time using Server-Sent Events.
+    Stage profiles are sent as named "stage_profile" events carrying json.
     """
     async def event_generator():
-        log_queue = Queue()
-        queue_handler = QueueHandler(log_queue)
-        
-        formatter = logging.Formatter(
-            '%(asctime)s - %(levelname)s - %(message)s',
-            datefmt='%H:%M:%S'
-        )
-        queue_handler.setFormatter(formatter)
-        
-        logger = logging.getLogger()
-        original_level = logger.level
-        logger.setLevel(logging.INFO)
-        logger.addHandler(queue_handler)
-        
+        log_channel = AsyncLogChannel(loop=asyncio.get_running_loop())
+        log_channel.setFormatter(sse_log_formatter)
+        stream_id = log_stream_router.register(log_channel)
+
+        status = {"error": None}
+
         try:
             yield f"data: 🚀 Initializing training pipeline...\n\n"
-            await asyncio.sleep(0.1)
-            
+
             def run_training():
                 try:
                     train_pipeline = TrainingPipeline()
+                    # wall / cpu time, peak memory and rows of every stage as it starts and ends
+                    train_pipeline.profiler.subscribe(
+                        lambda record: log_channel.put_event("stage_profile", json.dumps(record, default=str)))
                     train_pipeline.run_pipeline()
-                    log_queue.put("TRAINING_COMPLETE")
                 except Exception as e:
-                    log_queue.put(f"ERROR: {str(e)}")
-                    log_queue.put("TRAINING_COMPLETE")
-            
-            training_thread = threading.Thread(target=run_training)
+                    status["error"] = str(e)
+                    log_channel.put(f"ERROR: {str(e)}")
+                finally:
+                    log_channel.finish()
+
+            training_thread = threading.Thread(target=bind_log_stream(stream_id, run_training), daemon=True)
             training_thread.start()
-            
-            while True:
-                if not log_queue.empty():
-                    log_message = log_queue.get()
-                    
-                    if log_message == "TRAINING_COMPLETE":
-                        yield f"data: ✓ Training pipeline completed successfully!\n\n"
-                        yield f"data: DONE\n\n"
-                        break
-                    
-                    yield f"data: {log_message}\n\n"
-                else:
-                    await asyncio.sleep(0.1)
-            
-            training_thread.join(timeout=1)
-            
+
+            async for messages in log_channel.batches():
+                yield format_sse(messages)
+
+            if status["error"] is None:
+                yield f"data: ✓ Training pipeline completed successfully!\n\n"
+            yield f"data: DONE\n\n"
+
         except Exception as e:
             yield f"data: ❌ ERROR: {str(e)}\n\n"
             yield f"data: DONE\n\n"
         finally:
-            logger.removeHandler(queue_handler)
-            logger.setLevel(original_level)
-    
+            log_stream_router.unregister(stream_id)
+
     return StreamingResponse(
         event_generator(), 
         media_type="text/event-stream",
@@ -187,26 +304,15 @@ async def predict_stream(
     Endpoint to stream prediction logs in real-time using Server-Sent Events.
     """
     async def event_generator():
-        log_queue = Queue()
-        queue_handler = QueueHandler(log_queue)
-        
-        formatter = logging.Formatter(
-            '%(asctime)s - %(levelname)s - %(message)s',
-            datefmt='%H:%M:%S'
-        )
-        queue_handler.setFormatter(formatter)
-        
-        logger = logging.getLogger()
-        original_level = logger.level
-        logger.setLevel(logging.INFO)
-        logger.addHandler(queue_handler)
-        
+        log_channel = AsyncLogChannel(loop=asyncio.get_running_loop())
+        log_channel.setFormatter(sse_log_formatter)
+        stream_id = log_stream_router.register(log_channel)
+
         try:
             yield f"data: 🔍 Starting prediction process...\n\n"
-            await asyncio.sleep(0.1)
-            
+
             result = {"status": False, "prediction": None, "risk_level": None}
-            
+
             def run_prediction():
                 try:
                     vehicle_data = VehicleData(
@@ -222,56 +328,35 @@ async def predict_stream(
                         Vehicle_Age_gt_2_Years=Vehicle_Age_gt_2_Years,
                         Vehicle_Damage_Yes=Vehicle_Damage_Yes
                     )
-                    
-                    vehicle_df = vehicle_data.get_vehicle_input_data_frame()
+
+                    vehicle_row = vehicle_data.get_vehicle_input_array()
                     model_predictor = VehicleDataClassifier()
-                    value = model_predictor.predict(dataframe=vehicle_df)[0]
-                    
+                    predictions = model_predictor.predict(dataframe=vehicle_row)
+
                     result["status"] = True
-                    result["prediction"] = int(value)
-                    
-                    # Determine risk level based on features
-                    if value == 1:
-                        if Previously_Insured == 0 and Vehicle_Damage_Yes == 1:
-                            result["risk_level"] = "High"
-                        elif Vehicle_Damage_Yes == 1:
-                            result["risk_level"] = "Medium"
-                        else:
-                            result["risk_level"] = "Low"
-                    else:
-                        result["risk_level"] = "Low"
-                    
-                    log_queue.put("PREDICTION_COMPLETE")
+                    result["prediction"] = int(predictions[0])
+                    result["risk_level"] = get_risk_levels(predictions, [Previously_Insured], [Vehicle_Damage_Yes])[0]
                 except Exception as e:
-                    log_queue.put(f"ERROR: {str(e)}")
-                    log_queue.put("PREDICTION_COMPLETE")
-            
-            prediction_thread = threading.Thread(target=run_prediction)
+                    log_channel.put(f"ERROR: {str(e)}")
+                finally:
+                    log_channel.finish()
+
+            prediction_thread = threading.Thread(target=bind_log_stream(stream_id, run_prediction), daemon=True)
             prediction_thread.start()
-            
-            while True:
-                if not log_queue.empty():
-                    log_message = log_queue.get()
-                    
-                    if log_message == "PREDICTION_COMPLETE":
-                        yield f"data: ✓ Prediction completed successfully!\n\n"
-                        yield f"data: RESULT:{json.dumps(result)}\n\n"
-                        yield f"data: DONE\n\n"
-                        break
-                    
-                    yield f"data: {log_message}\n\n"
-                else:
-                    await asyncio.sleep(0.1)
-            
-            prediction_thread.join(timeout=1)
-            
+
+            async for messages in log_channel.batches():
+                yield format_sse(messages)
+
+            yield f"data: ✓ Prediction completed successfully!\n\n"
+            yield f"data: RESULT:{json.dumps(result)}\n\n"
+            yield f"data: DONE\n\n"
+
         except Exception as e:
             yield f"data: ❌ ERROR: {str(e)}\n\n"
             yield f"data: DONE\n\n"
         finally:
-            logger.removeHandler(queue_handler)
-            logger.setLevel(original_level)
-    
+            log_stream_router.unregister(stream_id)
+
     return StreamingResponse(
         event_generator(), 
         media_type="text/event-stream",
@@ -282,6 +367,99 @@ async def predict_stream(
     )
 
 
+# Plain JSON prediction endpoint for machine to machine scoring
+@app.post("/predict", response_model=PredictionResponse)
+async def predict(record: VehicleRecord):
+    """
+    Request/response scoring without SSE framing, log capture or polling.
+
+    Runs on a bounded pool of PREDICT_EXECUTOR_MAX_WORKERS threads. Latency budget, measured
+    server side on a warm model: p50 <= PREDICT_LATENCY_BUDGET_P50_MS (5 ms) and
+    p99 <= PREDICT_LATENCY_BUDGET_P99_MS (25 ms); /metrics/predict reports the live percentiles.
+    """
+    start = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    try:
+        result = await loop.run_in_executor(predict_executor, score_record, record)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    predict_latency.record(time.perf_counter() - start)
+    return result
+
+
+# Latency of /predict against its budget
+@app.get("/metrics/predict")
+async def predict_metrics():
+    """
+    Reports /predict p50/p99 over the last PREDICT_LATENCY_WINDOW requests and whether they are within budget.
+    """
+    return predict_latency.report()
+
+
+# Batch prediction endpoint (JSON body)
+@app.post("/predict-batch")
+async def predict_batch(batch: BatchPredictionRequest):
+    """
+    Scores N records in one vectorized pass and returns predictions and risk levels as arrays.
+    """
+    if len(batch.records) == 0:
+        return {"count": 0, "predictions": [], "risk_levels": []}
+    if len(batch.records) > PREDICTION_BATCH_MAX_RECORDS:
+        raise HTTPException(status_code=413,
+                            detail=f"batch is limited to {PREDICTION_BATCH_MAX_RECORDS} records")
+
+    vehicle_df = VehicleDataBatch(record.model_dump() for record in batch.records).get_vehicle_input_data_frame()
+    return await run_in_threadpool(score_batch, vehicle_df)
+
+
+# Batch prediction endpoint (CSV upload)
+@app.post("/predict-batch/csv")
+async def predict_batch_csv(file: UploadFile = File(...)):
+    """
+    Scores an uploaded CSV (one applicant per row, same column names as /predict-stream) in one pass.
+    """
+    content = await file.read()
+    try:
+        vehicle_df = pd.read_csv(io.BytesIO(content))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"could not parse csv: {e}")
+
+    missing_columns = [column for column in PREDICTION_INPUT_COLUMNS if column not in vehicle_df.columns]
+    if missing_columns:
+        raise HTTPException(status_code=400, detail=f"missing columns: {missing_columns}")
+    if len(vehicle_df) > PREDICTION_BATCH_MAX_RECORDS:
+        raise HTTPException(status_code=413,
+                            detail=f"batch is limited to {PREDICTION_BATCH_MAX_RECORDS} records")
+    if len(vehicle_df) == 0:
+        return {"count": 0, "predictions": [], "risk_levels": []}
+
+    return await run_in_threadpool(score_batch, vehicle_df[PREDICTION_INPUT_COLUMNS])
+
+
+# Micro batcher statistics
+@app.get("/metrics/micro-batcher")
+async def micro_batcher_metrics():
+    """
+    Reports the adaptive window, moving averages and batch size histogram of the prediction micro batcher.
+    """
+    model_predictor = VehicleDataClassifier()
+    if model_predictor.micro_batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **model_predictor.micro_batcher.stats()}
+
+
+# Prediction cache statistics
+@app.get("/metrics/prediction-cache")
+async def prediction_cache_metrics():
+    """
+    Reports hit, miss, eviction and expiration counters of the prediction result cache.
+    """
+    model_predictor = VehicleDataClassifier()
+    if model_predictor.prediction_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **model_predictor.prediction_cache.stats()}
+
+
 # Main entry point
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=False)
@@ -0,0 +1,49 @@
+"""
+write / read time and size on disk of the ingestion artifact formats (csv, parquet, feather) for a
+schema-shaped frame compacted to its storage dtypes; "read w/o id" projects away the id column the
+way transformation does. 50M rows need about 4x the memory of 10M (~10 GB for the frame and its
+csv round trip), pass --rows 50000000 where that fits
+
+    python -m benchmarks.bench_artifact_formats [--rows 1000000 10000000]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from src.utils.main_utils import (ARTIFACT_FORMATS, compact_dataframe, load_dataframe, read_yaml_file,
+                                  save_dataframe)
+from src.constants import SCHEMA_FILE_PATH
+from tests.helpers import make_raw_records
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000000, 10000000])
+    args = parser.parse_args()
+    storage_dtypes = read_yaml_file(SCHEMA_FILE_PATH)["storage_dtypes"]
+
+    print(f"{'rows':>10} {'format':>8} {'write s':>8} {'read s':>8} {'read w/o id s':>14} {'size MB':>9}")
+    for rows in args.rows:
+        dataframe = compact_dataframe(make_raw_records(rows), storage_dtypes)
+        columns = [column for column in dataframe.columns if column != "id"]
+        with tempfile.TemporaryDirectory() as directory:
+            for file_format, extension in ARTIFACT_FORMATS.items():
+                file_path = os.path.join(directory, "data" + extension)
+                write_seconds, _ = timed(lambda: save_dataframe(file_path, dataframe))
+                read_seconds, _ = timed(lambda: load_dataframe(file_path))
+                projected_seconds, _ = timed(lambda: load_dataframe(file_path, columns=columns))
+                print(f"{rows:>10} {file_format:>8} {write_seconds:>8.2f} {read_seconds:>8.2f} "
+                      f"{projected_seconds:>14.2f} {os.path.getsize(file_path) / 2**20:>9.1f}")
+                os.remove(file_path)
+        del dataframe
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+latency of CompiledPreprocessor against the fitted ColumnTransformer it replaces, for the
+data transformation preprocessor in both precisions: sklearn gets the DataFrame it is served
+today, the compiled paths get the raw float64 request rows (transform_values: one record)
+
+    python -m benchmarks.bench_compiled_preprocessor
+"""
+import time
+
+import numpy as np
+
+from src.constants import PREDICTION_INPUT_COLUMNS
+from src.entity.compiled_preprocessor import CompiledPreprocessor
+from tests.helpers import make_applicants, make_preprocessor
+
+BATCH_SIZES = (1, 64, 4096, 100000)
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    dataframe, _ = make_applicants(20000)
+    scored = make_applicants(max(BATCH_SIZES), seed=3)[0]
+
+    print(f"{'precision':>10} {'rows':>8} {'sklearn ms':>12} {'compiled ms':>12} {'speedup':>8} {'values ms':>10}")
+    for precision in ("float64", "float32"):
+        preprocessor = make_preprocessor().fit(dataframe.astype(precision))
+        compiled = CompiledPreprocessor(preprocessor, dtype=precision)
+        for rows in BATCH_SIZES:
+            frame = scored.head(rows)
+            raw = frame.to_numpy(dtype=np.float64)
+            np.testing.assert_array_equal(compiled.transform(raw, columns=PREDICTION_INPUT_COLUMNS),
+                                          preprocessor.transform(frame.astype(precision)))
+            repeat = 200 if rows <= 64 else 5
+            sklearn_seconds = best_of(lambda: preprocessor.transform(frame.astype(precision)), repeat)
+            compiled_seconds = best_of(lambda: compiled.transform(raw, columns=PREDICTION_INPUT_COLUMNS), repeat)
+            values = ""
+            if rows == 1:
+                record = raw[0].tolist()
+                values = f"{best_of(lambda: compiled.transform_values(record), repeat) * 1e3:>10.4f}"
+            print(f"{precision:>10} {rows:>8} {sklearn_seconds * 1e3:>12.3f} {compiled_seconds * 1e3:>12.3f} "
+                  f"{sklearn_seconds / compiled_seconds:>7.1f}x {values}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+latency of FlatForest against sklearn's predict_proba for a forest shaped like config/model.yaml;
+MyModel only uses FlatForest up to FOREST_ENGINE_MAX_ROWS rows, sklearn is faster above that
+
+    python -m benchmarks.bench_forest_engine
+"""
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+from src.entity.forest_engine import FlatForest
+
+BATCH_SIZES = (1, 64, 1000, 4096, 100000)
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(20000, 11))
+    y = ((X[:, 0] + 0.5 * X[:, 1] + rng.normal(scale=0.5, size=len(X))) > 0.3).astype(int)
+    forest = RandomForestClassifier(n_estimators=200, min_samples_split=7, min_samples_leaf=6, max_depth=10,
+                                    criterion="entropy", random_state=101).fit(X, y)
+    engine = FlatForest(forest)
+
+    print(f"{'rows':>8} {'sklearn ms':>12} {'FlatForest ms':>14} {'speedup':>8}")
+    for rows in BATCH_SIZES:
+        batch = rng.normal(size=(rows, 11)).astype(np.float32)
+        repeat = 20 if rows <= 1000 else 3
+        engine.predict_proba(batch)
+        sklearn_seconds = best_of(lambda: forest.predict_proba(batch), repeat)
+        engine_seconds = best_of(lambda: engine.predict_proba(batch), repeat)
+        print(f"{rows:>8} {sklearn_seconds * 1e3:>12.2f} {engine_seconds * 1e3:>14.2f} "
+              f"{sklearn_seconds / engine_seconds:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
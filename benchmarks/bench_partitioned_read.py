@@ -0,0 +1,44 @@
+"""
+rows/s of proj1.collect_in_df at several read parallelisms, against the in-process stand-in
+collection (benchmarks/mongo_stand_in.py) waiting latency_ms per batch of documents for the round
+trip. Only the waits overlap here: the per document conversion holds the GIL, and on a real
+cluster the server side work of the ranges would run in parallel as well
+
+    python -m benchmarks.bench_partitioned_read [--rows 1000000 --latency-ms 30 --parallelism 1 2 4 8]
+"""
+import argparse
+import time
+
+from benchmarks.mongo_stand_in import StandInCollection, make_documents
+from src.data_access import proj1_data
+from src.data_access.proj1_data import proj1, load_schema_dtypes
+
+BATCH_SIZE = 10000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--latency-ms", type=float, default=30.0)
+    parser.add_argument("--parallelism", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    collection = StandInCollection(make_documents(args.rows), latency=args.latency_ms / 1000, batch_size=BATCH_SIZE)
+    proj1_data.MONGO_PARALLEL_MIN_DOCUMENTS = 0
+    # no connection, the collection is the stand-in
+    data = proj1.__new__(proj1)
+    data.schema_dtypes, data.storage_dtypes = load_schema_dtypes()
+    data.get_collection = lambda collection_name, database_name=None: collection
+
+    print(f"{args.rows} documents, {args.latency_ms} ms per {BATCH_SIZE} document batch")
+    print(f"{'parallelism':>12} {'seconds':>8} {'rows/s':>10}")
+    for parallelism in args.parallelism:
+        start = time.perf_counter()
+        dataframe = data.collect_in_df("applicants", batch_size=BATCH_SIZE, parallelism=parallelism)
+        seconds = time.perf_counter() - start
+        assert len(dataframe) == args.rows
+        print(f"{parallelism:>12} {seconds:>8.2f} {args.rows / seconds:>10,.0f}")
+
+
+if __name__ == "__main__":
+    main()
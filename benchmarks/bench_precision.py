@@ -0,0 +1,77 @@
+"""
+throughput of the float32 precision mode against float64: preprocessing fit + transform, forest fit
+and serving (MyModel.prediction_with_raw_array), plus how often the two modes predict the same label
+
+    python -m benchmarks.bench_precision [--rows 1000000]
+"""
+import argparse
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+from src.constants import PREDICTION_INPUT_COLUMNS
+from src.entity.estimator import MyModel
+from src.utils.main_utils import precision_dtype
+from tests.helpers import make_applicants, make_preprocessor
+
+SERVE_BATCH_SIZES = (1, 64, 4096, 100000)
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run(precision, dataframe, target, holdout):
+    dtype = precision_dtype(precision)
+    start = time.perf_counter()
+    preprocessor = make_preprocessor()
+    features = preprocessor.fit_transform(dataframe.astype(dtype))
+    transform_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    forest = RandomForestClassifier(n_estimators=30, min_samples_split=7, min_samples_leaf=6, max_depth=10,
+                                    criterion="entropy", random_state=101, n_jobs=-1).fit(features, target)
+    fit_seconds = time.perf_counter() - start
+
+    model = MyModel(preprocessor, forest, precision=precision)
+    raw = holdout.to_numpy(dtype=np.float64)
+    serve = {}
+    for rows in SERVE_BATCH_SIZES:
+        batch = raw[:rows]
+        model.prediction_with_raw_array(batch, PREDICTION_INPUT_COLUMNS)
+        seconds = best_of(lambda: model.prediction_with_raw_array(batch, PREDICTION_INPUT_COLUMNS),
+                          20 if rows <= 4096 else 3)
+        serve[rows] = rows / seconds
+    return {"transform_seconds": transform_seconds, "features_mb": features.nbytes / 2**20,
+            "fit_seconds": fit_seconds, "serve_rows_per_second": serve,
+            "predictions": model.prediction_with_raw_array(raw, PREDICTION_INPUT_COLUMNS)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    args = parser.parse_args()
+
+    dataframe, target = make_applicants(args.rows)
+    holdout = make_applicants(max(SERVE_BATCH_SIZES), seed=7)[0]
+    results = {precision: run(precision, dataframe, target, holdout) for precision in ("float64", "float32")}
+
+    print(f"{args.rows} training rows, 30 trees")
+    print(f"{'precision':>10} {'transform s':>12} {'features MB':>12} {'fit s':>8} "
+          + " ".join(f"{f'{rows} rows/s':>14}" for rows in SERVE_BATCH_SIZES))
+    for precision, result in results.items():
+        print(f"{precision:>10} {result['transform_seconds']:>12.2f} {result['features_mb']:>12.1f} "
+              f"{result['fit_seconds']:>8.2f} "
+              + " ".join(f"{result['serve_rows_per_second'][rows]:>14,.0f}" for rows in SERVE_BATCH_SIZES))
+    agreement = np.mean(results["float32"]["predictions"] == results["float64"]["predictions"])
+    print(f"float32 and float64 predict the same label on {agreement:.4%} of {len(holdout)} holdout rows")
+
+
+if __name__ == "__main__":
+    main()
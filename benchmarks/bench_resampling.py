@@ -0,0 +1,55 @@
+"""
+wall time and traced peak memory of every resampling strategy, then the fit time and holdout F1
+of a forest trained on its output ("class_weight" fits with class_weight="balanced")
+
+    python -m benchmarks.bench_resampling [--rows 200000]
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import f1_score
+
+from src.utils.resampling import RESAMPLING_STRATEGIES, resample
+from tests.helpers import make_applicants, make_preprocessor
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--trees", type=int, default=50)
+    args = parser.parse_args()
+
+    dataframe, target = make_applicants(args.rows)
+    holdout, holdout_target = make_applicants(50000, seed=7)
+    preprocessor = make_preprocessor()
+    x = np.ascontiguousarray(preprocessor.fit_transform(dataframe.astype(np.float32)), dtype=np.float32)
+    x_holdout = preprocessor.transform(holdout.astype(np.float32))
+    y = target.astype(np.int8)
+
+    print(f"{args.rows} training rows ({y.mean():.1%} positive), {args.trees} trees, F1 on {len(holdout)} rows")
+    print(f"{'strategy':>14} {'rows':>9} {'resample s':>11} {'peak MB':>9} {'fit s':>8} {'F1':>8}")
+    for strategy in RESAMPLING_STRATEGIES:
+        tracemalloc.start()
+        start = time.perf_counter()
+        x_resampled, y_resampled = resample(x, y, strategy=strategy, random_state=42)
+        resample_seconds = time.perf_counter() - start
+        peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+
+        start = time.perf_counter()
+        forest = RandomForestClassifier(n_estimators=args.trees, min_samples_split=7, min_samples_leaf=6,
+                                        max_depth=10, criterion="entropy", random_state=101, n_jobs=-1,
+                                        class_weight="balanced" if strategy == "class_weight" else None)
+        forest.fit(x_resampled, y_resampled)
+        fit_seconds = time.perf_counter() - start
+        f1 = f1_score(holdout_target, forest.predict(x_holdout))
+        print(f"{strategy:>14} {len(y_resampled):>9} {resample_seconds:>11.2f} {peak_mb:>9.1f} "
+              f"{fit_seconds:>8.2f} {f1:>8.4f}")
+        del x_resampled, y_resampled, forest
+
+
+if __name__ == "__main__":
+    main()
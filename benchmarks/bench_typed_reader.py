@@ -0,0 +1,69 @@
+"""
+rows/s, traced peak memory (measured in a second, traced read) and frame size of proj1.collect_in_df (typed column chunks) against the
+reader it replaced (DataFrame(list(find())), drop _id, replace "na"), over the in-process stand-in
+collection of benchmarks/mongo_stand_in.py without round trip latency
+
+    python -m benchmarks.bench_typed_reader [--rows 1000000]
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.mongo_stand_in import StandInCollection, make_documents
+from src.data_access.proj1_data import proj1, load_schema_dtypes
+
+
+def old_collect_in_df(collection) -> pd.DataFrame:
+    dataframe = pd.DataFrame(list(collection.find()))
+    if "_id" in dataframe.columns.to_list():
+        dataframe = dataframe.drop(columns=["_id"])
+    dataframe.replace({"na": np.nan}, inplace=True)
+    return dataframe
+
+
+def measure(read):
+    # timed untraced, tracemalloc slows python object allocations down a lot
+    gc.collect()
+    start = time.perf_counter()
+    dataframe = read()
+    seconds = time.perf_counter() - start
+    rows, frame_mb = len(dataframe), dataframe.memory_usage(deep=True).sum() / 2**20
+    del dataframe
+    gc.collect()
+    tracemalloc.start()
+    read()
+    peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return seconds, peak_mb, frame_mb, rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    args = parser.parse_args()
+
+    documents = make_documents(args.rows)
+    # the collection stores missing values as "na"
+    for document in documents[::50]:
+        document["Annual_Premium"] = "na"
+    collection = StandInCollection(documents)
+    data = proj1.__new__(proj1)
+    data.schema_dtypes, data.storage_dtypes = load_schema_dtypes()
+    data.get_collection = lambda collection_name, database_name=None: collection
+
+    readers = {"list(find())": lambda: old_collect_in_df(collection),
+               "typed chunks": lambda: data.collect_in_df("applicants", parallelism=1)}
+    print(f"{args.rows} documents")
+    print(f"{'reader':>14} {'seconds':>8} {'rows/s':>10} {'peak MB':>9} {'frame MB':>9}")
+    for name, read in readers.items():
+        seconds, peak_mb, frame_mb, rows = measure(read)
+        assert rows == args.rows
+        print(f"{name:>14} {seconds:>8.2f} {rows / seconds:>10,.0f} {peak_mb:>9.1f} {frame_mb:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
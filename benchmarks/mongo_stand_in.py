@@ -0,0 +1,96 @@
+"""
+in-process stand-in for a pymongo collection, for benchmarks of the proj1 readers without a mongod:
+documents are served as fresh dicts (as pymongo decodes them) from a list sorted by _id, and every
+batch_size documents a cursor waits latency seconds for the round trip. Supports what proj1 calls:
+find with an _id / field range (optionally ANDed with a query, which is ignored), a projection and
+batch_size, aggregate with $sample + $project, estimated_document_count
+"""
+import bisect
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from tests.helpers import make_raw_records
+
+
+def make_documents(n_rows: int) -> List[dict]:
+    documents = make_raw_records(n_rows).to_dict(orient="records")
+    for i, document in enumerate(documents):
+        document["_id"] = i
+    return documents
+
+
+def _range_condition(query: Optional[dict]):
+    if not query:
+        return None, {}
+    if "$and" in query:
+        query = query["$and"][-1]
+    (field, condition), = query.items()
+    return field, condition
+
+
+class StandInCollection:
+    def __init__(self, documents: List[dict], latency: float = 0.0, batch_size: int = 10000) -> None:
+        self.documents = documents
+        self.ids = [document["_id"] for document in documents]
+        self.latency = latency
+        self.batch_size = batch_size
+
+    def estimated_document_count(self) -> int:
+        return len(self.documents)
+
+    def aggregate(self, pipeline: List[dict]):
+        size = next(stage["$sample"]["size"] for stage in pipeline if "$sample" in stage)
+        fields = next(stage["$project"] for stage in pipeline if "$project" in stage)
+        rows = np.random.default_rng(0).choice(len(self.documents), min(size, len(self.documents)), replace=False)
+        return [{field: self.documents[row][field] for field, keep in fields.items() if keep} for row in rows]
+
+    def _matching(self, query: Optional[dict]) -> List[dict]:
+        field, condition = _range_condition(query)
+        if field is None:
+            return self.documents
+        if field == "_id":
+            low = bisect.bisect_left(self.ids, condition["$gte"]) if "$gte" in condition else 0
+            high = bisect.bisect_left(self.ids, condition["$lt"]) if "$lt" in condition else len(self.ids)
+            return self.documents[low:high]
+        return [document for document in self.documents
+                if ("$gte" not in condition or document[field] >= condition["$gte"])
+                and ("$lt" not in condition or document[field] < condition["$lt"])]
+
+    def find(self, query: Optional[dict] = None, projection: Optional[dict] = None, batch_size: int = 0):
+        return _StandInCursor(self._matching(query), projection, self.latency, batch_size or self.batch_size)
+
+
+class _StandInCursor:
+    def __init__(self, documents: List[dict], projection: Optional[dict], latency: float, batch_size: int) -> None:
+        self.documents = documents
+        self.latency = latency
+        self.batch_size = batch_size
+        self.position = 0
+        projection = projection or {}
+        self.include = [field for field, keep in projection.items() if keep and field != "_id"] or None
+        self.drop_id = projection.get("_id", 1) == 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> dict:
+        if self.position >= len(self.documents):
+            raise StopIteration
+        if self.position % self.batch_size == 0:
+            time.sleep(self.latency)
+        document = self.documents[self.position]
+        self.position += 1
+        if self.include is not None:
+            decoded = {field: document[field] for field in self.include if field in document}
+            if not self.drop_id:
+                decoded["_id"] = document["_id"]
+            return decoded
+        decoded = dict(document)
+        if self.drop_id:
+            del decoded["_id"]
+        return decoded
+
+    def close(self) -> None:
+        pass
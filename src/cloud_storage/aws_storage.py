@@ -133,6 +133,23 @@ class SimpleStorageService:
         except Exception as e:
             raise myexception(e, sys) from e
 
+    def get_object_etag(self, s3_key: str, bucket_name: str) -> str:
+        """
+        Fetches the ETag of an S3 object with a HEAD request, without downloading its body.
+
+        Args:
+            s3_key (str): Key path of the object in the bucket.
+            bucket_name (str): Name of the S3 bucket.
+
+        Returns:
+            str: The object's ETag (quotes stripped).
+        """
+        try:
+            response = self.s3_client.head_object(Bucket=bucket_name, Key=s3_key)
+            return response["ETag"].strip('"')
+        except Exception as e:
+            raise myexception(e, sys) from e
+
     def create_folder(self, folder_name: str, bucket_name: str) -> None:
         """
         Creates a folder in the specified S3 bucket.
@@ -1,35 +1,44 @@
 import os
 import sys
 import pandas as pd
+from typing import Optional
 from sklearn.model_selection import train_test_split
 from src.logger import logging
 from src.exception import myexception
 from src.entity.artifact_entity import DataIngestionArtifact
 from src.entity.config_entity import DataIngestionConfig
 from src.data_access.proj1_data import proj1
+from src.data_access.feature_store import FeatureStore
+from src.utils.main_utils import save_dataframe, read_yaml_file, compact_dataframe
+from src.constants import SCHEMA_FILE_PATH
+from src.utils.artifact_store import ArtifactStore
 
 class dataIngestion:
-    def __init__ (self,data_config: DataIngestionConfig = DataIngestionConfig())->None:
+    def __init__ (self,data_config: DataIngestionConfig = DataIngestionConfig(),
+                  artifact_store: Optional[ArtifactStore] = None)->None:
         """
         this takes DataIngestionConfig module and build local object for it
         """
         try:
             self.data_config = data_config
+            self.artifact_store = artifact_store or ArtifactStore()
+            self.storage_dtypes = read_yaml_file(SCHEMA_FILE_PATH).get("storage_dtypes", {})
         except Exception as e:
             raise myexception(e,sys)
         
-    def save_dataframe (self) -> pd.DataFrame:
+    def save_dataframe (self, feature_store : Optional[FeatureStore] = None) -> pd.DataFrame:
         """
         build connection using proj1_data() and extract data in form of dataframe
         
         :param self: self
+        :param feature_store: an already synced store, loaded as is instead of syncing again
         :return: dataframe
         :rtype: DataFrame
         """
         try:
-            data = proj1()
-            dataframe = data.collect_in_df(self.data_config.collection_name)
-            data.close_connection()
+            if feature_store is None:
+                feature_store = self.update_feature_store()
+            dataframe = compact_dataframe(feature_store.load(), self.storage_dtypes, name="ingested data")
 
             logging.info("collected data in dataframe")
 
@@ -37,7 +46,8 @@ class dataIngestion:
             dir_path = os.path.dirname(collection_store_path)
             os.makedirs(dir_path,exist_ok=True)
 
-            dataframe.to_csv(collection_store_path,index=False)
+            # kept for the record only, later stages read the train / test split
+            self.artifact_store.save(collection_store_path, dataframe, save_dataframe, consumers=0)
 
             logging.info("dataframe saved ")
 
@@ -45,6 +55,55 @@ class dataIngestion:
         except Exception as e:
             raise myexception(e,sys)
     
+    def update_feature_store (self) -> FeatureStore:
+        """
+        copies only the documents newer than the stored watermark into the local feature store
+        """
+        try:
+            store = FeatureStore(root_dir=self.data_config.feature_store_root,
+                                 collection_name=self.data_config.collection_name,
+                                 dedup_column=self.data_config.dedup_column)
+            field = self.data_config.watermark_field
+            watermark = store.read_watermark(field)
+            query = store.since_query(field, watermark, self.data_config.watermark_overlap_seconds)
+            logging.info(f"fetching documents matching {query}, watermark {watermark}")
+
+            data = proj1()
+            new_watermark, rows = watermark, 0
+            for chunk in data.iter_chunks(self.data_config.collection_name, query=query,
+                                          include_id=(field == "_id"),
+                                          parallelism=self.data_config.read_parallelism):
+                chunk_watermark = chunk[field].max()
+                if new_watermark is None or chunk_watermark > new_watermark:
+                    new_watermark = chunk_watermark
+                if field == "_id":
+                    chunk = chunk.drop(columns=["_id"])
+                store.append(chunk)
+                rows += len(chunk)
+            data.close_connection()
+
+            # watermark only moves once every part is on disk, a crash before this just refetches
+            if rows:
+                store.write_watermark(field, new_watermark.item() if hasattr(new_watermark, "item") else new_watermark,
+                                      rows)
+            logging.info(f"fetched {rows} documents, watermark now {new_watermark}")
+            return store
+        except Exception as e:
+            raise myexception(e,sys)
+
+    def split_train_test (self, dataframe : pd.DataFrame):
+        """
+        train / test split by a hash of the id column, so a row lands in the same split on every run
+        (an incrementally grown model never sees a test row, and test rows never were training rows)
+        """
+        column = self.data_config.dedup_column
+        if column not in dataframe.columns:
+            logging.warning(f"no {column} column to split by, using a seeded random split")
+            return train_test_split(dataframe, test_size=self.data_config.train_test_split_ratio, random_state=42)
+        buckets = pd.util.hash_pandas_object(dataframe[column], index=False).to_numpy() % 10000
+        is_test = buckets < int(round(self.data_config.train_test_split_ratio * 10000))
+        return dataframe[~is_test], dataframe[is_test]
+
     def save_train_test (self,dataframe :pd.DataFrame)->None:
         """
         takes dataframe and divedes and save in train,test
@@ -52,7 +111,7 @@ class dataIngestion:
         :param : takes dataframe as input given by save dataframe module
         """
         try:
-            train,test = train_test_split(dataframe,test_size=self.data_config.train_test_split_ratio)
+            train,test = self.split_train_test(dataframe)
 
             logging.info("split dataframe in train test split")
 
@@ -63,22 +122,25 @@ class dataIngestion:
 
             os.makedirs(file_path,exist_ok=True)
 
-            train.to_csv(train_store_path,index=False)
-            test.to_csv(test_store_path,index=False)
+            # read by validation and transformation
+            self.artifact_store.save(train_store_path, train, save_dataframe, consumers=2)
+            self.artifact_store.save(test_store_path, test, save_dataframe, consumers=2)
 
             logging.info("train test saved")
         except Exception as e:
             raise myexception(e,sys)
-    def data_ingestion_start (self) -> DataIngestionArtifact :
+
+    def data_ingestion_start (self, feature_store : Optional[FeatureStore] = None) -> DataIngestionArtifact :
         """
         this is function that is intial stage for pipeline and saes path in DataIngestionArtifact
         """
         try:
-            df = self.save_dataframe()
+            df = self.save_dataframe(feature_store)
             self.save_train_test(df)
 
             artifact = DataIngestionArtifact(trained_file_path=self.data_config.training_file_path,
-                                             test_file_path=self.data_config.testing_file_path)
+                                             test_file_path=self.data_config.testing_file_path,
+                                             file_format=self.data_config.artifact_format)
             
             logging.info(f"Data ingestion artifact: {artifact}")
             
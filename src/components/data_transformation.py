@@ -1,7 +1,6 @@
 import sys
 import numpy as np
 import pandas as pd
-from imblearn.combine import SMOTEENN
 from imblearn.pipeline import Pipeline
 
 # from sklearn.pipeline import Pipeline
@@ -11,30 +10,55 @@ from sklearn.compose import ColumnTransformer
 from src.constants import TARGET_COLUMN, SCHEMA_FILE_PATH
 from src.entity.config_entity import DataTransformationConfig
 from src.entity.artifact_entity import DataTransformationArtifact, DataIngestionArtifact, DataValidationArtifact
+from src.entity.estimator import MyModel
 from src.exception import myexception
 from src.logger import logging
-from src.utils.main_utils import save_object, save_numpy_array_data, read_yaml_file
+from src.utils.main_utils import (save_object, save_numpy_array_data, read_yaml_file, load_dataframe,
+                                  artifact_format_of, compact_dataframe, precision_dtype)
+from src.utils.artifact_store import ArtifactStore
+from src.utils.resampling import resample
+from typing import Optional
 
 class DataTransformation :
     def __init__(self,data_integration_artifact : DataIngestionArtifact,
                  data_validation_artifact : DataValidationArtifact,
-                 data_tranform_config : DataTransformationConfig):
-        
+                 data_tranform_config : DataTransformationConfig,
+                 artifact_store : Optional[ArtifactStore] = None,
+                 base_model : Optional[MyModel] = None):
+        """
+        :param base_model: production model of an incremental retrain; its fitted preprocessing is reused
+                           and only training rows newer than it are kept (without resampling)
+        """
         try:
             self.data_integration_artifact = data_integration_artifact
             self.data_validation_artifact = data_validation_artifact
             self.data_transform_config = data_tranform_config
+            self.artifact_store = artifact_store or ArtifactStore()
+            self.base_model = base_model
 
             self.schema = read_yaml_file(SCHEMA_FILE_PATH)
         except Exception as e:
             raise myexception(e,sys)
         
-    def read_csv (self , path : str) -> pd.DataFrame : 
+    def read_data (self , path : str , columns = None) -> pd.DataFrame : 
         try:
-            return pd.read_csv(path)
+            return self.artifact_store.load(path, load_dataframe, columns=columns)
         except Exception as e:
             raise myexception(e,sys)
     
+    def needed_columns (self , path : str):
+        """
+        schema columns minus drop_columns, so columnar artifacts never load the dropped ones
+        (None for csv, where a column subset saves nothing)
+        """
+        if artifact_format_of(path) == "csv":
+            return None
+        drop_columns = self.schema["drop_columns"]
+        drop_columns = [drop_columns] if isinstance(drop_columns, str) else list(drop_columns)
+        recency_column = self.data_transform_config.recency_column
+        return [name for column in self.schema["columns"] for name in column
+                if name not in drop_columns or name == recency_column]
+
     def data_transform_object (self) -> Pipeline:
 
         try:
@@ -60,19 +84,19 @@ class DataTransformation :
         
     def drop_cols (self,df) :
         try:
-            df = df.drop(self.schema["drop_columns"],axis=1)
+            df = df.drop(columns=self.schema["drop_columns"],errors="ignore")
             return df
         except Exception as e:
             raise myexception(e,sys)
         
     def _map_gender_column(self, df):
         logging.info("Mapping 'Gender' column to binary values")
-        df['Gender'] = df['Gender'].map({'Female': 0, 'Male': 1}).astype(int)
+        df['Gender'] = df['Gender'].map({'Female': 0, 'Male': 1}).astype(np.uint8)
         return df
 
     def _create_dummy_columns(self, df):
         logging.info("Creating dummy variables for categorical features")
-        df = pd.get_dummies(df, drop_first=True)
+        df = pd.get_dummies(df, drop_first=True, dtype=np.uint8)
         return df
 
     def _rename_columns(self, df):
@@ -83,15 +107,30 @@ class DataTransformation :
         })
         for col in ["Vehicle_Age_lt_1_Year", "Vehicle_Age_gt_2_Years", "Vehicle_Damage_Yes"]:
             if col in df.columns:
-                df[col] = df[col].astype('int')
+                df[col] = df[col].astype(np.uint8)
         return df
     def start_transform (self) -> DataTransformationArtifact :
         try:
             if not self.data_validation_artifact.validation_status:
                 logging.error("validation not done")
                 raise Exception("validation not done")
-            df_train = self.read_csv(self.data_integration_artifact.trained_file_path)
-            df_test = self.read_csv(self.data_integration_artifact.test_file_path)
+            columns = self.needed_columns(self.data_integration_artifact.trained_file_path)
+            storage_dtypes = self.schema.get("storage_dtypes", {})
+            df_train = compact_dataframe(self.read_data(self.data_integration_artifact.trained_file_path,
+                                                        columns=columns), storage_dtypes, name="transformation train")
+            df_test = compact_dataframe(self.read_data(self.data_integration_artifact.test_file_path,
+                                                       columns=columns), storage_dtypes, name="transformation test")
+
+            config = self.data_transform_config
+            if self.base_model is not None:
+                cutoff = self.base_model.trained_max_id
+                if cutoff is None:
+                    logging.warning("production model does not record its newest row, using every training row")
+                else:
+                    df_train = df_train[df_train[config.recency_column] > cutoff]
+                    logging.info(f"incremental: {len(df_train)} training rows newer than id {cutoff}")
+            # newest row the forest is fitted on, the cutoff of the next incremental run
+            max_train_id = int(df_train[config.recency_column].max()) if len(df_train) else None
 
             input_train_col = df_train.drop(TARGET_COLUMN,axis=1)
             target_train_col = df_train[TARGET_COLUMN].values
@@ -109,28 +148,57 @@ class DataTransformation :
             input_test_col = self._create_dummy_columns(input_test_col)
             input_test_col = self._rename_columns(input_test_col)
 
-            preprocessor = self.data_transform_object()
-            input_train_col = preprocessor.fit_transform(input_train_col)
-            input_test_col = preprocessor.transform(input_test_col)
-
-            logging.info("Applying SMOTEENN for handling imbalanced dataset.")
-            smt = SMOTEENN(sampling_strategy="minority")
-
-            input_train_features,target_train_features = smt.fit_resample(input_train_col,
-                                                                          target_train_col)
-            train_arr = np.hstack((input_train_features,np.array(target_train_features).reshape(-1, 1)))
-            test_arr = np.hstack((input_test_col,np.array(target_test_col).reshape(-1, 1)))
-
-            save_object(self.data_transform_config.transformed_object_file_path, preprocessor)
-            save_numpy_array_data(self.data_transform_config.transformed_train_file_path, array=train_arr)
-            save_numpy_array_data(self.data_transform_config.transformed_test_file_path, array=test_arr)
+            if self.base_model is not None:
+                # the production trees split on the production scaling, so it is reused, never refit;
+                # the trainer weights the classes of the new trees instead of resampling
+                preprocessor = self.base_model.preprocessing_obj
+                dtype = precision_dtype(self.base_model.precision)
+                feature_names = list(getattr(preprocessor, "feature_names_in_", input_train_col.columns))
+                input_train_col = input_train_col.reindex(columns=feature_names, fill_value=0).astype(dtype)
+                # no new rows since the production model: nothing to grow, the trainer keeps the forest
+                input_train_col = (preprocessor.transform(input_train_col) if len(input_train_col)
+                                   else np.empty((0, len(feature_names)), dtype=dtype))
+                input_test_col = preprocessor.transform(
+                    input_test_col.reindex(columns=feature_names, fill_value=0).astype(dtype))
+                resampling = "class_weight"
+            else:
+                # the scalers keep their input dtype, so casting here makes the whole transform run in it
+                dtype = precision_dtype(config.precision)
+                input_train_col = input_train_col.astype(dtype)
+                input_test_col = input_test_col.astype(dtype)
+
+                preprocessor = self.data_transform_object()
+                input_train_col = preprocessor.fit_transform(input_train_col)
+                input_test_col = preprocessor.transform(input_test_col)
+                resampling = config.resampling
+
+            input_train_features,target_train_features = resample(input_train_col, target_train_col,
+                                                                  strategy=resampling,
+                                                                  k_neighbors=config.smote_k_neighbors,
+                                                                  chunk_size=config.smote_chunk_size,
+                                                                  random_state=config.resampling_random_state)
+            # features and target stay separate contiguous arrays, no hstack copy to slice apart later
+            x_train = np.ascontiguousarray(input_train_features, dtype=dtype)
+            y_train = np.ascontiguousarray(target_train_features, dtype=np.int8)
+            x_test = np.ascontiguousarray(input_test_col, dtype=dtype)
+            y_test = np.ascontiguousarray(target_test_col, dtype=np.int8)
+
+            self.artifact_store.save(config.transformed_object_file_path, preprocessor, save_object)
+            self.artifact_store.save(config.transformed_train_file_path, x_train, save_numpy_array_data)
+            self.artifact_store.save(config.transformed_train_target_file_path, y_train, save_numpy_array_data)
+            self.artifact_store.save(config.transformed_test_file_path, x_test, save_numpy_array_data)
+            self.artifact_store.save(config.transformed_test_target_file_path, y_test, save_numpy_array_data)
             logging.info("Saving transformation object and transformed files.")
 
             logging.info("Data transformation completed successfully")
             return DataTransformationArtifact(
                 transformed_object_file_path=self.data_transform_config.transformed_object_file_path,
                 transformed_train_file_path=self.data_transform_config.transformed_train_file_path,
-                transformed_test_file_path=self.data_transform_config.transformed_test_file_path
+                transformed_test_file_path=self.data_transform_config.transformed_test_file_path,
+                transformed_train_target_file_path=self.data_transform_config.transformed_train_target_file_path,
+                transformed_test_target_file_path=self.data_transform_config.transformed_test_target_file_path,
+                resampling=resampling,
+                max_train_id=max_train_id
             )
 
         except Exception as e:
@@ -1,38 +1,45 @@
-import os
 import sys
+import time
 import pandas as pd
-import json
+from statistics import NormalDist
 from src.logger import logging
 from src.exception import myexception
-from src.utils.main_utils import read_yaml_file
+from src.utils.main_utils import (read_yaml_file, write_yaml_file, load_dataframe, load_dataframe_columns,
+                                  compact_dataframe)
 from src.constants import SCHEMA_FILE_PATH
 from src.entity.artifact_entity import DataIngestionArtifact,DataValidationArtifact
 from src.entity.config_entity import DataValidationConfig
+from src.utils.artifact_store import ArtifactStore
+from typing import List, Optional
 
 class DataValidation :
-    def __init__ (self , injection_artifact : DataIngestionArtifact , validation_config : DataValidationConfig) -> None :
+    def __init__ (self , injection_artifact : DataIngestionArtifact , validation_config : DataValidationConfig ,
+                  artifact_store : Optional[ArtifactStore] = None) -> None :
         try:
             self.ingestion_artifact = injection_artifact
             self.validation_config = validation_config
+            self.artifact_store = artifact_store or ArtifactStore()
             self.schema = read_yaml_file(SCHEMA_FILE_PATH)
+            self.schema_types = {name: dtype for column in self.schema["columns"] for name, dtype in column.items()}
+            self.value_checks = self.schema.get("value_checks", {}) or {}
         except Exception as e:
             raise myexception(e,sys)
-    
-    def check_no_of_columns (self , dataframe : pd.DataFrame) -> bool :
+
+    def check_no_of_columns (self , columns : List[str]) -> bool :
         try :
             logging.info("started sucessfully")
-            status = len(dataframe.columns) == len(self.schema["columns"])
+            status = len(columns) == len(self.schema["columns"])
             logging.info("no issue with column numbers")
             return status
         except Exception as e:
             raise myexception(e,sys)
-        
-    def check_mismatch_columns (self , dataframe : pd.DataFrame) -> str :
+
+    def check_mismatch_columns (self , columns : List[str]) -> bool :
         try:
             logging.info("next step type check")
             numeric_missing_col = []
             categorical_missing_col = []
-            data_column = dataframe.columns.to_list()
+            data_column = list(columns)
 
             logging.info("type check started")
 
@@ -56,46 +63,173 @@ class DataValidation :
             return stat
         except Exception as e:
             raise myexception(e,sys)
-        
-    def read_csv (self , path : str) -> pd.DataFrame : 
+
+    def read_columns (self , path : str) -> List[str] :
+        """
+        header only: the in memory frame's columns, or the file's schema / csv header
+        """
         try:
-            return pd.read_csv(path)
+            dataframe = self.artifact_store.peek(path)
+            if dataframe is not None:
+                return dataframe.columns.to_list()
+            return load_dataframe_columns(path)
         except Exception as e:
             raise myexception(e,sys)
-        
-    def initiate_validation (self) -> DataValidationArtifact :
+
+    def read_data (self , path : str , columns = None) -> pd.DataFrame :
         try:
-            train_df = self.read_csv(self.ingestion_artifact.trained_file_path)
-            test_df = self.read_csv(self.ingestion_artifact.test_file_path)
+            return self.artifact_store.load(path, load_dataframe, columns=columns)
+        except Exception as e:
+            raise myexception(e,sys)
 
-            val_str = ""
-            logging.info("running training check")
+    @staticmethod
+    def _timed (check , *args) -> dict :
+        start = time.perf_counter()
+        result = check(*args)
+        result["seconds"] = round(time.perf_counter() - start, 6)
+        return result
+
+    @staticmethod
+    def _dtype_check (values : pd.Series , schema_type : str) -> dict :
+        if schema_type == "int":
+            if pd.api.types.is_bool_dtype(values) or pd.api.types.is_integer_dtype(values):
+                passed = True
+            elif pd.api.types.is_float_dtype(values):
+                # ints stored as float (a column with missing values) must still be whole numbers
+                passed = bool((values % 1 == 0).all())
+            else:
+                passed = False
+        elif schema_type == "float":
+            passed = pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values)
+        else:
+            passed = (isinstance(values.dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(values)
+                      or pd.api.types.is_object_dtype(values))
+        return {"passed": passed, "expected": schema_type, "dtype": str(values.dtype)}
+
+    @staticmethod
+    def _null_rate_check (null_mask : pd.Series , max_null_rate : float , z : float) -> dict :
+        n = len(null_mask)
+        null_rate = float(null_mask.mean()) if n else 0.0
+        result = {"passed": null_rate <= max_null_rate, "null_rate": round(null_rate, 6), "limit": max_null_rate}
+        if z is not None and n:
+            result["null_rate_upper_bound"] = round(min(1.0, null_rate + z * (null_rate * (1 - null_rate) / n) ** 0.5), 6)
+        return result
+
+    @staticmethod
+    def _range_check (values : pd.Series , rules : dict) -> dict :
+        violations = 0
+        if "min" in rules:
+            violations += int((values < rules["min"]).sum())
+        if "max" in rules:
+            violations += int((values > rules["max"]).sum())
+        result = {"passed": violations == 0, "violations": violations,
+                  "allowed": [rules.get("min"), rules.get("max")]}
+        if len(values):
+            result["observed"] = [float(values.min()), float(values.max())]
+        return result
+
+    @staticmethod
+    def _domain_check (values : pd.Series , categories : list) -> dict :
+        outside = ~values.isin(categories)
+        violations = int(outside.sum())
+        result = {"passed": violations == 0, "violations": violations}
+        if violations:
+            result["unexpected"] = [str(value) for value in pd.unique(values[outside])[:10]]
+        return result
+
+    def check_column_values (self , series : pd.Series , rules : dict , z : Optional[float] = None) -> dict :
+        """
+        dtype conformity, null rate, min/max and category domain of one column, one vectorized pass each
+        """
+        try:
+            results = {}
+            start = time.perf_counter()
+            null_mask = series.isna()
+            values = series[~null_mask]
+            mask_seconds = time.perf_counter() - start
 
-            status = self.check_no_of_columns(dataframe=train_df)
+            results["dtype"] = self._timed(self._dtype_check, values, self.schema_types.get(series.name, "category"))
+            max_null_rate = rules.get("max_null_rate", self.value_checks.get("max_null_rate", 0.0))
+            results["null_rate"] = self._timed(self._null_rate_check, null_mask, max_null_rate, z)
+            results["null_rate"]["seconds"] = round(results["null_rate"]["seconds"] + mask_seconds, 6)
+            if ("min" in rules or "max" in rules) and pd.api.types.is_numeric_dtype(values):
+                results["range"] = self._timed(self._range_check, values, rules)
+            if "categories" in rules:
+                results["domain"] = self._timed(self._domain_check, values, rules["categories"])
+            return results
+        except Exception as e:
+            raise myexception(e,sys)
 
-            if not status:
-                val_str += " column no missing in train , "
-                logging.error("column no missmatch in train ")
+    def check_content (self , path : str , name : str) -> dict :
+        """
+        value checks of every column listed in value_checks; above sample_rows rows a random sample is
+        checked and the report states how large a violation rate could have gone unnoticed
+        """
+        try:
+            column_rules = self.value_checks.get("columns", {}) or {}
+            columns = [column for column in self.read_columns(path) if column in column_rules]
+            dataframe = compact_dataframe(self.read_data(path, columns=columns),
+                                          self.schema.get("storage_dtypes", {}), name=f"validation {name}")
+            n_rows = len(dataframe)
 
-            status = self.check_mismatch_columns(dataframe=train_df)
+            report = {"rows": n_rows, "checked_rows": n_rows, "sampled": False}
+            z = None
+            sample_rows = self.validation_config.sample_rows
+            if 0 < sample_rows < n_rows:
+                confidence = self.validation_config.sample_confidence
+                dataframe = dataframe.sample(n=sample_rows, random_state=42)
+                z = NormalDist().inv_cdf(confidence)
+                report.update({
+                    "checked_rows": sample_rows,
+                    "sampled": True,
+                    "confidence": confidence,
+                    # no violation in n random rows: the true violation rate is below this, at confidence
+                    "max_undetected_violation_rate": round(1 - (1 - confidence) ** (1 / sample_rows), 8),
+                })
+                logging.info(f"checking a {sample_rows} row sample of {n_rows} {name} rows")
 
-            if not status:
-                val_str += " column type miss match in train , "
-                logging.error("column type miss match in train")
+            report["columns"] = {column: self.check_column_values(dataframe[column], column_rules[column], z)
+                                 for column in columns}
+            return report
+        except Exception as e:
+            raise myexception(e,sys)
 
-            logging.info("running test check")
+    def initiate_validation (self) -> DataValidationArtifact :
+        try:
+            val_str = ""
+            report = {"structure": {}, "content": {}}
+            paths = {"train": self.ingestion_artifact.trained_file_path,
+                     "test": self.ingestion_artifact.test_file_path}
+
+            for name, path in paths.items():
+                logging.info(f"running {name} check")
+                start = time.perf_counter()
+                columns = self.read_columns(path)
+                header_seconds = time.perf_counter() - start
 
-            status = self.check_no_of_columns(dataframe=test_df)
+                structure = {"columns": self._timed(lambda: {"passed": self.check_no_of_columns(columns)}),
+                             "names": self._timed(lambda: {"passed": self.check_mismatch_columns(columns)}),
+                             "header_read_seconds": round(header_seconds, 6)}
+                report["structure"][name] = structure
 
-            if not status:
-                val_str += " column no missing in test , "
-                logging.error("column no missmatch in test ")
+                if not structure["columns"]["passed"]:
+                    val_str += f" column no missing in {name} , "
+                    logging.error(f"column no missmatch in {name} ")
 
-            status = self.check_mismatch_columns(dataframe=test_df)
+                if not structure["names"]["passed"]:
+                    val_str += f" column type miss match in {name} , "
+                    logging.error(f"column type miss match in {name}")
 
-            if not status:
-                val_str += " column type miss match in test , "
-                logging.error("column type miss match in test")
+                start = time.perf_counter()
+                content = self.check_content(path, name)
+                content["seconds"] = round(time.perf_counter() - start, 6)
+                report["content"][name] = content
+
+                for column, checks in content["columns"].items():
+                    for check, result in checks.items():
+                        if not result["passed"]:
+                            val_str += f" {column} {check} check failed in {name} , "
+                            logging.error(f"{column} {check} check failed in {name}: {result}")
 
             validation_state = len(val_str) == 0
 
@@ -111,15 +245,12 @@ class DataValidation :
 
             validation_report = {
                 "validation_status" : validation_state ,
-                "message" : val_str
+                "message" : val_str ,
+                **report
             }
 
-            report_dir = os.path.dirname(self.validation_config.validation_report_file_path)
-            os.makedirs(report_dir,exist_ok=True)
-
-            with open(self.validation_config.validation_report_file_path,"w") as report :
-                json.dump(validation_report,report,indent=4)
+            write_yaml_file(self.validation_config.validation_report_file_path, validation_report, replace=True)
 
             return data_validation_config
         except Exception as e:
-            raise myexception(e,sys)
\ No newline at end of file
+            raise myexception(e,sys)
@@ -8,17 +8,21 @@ from src.entity.artifact_entity import (ModelPusherArtifact,ModelEvaluationArtif
                                         EvaluateModelResponse,DataTransformationArtifact)
 from src.logger import logging
 from src.exception import myexception
-from sklearn.metrics import f1_score,accuracy_score
-from src.utils.main_utils import load_object,load_numpy_array_data
+from src.utils.metrics import classification_metrics
+from src.utils.main_utils import load_object,load_mapped_array
 from src.entity.s3_estimator import Proj1Estimator
+from src.utils.artifact_store import ArtifactStore
+from typing import Optional
 
 class ModelEvaluation :
     def __init__(self,model_eval_config : ModelEvaluationConfig ,
                  data_transform_artifact :DataTransformationArtifact ,
-                 model_train_artifact : ModelTrainerArtifact) :
+                 model_train_artifact : ModelTrainerArtifact,
+                 artifact_store : Optional[ArtifactStore] = None) :
         self.model_eval_config = model_eval_config
         self.model_train_atifact = model_train_artifact
         self.data_transform_artifact = data_transform_artifact
+        self.artifact_store = artifact_store or ArtifactStore()
 
     def get_aws_model (self) :
         try:
@@ -40,17 +44,18 @@ class ModelEvaluation :
     def model_eval (self) -> EvaluateModelResponse:
         try:
             logging.info("loding testing data")
-            test = load_numpy_array_data(self.data_transform_artifact.transformed_test_file_path)
-
-            x = test[:,:-1]
-            y = test[:,-1]
+            x = self.artifact_store.load(self.data_transform_artifact.transformed_test_file_path, load_mapped_array,
+                                         prefer_file=True)
+            y = self.artifact_store.load(self.data_transform_artifact.transformed_test_target_file_path,
+                                         load_mapped_array, prefer_file=True)
 
             proj1_obj = self.get_aws_model()
 
             if proj1_obj != None:
                 y_pred = proj1_obj.predict_with_array(array=x)
-                obj_score = f1_score(y_true=y,y_pred=y_pred)
-                logging.info(f"aws model score is f1:{obj_score} , accuracy:{accuracy_score(y,y_pred)}")
+                aws_metrics = classification_metrics(y, y_pred)
+                obj_score = aws_metrics.f1_score
+                logging.info(f"aws model score is f1:{obj_score} , accuracy:{aws_metrics.accuracy}")
             else:
                 obj_score = 0
 
@@ -4,6 +4,7 @@ from src.cloud_storage.aws_storage import SimpleStorageService
 from src.exception import myexception
 from src.logger import logging
 from src.entity.s3_estimator import Proj1Estimator
+from src.entity.model_registry import ModelRegistry
 from src.entity.artifact_entity import ModelPusherArtifact,ModelEvaluationArtifact
 from src.entity.config_entity import ModelPusherConfig
                                         
@@ -23,6 +24,12 @@ class ModelPusher:
             logging.info("model saving")
             self.proj1_estimator.save_model(from_file=self.model_eval_artifact.trained_model_path)
             logging.info("saved model")
+            try:
+                if ModelRegistry.notify_model_pushed(bucket_name=self.model_pusher_config.bucket_name,
+                                                     model_path=self.model_eval_artifact.s3_model_path):
+                    logging.info("served model swapped to the pushed model")
+            except Exception as e:
+                logging.warning(f"could not refresh served model after push: {e}")
             model_pusher_artifact = ModelPusherArtifact(bucket_name=self.model_pusher_config.bucket_name,
                                                         s3_model_path=self.model_pusher_config.s3_model_key_path)
             logging.info("model pushed to aws")
@@ -0,0 +1,143 @@
+import os
+import sys
+import time
+import importlib
+from typing import Tuple
+
+import numpy as np
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401 (enables HalvingRandomSearchCV)
+from sklearn.model_selection import HalvingRandomSearchCV, StratifiedKFold
+
+from src.exception import myexception
+from src.logger import logging
+from src.entity.config_entity import ModelTrainerConfig
+from src.utils.main_utils import read_yaml_file
+
+
+def _plain(value):
+    """
+    numpy scalars as python values, so the report is plain yaml
+    """
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class ModelSearch:
+    """
+    Picks the trainer's hyperparameters from the search space in config/model.yaml.
+
+    Candidates are cross validated in a process pool over all cores with successive halving:
+    every round keeps the best 1/factor of the candidates and trains them on factor times
+    more rows, so bad configs are dropped after fits on a small sample. The winner is refit
+    on every training row.
+    """
+    def __init__(self, model_training_config: ModelTrainerConfig) -> None:
+        try:
+            self.model_training_config = model_training_config
+            self.model_config = self.read_model_config()
+            self.search_config = self.model_config["search"]
+        except Exception as e:
+            raise myexception(e, sys)
+
+    def read_model_config(self) -> dict:
+        """
+        model.yaml, with the MODEL_TRAINER constants as the model params it does not set
+        """
+        try:
+            config = self.model_training_config
+            content = {}
+            if os.path.exists(config.model_config_file_path):
+                content = read_yaml_file(config.model_config_file_path) or {}
+            model = content.get("model") or {}
+            params = {"n_estimators": config._n_estimators,
+                      "min_samples_split": config._min_samples_split,
+                      "min_samples_leaf": config._min_samples_leaf,
+                      "max_depth": config._max_depth,
+                      "criterion": config._criterion,
+                      "random_state": config._random_state}
+            params.update(model.get("params") or {})
+            return {"module": model.get("module", "sklearn.ensemble"),
+                    "class": model.get("class", "RandomForestClassifier"),
+                    "params": params,
+                    "search": content.get("search") or {}}
+        except Exception as e:
+            raise myexception(e, sys)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.search_config.get("enabled") and self.search_config.get("search_space"))
+
+    def build_model(self, **params) -> object:
+        """
+        unfitted estimator with the model.yaml params, overridden by params
+        """
+        try:
+            estimator_class = getattr(importlib.import_module(self.model_config["module"]), self.model_config["class"])
+            return estimator_class(**{**self.model_config["params"], **params})
+        except Exception as e:
+            raise myexception(e, sys)
+
+    def fit(self, x_train: np.ndarray, y_train: np.ndarray, **fixed_params) -> Tuple[object, dict]:
+        """
+        fitted best model and a report with the timing and score of every candidate in every round
+        (the model.yaml params as a single fit when search is disabled);
+        fixed_params (e.g. class_weight) override model.yaml for every candidate
+        """
+        try:
+            start = time.perf_counter()
+            if not self.enabled:
+                model = self.build_model(**fixed_params).fit(x_train, y_train)
+                fit_seconds = round(time.perf_counter() - start, 3)
+                logging.info(f"search disabled, trained {self.model_config['class']} in {fit_seconds}s")
+                return model, {"search": False, "params": {**self.model_config["params"], **fixed_params},
+                               "fit_seconds": fit_seconds}
+
+            search = self.search_config
+            # candidates run in parallel processes, so each forest builds its trees on one core
+            base_params = {"n_jobs": 1} if "n_jobs" in self.build_model().get_params() else {}
+            base_params.update(fixed_params)
+            searcher = HalvingRandomSearchCV(
+                estimator=self.build_model(**base_params),
+                param_distributions=search["search_space"],
+                n_candidates=search.get("n_candidates", "exhaust"),
+                factor=search.get("factor", 3),
+                min_resources=search.get("min_resources", "exhaust"),
+                cv=StratifiedKFold(n_splits=search.get("cv", 3), shuffle=True,
+                                   random_state=search.get("random_state")),
+                scoring=search.get("scoring", "f1"),
+                random_state=search.get("random_state"),
+                n_jobs=search.get("n_jobs", -1),
+                refit=True,
+            )
+            searcher.fit(x_train, y_train)
+            search_seconds = round(time.perf_counter() - start, 3)
+
+            results = searcher.cv_results_
+            candidates = [{"round": int(results["iter"][i]),
+                           "rows": int(results["n_resources"][i]),
+                           "params": {key: _plain(value) for key, value in results["params"][i].items()},
+                           "mean_score": round(float(results["mean_test_score"][i]), 6),
+                           "std_score": round(float(results["std_test_score"][i]), 6),
+                           "mean_fit_seconds": round(float(results["mean_fit_time"][i]), 4),
+                           "mean_score_seconds": round(float(results["mean_score_time"][i]), 4)}
+                          for i in range(len(results["params"]))]
+            report = {"search": True,
+                      "method": "successive halving",
+                      "fixed_params": fixed_params,
+                      "rounds": int(searcher.n_iterations_),
+                      "candidates_per_round": [int(n) for n in searcher.n_candidates_],
+                      "rows_per_round": [int(n) for n in searcher.n_resources_],
+                      "best_params": {key: _plain(value) for key, value in searcher.best_params_.items()},
+                      "best_cv_score": round(float(searcher.best_score_), 6),
+                      "refit_seconds": round(float(searcher.refit_time_), 3),
+                      "search_seconds": search_seconds,
+                      "candidates": candidates}
+            logging.info(f"search over {len(candidates)} fits in {search_seconds}s, "
+                         f"best {report['best_params']} cv {search.get('scoring', 'f1')} {report['best_cv_score']}")
+
+            model = searcher.best_estimator_
+            if "n_jobs" in base_params:
+                # the served model predicts with the n_jobs of model.yaml, not the search's single core
+                model.set_params(n_jobs=self.model_config["params"].get("n_jobs"))
+            return model, report
+        except Exception as e:
+            raise myexception(e, sys)
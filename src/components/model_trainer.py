@@ -1,85 +1,190 @@
 import sys
-from typing import Tuple
+import copy
+import time
+from typing import Optional, Tuple
 
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
-
+from sklearn.utils.class_weight import compute_sample_weight
 from src.exception import myexception
 from src.logger import logging
-from src.utils.main_utils import load_numpy_array_data, load_object, save_object
+from src.utils.main_utils import (load_mapped_array, load_object, save_object, peak_rss_mb, precision_dtype,
+                                  write_yaml_file)
+from src.components.model_search import ModelSearch
 from src.entity.config_entity import ModelTrainerConfig
-from src.entity.artifact_entity import DataTransformationArtifact, ModelTrainerArtifact, ClassificationMetricArtifact
+from src.entity.artifact_entity import DataTransformationArtifact, ModelTrainerArtifact
 from src.entity.estimator import MyModel
+from src.utils.artifact_store import ArtifactStore
+from src.utils.metrics import classification_metrics, oob_predict
 
 class ModelTraining:
     def __init__ (self,Data_tranform_artifact : DataTransformationArtifact,
-                  model_training_config : ModelTrainerConfig):
+                  model_training_config : ModelTrainerConfig,
+                  artifact_store : Optional[ArtifactStore] = None,
+                  base_model : Optional[MyModel] = None):
+        """
+        :param base_model: production model to grow (incremental training), None trains from scratch
+        """
         try :
             logging.info("entered training stage")
             self.data_transform_artifact = Data_tranform_artifact
             self.model_training_config = model_training_config
+            self.artifact_store = artifact_store or ArtifactStore()
+            self.base_model = base_model
+            self.training_report: dict = {}
         except Exception as e:
             raise myexception(e,sys)
         
-    def get_model_object_and_report (self ,train : np.array , test : np.array) -> Tuple[object,object] :
+    def get_model_object_and_report (self , x_train : np.array , y_train : np.array ,
+                                     x_test : np.array , y_test : np.array) -> Tuple[object,object] :
         try:
-            logging.info("getting ready with data")
-            x_train, y_train, x_test, y_test = train[:, :-1], train[:, -1], test[:, :-1], test[:, -1]
-
             logging.info("model training stared")
-            model = RandomForestClassifier(
-                n_estimators = self.model_training_config._n_estimators,
-                min_samples_split = self.model_training_config._min_samples_split,
-                min_samples_leaf = self.model_training_config._min_samples_leaf,
-                max_depth = self.model_training_config._max_depth,
-                criterion = self.model_training_config._criterion,
-                random_state = self.model_training_config._random_state
-            )
-
-            model.fit(x_train,y_train)
+            if self.base_model is not None:
+                model, search_report = self.grow_forest(x_train, y_train)
+            else:
+                # without resampling the forest balances the classes through its sample weights instead
+                fixed_params = {"class_weight": "balanced"} if self.data_transform_artifact.resampling == "class_weight" else {}
+                model, search_report = ModelSearch(self.model_training_config).fit(x_train, y_train, **fixed_params)
+            write_yaml_file(self.model_training_config.search_report_file_path, search_report, replace=True)
+            self.training_report = search_report
 
             logging.info("model trained successfully")
 
             y_pred = model.predict(x_test)
 
             logging.info("building matrix")
-
-            accuracy = accuracy_score(y_test, y_pred)
-            f1 = f1_score(y_test, y_pred)
-            precision = precision_score(y_test, y_pred)
-            recall = recall_score(y_test, y_pred)
+            metric_artifact = classification_metrics(y_test, y_pred)
             logging.info("completed matrix building")
 
-            metric_artifact = ClassificationMetricArtifact(accuracy=accuracy,f1_score=f1, precision_score=precision, recall_score=recall)
             return model, metric_artifact
 
         except Exception as e:
             raise myexception(e,sys)
         
+    def grow_forest (self , x_train : np.array , y_train : np.array) -> Tuple[object, dict] :
+        """
+        the production forest plus incremental_new_trees trees fitted (warm start) on the new rows only,
+        the oldest trees dropped above incremental_max_trees; the cost follows the new rows, not the history
+        """
+        try:
+            config = self.model_training_config
+            forest = copy.deepcopy(self.base_model.model_obj)
+            if not hasattr(forest, "warm_start") or not hasattr(forest, "estimators_"):
+                raise Exception(f"{type(forest).__name__} can not be grown incrementally")
+            n_base = len(forest.estimators_)
+            report = {"incremental": True, "base_trees": n_base, "new_rows": int(len(y_train))}
+
+            if len(np.unique(y_train)) < len(forest.classes_):
+                logging.warning("new rows do not contain every class, keeping the production trees unchanged")
+                report.update({"new_trees": 0, "pruned_trees": 0, "trees": n_base, "fit_seconds": 0.0})
+                return forest, report
+
+            start = time.perf_counter()
+            class_weight = forest.class_weight
+            # new rows are not resampled, the new trees weight the classes instead; the weights are
+            # balanced over the new rows only, on purpose, and passed as sample weights because sklearn
+            # does not recompute a class_weight preset for the trees a warm start adds
+            sample_weight = compute_sample_weight("balanced", y_train)
+            forest.set_params(warm_start=True, n_estimators=n_base + config.incremental_new_trees,
+                              class_weight=None)
+            forest.fit(x_train, y_train, sample_weight=sample_weight)
+            pruned = max(0, len(forest.estimators_) - config.incremental_max_trees)
+            if pruned:
+                forest.estimators_ = forest.estimators_[pruned:]
+            forest.set_params(warm_start=False, n_estimators=len(forest.estimators_), class_weight=class_weight)
+
+            report.update({"new_trees": config.incremental_new_trees, "pruned_trees": pruned,
+                           "trees": len(forest.estimators_), "fit_seconds": round(time.perf_counter() - start, 3)})
+            logging.info(f"grew production forest from {n_base} to {len(forest.estimators_)} trees "
+                         f"on {len(y_train)} new rows in {report['fit_seconds']}s")
+            return forest, report
+        except Exception as e:
+            raise myexception(e,sys)
+
+    def baseline_score (self , model : object , x_train : np.array , y_train : np.array) -> float :
+        """
+        training accuracy the gate compares with expected_accuracy; with gate_score "oob" from the
+        forest's out of bag votes instead of a second inference pass over every training row
+        """
+        try:
+            if self.model_training_config.gate_score == "oob":
+                if getattr(model, "bootstrap", False) and hasattr(model, "estimators_"):
+                    # production trees of a grown forest never saw the new rows, every row is out of bag for them
+                    report = self.training_report
+                    unseen_trees = max(0, report["base_trees"] - report["pruned_trees"]) if report.get("incremental") else 0
+                    y_pred, voted = oob_predict(model, x_train, unseen_trees=unseen_trees)
+                    score = classification_metrics(y_train[voted], y_pred[voted]).accuracy
+                    logging.info(f"out of bag accuracy {score:.4f} on {int(voted.sum())} of {len(y_train)} training rows")
+                    return score
+                logging.warning(f"{type(model).__name__} has no out of bag rows, re-predicting the training rows")
+            return classification_metrics(y_train, model.predict(x_train)).accuracy
+        except Exception as e:
+            raise myexception(e,sys)
+
+    @staticmethod
+    def log_memory_report (*arrays : np.array) -> None :
+        """
+        logs how the training arrays are held and the peak RSS, next to what the old single float64
+        train / test matrices (features hstacked with the target) would have had to read into memory
+        """
+        mapped = sum(array.nbytes for array in arrays if isinstance(array, np.memmap))
+        in_memory = sum(array.nbytes for array in arrays) - mapped
+        rows_cols = [(len(x), x.shape[1] + 1) for x in arrays[::2]]
+        hstacked = sum(rows * cols * np.dtype(np.float64).itemsize for rows, cols in rows_cols)
+        peak = peak_rss_mb()
+        logging.info(f"training arrays: {mapped / 2**20:.1f} MB memory-mapped, {in_memory / 2**20:.1f} MB in memory, "
+                     f"float64 hstacked layout would read {hstacked / 2**20:.1f} MB; "
+                     f"peak RSS {'n/a' if peak is None else f'{peak:.0f} MB'}")
+
     def start_training (self) -> ModelTrainerArtifact :
         try:
             logging.info("extracting array")
-            train = load_numpy_array_data(self.data_transform_artifact.transformed_train_file_path)
-            test = load_numpy_array_data(self.data_transform_artifact.transformed_test_file_path)
+            artifact = self.data_transform_artifact
+            # memory mapped once transformation's background writes are done, not held in memory
+            load = lambda path: self.artifact_store.load(path, load_mapped_array, prefer_file=True)
+            x_train = load(artifact.transformed_train_file_path)
+            y_train = load(artifact.transformed_train_target_file_path)
+            x_test = load(artifact.transformed_test_file_path)
+            y_test = load(artifact.transformed_test_target_file_path)
+
+            # a grown model keeps the production model's preprocessing and so its precision
+            precision = self.base_model.precision if self.base_model is not None else self.model_training_config.precision
+            dtype = precision_dtype(precision)
+            if x_train.dtype != dtype:
+                # transformation ran in another precision, a copy is unavoidable
+                logging.warning(f"transformed arrays are {x_train.dtype}, casting to {dtype}")
+                x_train, x_test = x_train.astype(dtype), x_test.astype(dtype)
 
             logging.info("extracting pipeline")
 
-            pipeline = load_object(self.data_transform_artifact.transformed_object_file_path)
+            pipeline = self.artifact_store.load(self.data_transform_artifact.transformed_object_file_path,
+                                                load_object)
 
-            my_model , artifact = self.get_model_object_and_report(train,test)
+            my_model , artifact = self.get_model_object_and_report(x_train, y_train, x_test, y_test)
+            self.log_memory_report(x_train, y_train, x_test, y_test)
 
             logging.info("checcking mocdel accuracy with base line accuracy")
 
 
-            if accuracy_score(train[:, -1], my_model.predict(train[:, :-1])) < self.model_training_config.expected_accuracy:
+            if len(y_train) and self.baseline_score(my_model, x_train, y_train) < self.model_training_config.expected_accuracy:
                 logging.info("No model found with score above the base score")
                 raise Exception("No model found with score above the base score")
             
 
+            # cutoff of the next incremental run: only rows the forest was really fitted on move it
+            trained_max_id = self.data_transform_artifact.max_train_id
+            if self.base_model is not None:
+                base_max_id = self.base_model.trained_max_id
+                if not self.training_report.get("new_trees") or trained_max_id is None:
+                    trained_max_id = base_max_id
+                elif base_max_id is not None:
+                    trained_max_id = max(trained_max_id, base_max_id)
             my_model = MyModel(preprocessing_obj = pipeline ,
-                               model_obj = my_model)
-            save_object(self.model_training_config.trained_model_file_path , my_model)
+                               model_obj = my_model,
+                               precision = precision,
+                               trained_max_id = trained_max_id)
+            # nothing loads the model back, evaluation uses the metrics and the pusher uploads the file
+            self.artifact_store.save(self.model_training_config.trained_model_file_path , my_model, save_object,
+                                     consumers=0)
             
             model_trainer_artifact = ModelTrainerArtifact(
                 trained_model_file_path=self.model_training_config.trained_model_file_path,
@@ -4,6 +4,17 @@ from datetime import date
 DB_NAME = "Proj1"
 COLLECTION_NAME = "Proj1-Data"
 CONNECTION_URL = "MONGODB_URL"
+# documents per cursor round trip and rows per chunk built by proj1.iter_chunks
+MONGO_READ_BATCH_SIZE: int = 10000
+MONGO_READ_CHUNK_SIZE: int = 50000
+# concurrent range cursors per read (each uses its own pooled connection, maxPoolSize is 50)
+MONGO_READ_PARALLELISM: int = 4
+MONGO_PARTITION_FIELD: str = "_id"
+# chunks a range cursor may read ahead of the consumer before it waits
+MONGO_READ_QUEUE_CHUNKS: int = 2
+# documents sampled to pick the range boundaries, and the size below which one cursor is used
+MONGO_SPLIT_SAMPLE_SIZE: int = 1000
+MONGO_PARALLEL_MIN_DOCUMENTS: int = 100000
 
 """
 Data Ingestion related constant start with DATA_INGESTION VAR NAME
@@ -13,9 +24,35 @@ DATA_INGESTION_DIR_NAME: str = "data_ingestion"
 DATA_INGESTION_FEATURE_STORE_DIR: str = "feature_store"
 DATA_INGESTION_INGESTED_DIR: str = "ingested"
 DATA_INGESTION_TRAIN_TEST_SPLIT_RATIO: float = 0.25
+# format of the data.csv / train.csv / test.csv artifacts: "parquet", "feather" or "csv"
+DATA_INGESTION_ARTIFACT_FORMAT: str = "parquet"
+ARTIFACT_PARQUET_COMPRESSION: str = "zstd"
+# persistent local feature store, shared by every training run (not under the timestamped artifact dir)
+DATA_INGESTION_FEATURE_STORE_ROOT: str = "feature_store"
+# "_id" (ObjectId insert order) or "id" (monotonic business key)
+DATA_INGESTION_WATERMARK_FIELD: str = "_id"
+DATA_INGESTION_DEDUP_COLUMN: str = "id"
+# part files kept before the store is compacted into one
+FEATURE_STORE_MAX_PARTS: int = 32
+# an _id watermark is re-read this far back, for documents other writers committed late
+FEATURE_STORE_WATERMARK_OVERLAP_SECONDS: int = 30
 
 PIPELINE_NAME: str = ""
 ARTIFACT_DIR: str = "artifact"
+# "memory": stages hand frames/arrays to the next stage directly, files are written in background
+# "file": every stage reads its inputs back from disk
+ARTIFACT_HANDOFF_MODE: str = "memory"
+# outputs of ingestion / validation / transformation are reused by later runs with the same inputs
+STAGE_CACHE_ENABLED: bool = True
+STAGE_CACHE_DIR: str = os.path.join(ARTIFACT_DIR, "stage_cache")
+# newest cached runs kept per stage, older entries and files only they use are deleted
+STAGE_CACHE_MAX_ENTRIES_PER_STAGE: int = 5
+# per stage wall / cpu time, peak memory and rows, saved in the run's artifact dir
+PIPELINE_PROFILE_FILE_NAME: str = "pipeline_profile.json"
+# how often resident memory is sampled while a stage runs
+PIPELINE_PROFILE_RSS_SAMPLE_SECONDS: float = 0.05
+# also trace python / numpy allocations per stage (slows allocation heavy stages down)
+PIPELINE_PROFILE_TRACEMALLOC: bool = False
 
 MODEL_FILE_NAME = "model.pkl"
 
@@ -33,6 +70,9 @@ Data Validation realted contant start with DATA_VALIDATION VAR NAME
 """
 DATA_VALIDATION_DIR_NAME: str = "data_validation"
 DATA_VALIDATION_REPORT_FILE_NAME: str = "report.yaml"
+# above this many rows content checks run on a random sample of this size (0 = always check every row)
+DATA_VALIDATION_SAMPLE_ROWS: int = 1000000
+DATA_VALIDATION_SAMPLE_CONFIDENCE: float = 0.99
 
 """
 Data Transformation ralated constant start with DATA_TRANSFORMATION VAR NAME
@@ -40,6 +80,25 @@ Data Transformation ralated constant start with DATA_TRANSFORMATION VAR NAME
 DATA_TRANSFORMATION_DIR_NAME: str = "data_transformation"
 DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR: str = "transformed"
 DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR: str = "transformed_object"
+# features (in NUMERIC_PRECISION) and target (int8) are stored as separate contiguous arrays and read memory-mapped
+DATA_TRANSFORMATION_TRAIN_FEATURES_FILE_NAME: str = "train_x.npy"
+DATA_TRANSFORMATION_TRAIN_TARGET_FILE_NAME: str = "train_y.npy"
+DATA_TRANSFORMATION_TEST_FEATURES_FILE_NAME: str = "test_x.npy"
+DATA_TRANSFORMATION_TEST_TARGET_FILE_NAME: str = "test_y.npy"
+TRANSFORMED_ARRAY_MMAP_MODE: str = "r"
+# class imbalance handling of the training split: "smoteenn" (SMOTE + ENN cleaning over every row, slowest),
+# "chunked_smote" (SMOTE with neighbours searched inside random minority chunks), "random_over",
+# "random_under", "class_weight" (no resampling, the forest weights the classes) or "none"
+DATA_TRANSFORMATION_RESAMPLING: str = "chunked_smote"
+# minority rows per neighbour search of chunked_smote, and neighbours per row
+DATA_TRANSFORMATION_SMOTE_CHUNK_SIZE: int = 50000
+DATA_TRANSFORMATION_SMOTE_K_NEIGHBORS: int = 5
+DATA_TRANSFORMATION_RESAMPLING_RANDOM_STATE: int = 42
+# increasing key of the data rows, incremental training only learns from rows above the production model's max
+DATA_TRANSFORMATION_RECENCY_COLUMN: str = DATA_INGESTION_DEDUP_COLUMN
+# "float32" or "float64": dtype of the scalers, transformed arrays, the model's training inputs
+# and of the features the served model computes from raw inputs
+NUMERIC_PRECISION: str = "float32"
 
 """
 MODEL TRAINER related constant start with MODEL_TRAINER var name
@@ -48,7 +107,17 @@ MODEL_TRAINER_DIR_NAME: str = "model_trainer"
 MODEL_TRAINER_TRAINED_MODEL_DIR: str = "trained_model"
 MODEL_TRAINER_TRAINED_MODEL_NAME: str = "model.pkl"
 MODEL_TRAINER_EXPECTED_SCORE: float = 0.6
+# accuracy checked against EXPECTED_SCORE: "train" re-predicts every training row, "oob" uses the
+# out of bag votes of a bagged forest (no extra inference pass, and an honest estimate, so stricter)
+MODEL_TRAINER_GATE_SCORE: str = "train"
 MODEL_TRAINER_MODEL_CONFIG_FILE_PATH: str = os.path.join("config", "model.yaml")
+MODEL_TRAINER_SEARCH_REPORT_FILE_NAME: str = "search_report.yaml"
+# "full": search and fit every tree on the whole history; "incremental": start from the production
+# model, add INCREMENTAL_NEW_TREES trees fitted on rows newer than it and keep the newest MAX_TREES
+MODEL_TRAINER_TRAINING_MODE: str = "full"
+MODEL_TRAINER_INCREMENTAL_NEW_TREES: int = 50
+MODEL_TRAINER_INCREMENTAL_MAX_TREES: int = 300
+# defaults used when config/model.yaml does not set the model params
 MODEL_TRAINER_N_ESTIMATORS=200
 MODEL_TRAINER_MIN_SAMPLES_SPLIT: int = 7
 MODEL_TRAINER_MIN_SAMPLES_LEAF: int = 6
@@ -63,6 +132,48 @@ MODEL_EVALUATION_CHANGED_THRESHOLD_SCORE: float = 0.02
 MODEL_BUCKET_NAME = "mlops-vehicle"
 MODEL_PUSHER_S3_KEY = "model-registry"
 
+"""
+Model registry (prediction side) related constants
+"""
+MODEL_REGISTRY_REFRESH_INTERVAL_SECONDS: int = 300
+# downloads tried while the model keeps changing under the download
+MODEL_REGISTRY_LOAD_ATTEMPTS: int = 3
+
+"""
+Prediction related constants
+"""
+PREDICTION_INPUT_COLUMNS: list = ["Gender", "Age", "Driving_License", "Region_Code", "Previously_Insured",
+                                  "Annual_Premium", "Policy_Sales_Channel", "Vintage", "Vehicle_Age_lt_1_Year",
+                                  "Vehicle_Age_gt_2_Years", "Vehicle_Damage_Yes"]
+PREDICTION_BATCH_MAX_RECORDS: int = 100000
+# flattened forest engine is used up to this many rows, bigger batches go to sklearn's cython predict
+FOREST_ENGINE_MAX_ROWS: int = 4096
+FOREST_ENGINE_CHUNK_SIZE: int = 512
+
+# /predict runs on a bounded pool and is held to this latency budget (server side, warm model)
+PREDICT_EXECUTOR_MAX_WORKERS: int = 8
+PREDICT_LATENCY_BUDGET_P50_MS: float = 5.0
+PREDICT_LATENCY_BUDGET_P99_MS: float = 25.0
+PREDICT_LATENCY_WINDOW: int = 10000
+
+"""
+Micro batching of concurrent single record predictions
+"""
+MICRO_BATCH_ENABLED: bool = True
+MICRO_BATCH_MAX_SIZE: int = 64
+MICRO_BATCH_EWMA_ALPHA: float = 0.2
+
+"""
+Prediction result cache, keyed on model version + feature tuple
+"""
+PREDICTION_CACHE_ENABLED: bool = True
+PREDICTION_CACHE_MAX_ENTRIES: int = 100000
+PREDICTION_CACHE_TTL_SECONDS: float = 3600.0
+PREDICTION_CACHE_MAX_MEMORY_MB: float = 64.0
+# only inputs with fewer rows use the cache: per row keys cost more than scoring a big batch,
+# and one batch must not evict the repeated single quotes the cache is for
+PREDICTION_CACHE_MAX_BATCH_ROWS: int = MICRO_BATCH_MAX_SIZE
+
 
 AWS_ACCESS_KEY_ID_ENV_KEY = "AWS_ACCESS_KEY_ID"
 AWS_SECRET_ACCESS_KEY_ENV_KEY = "AWS_SECRET_ACCESS_KEY"
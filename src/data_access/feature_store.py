@@ -0,0 +1,157 @@
+import os
+import sys
+import json
+import time
+import hashlib
+from datetime import timedelta
+from typing import List, Optional
+
+import pandas as pd
+from bson import ObjectId
+
+from src.constants import FEATURE_STORE_MAX_PARTS, FEATURE_STORE_WATERMARK_OVERLAP_SECONDS
+from src.exception import myexception
+from src.logger import logging
+from src.utils.stage_cache import hash_file
+
+WATERMARK_FILE_NAME = "_watermark.json"
+
+
+class FeatureStore:
+    """
+    Local columnar copy of one mongo collection, kept between training runs.
+
+    Rows are appended as numbered parquet part files, a watermark (max _id or id seen so far)
+    records how far the collection has been copied so the next run only fetches newer documents.
+    Rows are deduplicated on dedup_column when the store is loaded, the newest part wins,
+    and the parts are compacted into one file once there are more than max_parts of them.
+    """
+    def __init__(self, root_dir: str, collection_name: str, dedup_column: str = "id",
+                 max_parts: int = FEATURE_STORE_MAX_PARTS) -> None:
+        self.store_dir = os.path.join(root_dir, collection_name)
+        self.dedup_column = dedup_column
+        self.max_parts = max_parts
+        self.watermark_file_path = os.path.join(self.store_dir, WATERMARK_FILE_NAME)
+        os.makedirs(self.store_dir, exist_ok=True)
+
+    def part_files(self) -> List[str]:
+        parts = [name for name in os.listdir(self.store_dir)
+                 if name.startswith("part-") and name.endswith(".parquet")]
+        return [os.path.join(self.store_dir, name) for name in sorted(parts)]
+
+    def content_hash(self) -> str:
+        """
+        sha256 over the part files, changes whenever rows were appended or the store was compacted
+        """
+        try:
+            digest = hashlib.sha256()
+            for part in self.part_files():
+                digest.update(os.path.basename(part).encode())
+                digest.update(hash_file(part).encode())
+            return digest.hexdigest()
+        except Exception as e:
+            raise myexception(e, sys)
+
+    def _next_part_path(self) -> str:
+        parts = self.part_files()
+        number = int(os.path.basename(parts[-1])[5:-8]) + 1 if parts else 0
+        return os.path.join(self.store_dir, f"part-{number:08d}.parquet")
+
+    @staticmethod
+    def _atomic_write(file_path: str, write) -> None:
+        tmp_path = file_path + ".tmp"
+        write(tmp_path)
+        os.replace(tmp_path, file_path)
+
+    def read_watermark(self, field: str):
+        """
+        last value of field copied into the store, None on the first run (or if field changed)
+        """
+        try:
+            if not os.path.exists(self.watermark_file_path):
+                return None
+            with open(self.watermark_file_path) as file:
+                watermark = json.load(file)
+            if watermark.get("field") != field:
+                logging.warning(f"watermark is on {watermark.get('field')}, not {field}, doing a full load")
+                return None
+            value = watermark["value"]
+            return ObjectId(value) if field == "_id" else value
+        except Exception as e:
+            raise myexception(e, sys)
+
+    @staticmethod
+    def since_query(field: str, watermark, overlap_seconds: int = FEATURE_STORE_WATERMARK_OVERLAP_SECONDS) -> Optional[dict]:
+        """
+        query for the documents not copied yet, None for a full load.
+        an ObjectId is made from the clock of the writer that inserted it, so across writer processes
+        _id is not strictly increasing in commit order: a document can be committed after the watermark
+        already passed its _id. the _id query reaches overlap_seconds back past the watermark, rows read
+        twice are dropped by the dedup on load. writers whose clocks (or inserts in flight) are further
+        apart than that can still be missed, and so can an id field the writers do not hand out in order.
+        """
+        if watermark is None:
+            return None
+        if field == "_id" and overlap_seconds:
+            watermark = ObjectId.from_datetime(watermark.generation_time - timedelta(seconds=overlap_seconds))
+        return {field: {"$gt": watermark}}
+
+    def write_watermark(self, field: str, value, rows: int) -> None:
+        try:
+            content = {"field": field,
+                       "value": str(value) if field == "_id" else value,
+                       "rows_appended": rows,
+                       "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+            def write(path):
+                with open(path, "w") as file:
+                    json.dump(content, file)
+
+            self._atomic_write(self.watermark_file_path, write)
+        except Exception as e:
+            raise myexception(e, sys)
+
+    def append(self, dataframe: pd.DataFrame) -> Optional[str]:
+        """
+        writes dataframe as a new part file, rows repeated inside it keep only their last copy
+        """
+        try:
+            if len(dataframe) == 0:
+                return None
+            if self.dedup_column in dataframe.columns:
+                dataframe = dataframe.drop_duplicates(subset=[self.dedup_column], keep="last")
+            part_path = self._next_part_path()
+            self._atomic_write(part_path, lambda path: dataframe.to_parquet(path, index=False))
+            logging.info(f"appended {len(dataframe)} rows to feature store part {part_path}")
+            return part_path
+        except Exception as e:
+            raise myexception(e, sys)
+
+    def load(self) -> pd.DataFrame:
+        """
+        every stored row, deduplicated on dedup_column (a row from a later part replaces an earlier one)
+        """
+        try:
+            parts = self.part_files()
+            if not parts:
+                return pd.DataFrame()
+            dataframe = pd.concat([pd.read_parquet(part) for part in parts], ignore_index=True)
+            if self.dedup_column in dataframe.columns:
+                dataframe = dataframe.drop_duplicates(subset=[self.dedup_column], keep="last")
+            dataframe = dataframe.reset_index(drop=True)
+            if len(parts) > self.max_parts:
+                self.compact(dataframe, parts)
+            return dataframe
+        except Exception as e:
+            raise myexception(e, sys)
+
+    def compact(self, dataframe: pd.DataFrame, parts: List[str]) -> None:
+        """
+        rewrites the deduplicated store as one part; the new part sorts after the old ones,
+        so a crash before they are deleted still loads the same rows
+        """
+        compacted_path = self._next_part_path()
+        self._atomic_write(compacted_path, lambda path: dataframe.to_parquet(path, index=False))
+        for part in parts:
+            os.remove(part)
+        logging.info(f"compacted {len(parts)} feature store parts into {compacted_path}")
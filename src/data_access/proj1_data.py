@@ -1,12 +1,40 @@
 import sys
+import queue
+import itertools
+import threading
 import pandas as pd
 import numpy as np
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 from src.configuration.mongo_db_connection import mongoDB_connection
 from src.logger import logging
 from src.exception import myexception
-from src.constants import DB_NAME
+from src.constants import (DB_NAME, SCHEMA_FILE_PATH, MONGO_READ_BATCH_SIZE, MONGO_READ_CHUNK_SIZE,
+                           MONGO_READ_PARALLELISM, MONGO_PARTITION_FIELD, MONGO_SPLIT_SAMPLE_SIZE,
+                           MONGO_PARALLEL_MIN_DOCUMENTS, MONGO_READ_QUEUE_CHUNKS)
+from src.utils.main_utils import read_yaml_file, to_storage_dtype
+from pandas.api.types import union_categoricals
+
+# values stored in the collection for a missing field
+MISSING_VALUES = ("na", "", None)
+
+
+def load_schema_dtypes(schema_file_path: str = SCHEMA_FILE_PATH) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    (column -> schema type (int, float, category), column -> storage dtype) from schema.yaml,
+    both empty if the file is not found
+    """
+    try:
+        schema = read_yaml_file(schema_file_path)
+    except Exception as e:
+        logging.warning(f"schema not loaded, reading every column untyped: {e}")
+        return {}, {}
+    dtypes = {}
+    for column in schema.get("columns", []):
+        dtypes.update(column)
+    return dtypes, schema.get("storage_dtypes", {}) or {}
+
 
 class proj1:
     """
@@ -18,28 +46,249 @@ class proj1:
         """
         try:
             self.client = mongoDB_connection(DB_NAME)
+            self.schema_dtypes, self.storage_dtypes = load_schema_dtypes()
             logging.info("build sucess ful connection with mongoDB")
         except Exception as e:
             raise myexception(e,sys)
-    
-    def collect_in_df (self,collection_name : str,database_name : Optional[str] = None) -> pd.DataFrame:
+
+    def get_collection(self, collection_name: str, database_name: Optional[str] = None):
+        if database_name == None:
+            return self.client.database[collection_name]
+        return self.client.client[database_name][collection_name]
+
+    def _column_array(self, column: str, values: list):
         """
-        this function collects data from mongodb and returns dataframe
+        one typed column of a chunk, in its storage dtype if the schema has one
         """
-        try:
-            if database_name == None:
-                collection = self.client.database[collection_name]
+        array = self._typed_array(column, values)
+        storage_dtype = self.storage_dtypes.get(column)
+        if storage_dtype is None:
+            return array
+        return to_storage_dtype(pd.Series(array, name=column, copy=False), storage_dtype).values
+
+    def _typed_array(self, column: str, values: list) -> np.ndarray:
+        """
+        int64 (float64 if it has missing values) for numeric schema columns,
+        object with "na" turned into NaN for the rest
+        """
+        dtype = self.schema_dtypes.get(column)
+        if dtype in ("int", "float"):
+            try:
+                # fast path, None already becomes NaN here
+                array = np.array(values, dtype=np.float64)
+            except (TypeError, ValueError):
+                array = np.array([np.nan if value in MISSING_VALUES else value for value in values],
+                                 dtype=np.float64)
+            if dtype == "int" and not np.isnan(array).any():
+                array = array.astype(np.int64)
+            return array
+        array = np.array(values, dtype=object)
+        array[np.fromiter((value in MISSING_VALUES for value in values), dtype=bool, count=len(values))] = np.nan
+        return array
+
+    def _iter_column_chunks(self, collection_name: str, database_name: Optional[str],
+                            chunk_size: int, batch_size: int,
+                            columns: Optional[List[str]], query: Optional[dict] = None,
+                            include_id: bool = False) -> Iterator[Dict[str, np.ndarray]]:
+        collection = self.get_collection(collection_name, database_name)
+        if columns is not None:
+            projection = {column: 1 for column in columns}
+            if include_id:
+                columns = ["_id"] + [column for column in columns if column != "_id"]
             else:
-                collection = self.client[database_name][collection_name]
-            
-            data = collection.find()
-            df = pd.DataFrame(list(data))
+                projection["_id"] = 0
+        else:
+            projection = None if include_id else {"_id": 0}
+        cursor = collection.find(query or {}, projection, batch_size=batch_size)
+        try:
+            while True:
+                documents = list(itertools.islice(cursor, chunk_size))
+                if not documents:
+                    return
+                chunk_columns = columns
+                if chunk_columns is None:
+                    chunk_columns = list(dict.fromkeys(itertools.chain.from_iterable(documents)))
+                yield {column: self._column_array(column, [document.get(column) for document in documents])
+                       for column in chunk_columns}
+                del documents
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _concat_arrays(arrays: list):
+        if len(arrays) == 1:
+            return arrays[0]
+        if any(isinstance(array, pd.Categorical) for array in arrays):
+            # chunks may have seen different categories, the union is kept sorted like to_storage_dtype does
+            return union_categoricals([array if isinstance(array, pd.Categorical) else pd.Categorical(array)
+                                       for array in arrays], sort_categories=True)
+        return np.concatenate(arrays)
+
+    @classmethod
+    def _concat_column_chunks(cls, chunks: Iterable[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+        """
+        joins column chunks in order, a column missing from some chunks is NaN there
+        """
+        column_chunks: Dict[str, List[np.ndarray]] = {}
+        n_rows = 0
+        for chunk in chunks:
+            chunk_rows = len(next(iter(chunk.values()))) if chunk else 0
+            for column, array in chunk.items():
+                if column not in column_chunks:
+                    # column first seen in a later chunk, earlier rows are missing
+                    column_chunks[column] = [np.full(n_rows, np.nan, dtype=object)] if n_rows else []
+                column_chunks[column].append(array)
+            for column, arrays in column_chunks.items():
+                if column not in chunk:
+                    arrays.append(np.full(chunk_rows, np.nan, dtype=object))
+            n_rows += chunk_rows
+        return {column: cls._concat_arrays(arrays) for column, arrays in column_chunks.items()}
+
+    def split_points(self, collection_name: str, n_partitions: int, database_name: Optional[str] = None,
+                     field: str = MONGO_PARTITION_FIELD, query: Optional[dict] = None,
+                     sample_size: int = MONGO_SPLIT_SAMPLE_SIZE) -> list:
+        """
+        up to n_partitions - 1 increasing values of field, picked from a random sample of the
+        documents so that the ranges between them hold about the same number of documents
+        empty if the collection is too small to be worth splitting
+        """
+        collection = self.get_collection(collection_name, database_name)
+        if query is None and collection.estimated_document_count() < MONGO_PARALLEL_MIN_DOCUMENTS:
+            return []
+        pipeline = [{"$match": query}] if query else []
+        pipeline += [{"$sample": {"size": sample_size}},
+                     {"$project": {field: 1} if field == "_id" else {"_id": 0, field: 1}}]
+        samples = sorted(document[field] for document in collection.aggregate(pipeline) if field in document)
+        if len(samples) < sample_size:
+            return []
+        points = []
+        for i in range(1, n_partitions):
+            point = samples[i * len(samples) // n_partitions]
+            if not points or point > points[-1]:
+                points.append(point)
+        return points
+
+    def partition_queries(self, collection_name: str, parallelism: int, database_name: Optional[str] = None,
+                          field: str = MONGO_PARTITION_FIELD, query: Optional[dict] = None) -> List[Optional[dict]]:
+        """
+        query split into consecutive field ranges [point_i, point_i+1), in field order
+        (documents without field only match if parallelism is 1, use a field every document has)
+        """
+        if parallelism <= 1:
+            return [query]
+        points = self.split_points(collection_name, parallelism, database_name, field=field, query=query)
+        if not points:
+            return [query]
+        bounds = [None] + points + [None]
+        queries = []
+        for low, high in zip(bounds[:-1], bounds[1:]):
+            condition = {}
+            if low is not None:
+                condition["$gte"] = low
+            if high is not None:
+                condition["$lt"] = high
+            range_query = {field: condition}
+            queries.append({"$and": [query, range_query]} if query else range_query)
+        return queries
 
-            logging.info("extracted data and converted to df")
+    def _iter_partitions(self, collection_name: str, database_name: Optional[str],
+                         chunk_size: int, batch_size: int, columns: Optional[List[str]],
+                         query: Optional[dict], include_id: bool, parallelism: int,
+                         partition_field: str,
+                         queue_chunks: int = MONGO_READ_QUEUE_CHUNKS) -> Iterator[Dict[str, np.ndarray]]:
+        """
+        reads the field ranges concurrently (one cursor, and pooled connection, per range)
+        and yields their chunks in range order as they arrive
+        each range reads at most queue_chunks chunks ahead of the consumer, so about
+        parallelism * (queue_chunks + 1) chunks are held at a time whatever the collection size
+        """
+        queries = self.partition_queries(collection_name, parallelism, database_name,
+                                         field=partition_field, query=query)
+        logging.info(f"reading {collection_name} in {len(queries)} partitions on {partition_field}")
+        queues = [queue.Queue(maxsize=max(1, queue_chunks)) for _ in queries]
+        stopped = threading.Event()
+        done = object()
 
-            if "_id" in df.columns.to_list():
-                df = df.drop(columns=["_id"], axis=1)
-            df.replace({"na":np.nan},inplace=True)
+        def put(chunk_queue, item) -> bool:
+            # gives up once the consumer stopped, instead of blocking on a queue nobody drains
+            while not stopped.is_set():
+                try:
+                    chunk_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def read_partition(partition_query, chunk_queue):
+            try:
+                for chunk in self._iter_column_chunks(collection_name, database_name, chunk_size, batch_size,
+                                                      columns, partition_query, include_id):
+                    if not put(chunk_queue, chunk):
+                        return
+                put(chunk_queue, done)
+            except BaseException as e:
+                put(chunk_queue, e)
+
+        with ThreadPoolExecutor(max_workers=len(queries), thread_name_prefix="mongo-read") as executor:
+            for partition_query, chunk_queue in zip(queries, queues):
+                executor.submit(read_partition, partition_query, chunk_queue)
+            try:
+                for chunk_queue in queues:
+                    while True:
+                        item = chunk_queue.get()
+                        if item is done:
+                            break
+                        if isinstance(item, BaseException):
+                            raise item
+                        if item:
+                            yield item
+                        del item
+            finally:
+                # lets the readers still running (consumer stopped early or a range failed) close their cursors
+                stopped.set()
+
+    def iter_chunks(self, collection_name: str, database_name: Optional[str] = None,
+                    chunk_size: int = MONGO_READ_CHUNK_SIZE, batch_size: int = MONGO_READ_BATCH_SIZE,
+                    columns: Optional[List[str]] = None, query: Optional[dict] = None,
+                    include_id: bool = False, parallelism: int = 1,
+                    partition_field: str = MONGO_PARTITION_FIELD) -> Iterator[pd.DataFrame]:
+        """
+        streams the documents matching query as typed DataFrames of at most chunk_size rows
+        (without _id unless include_id), only chunk_size documents are held as dicts at a time
+        with parallelism > 1 the collection is read as parallelism concurrent partition_field
+        ranges and their chunks are yielded in range order
+        """
+        try:
+            if parallelism > 1:
+                chunks = self._iter_partitions(collection_name, database_name, chunk_size, batch_size,
+                                               columns, query, include_id, parallelism, partition_field)
+            else:
+                chunks = self._iter_column_chunks(collection_name, database_name, chunk_size, batch_size,
+                                                  columns, query, include_id)
+            for chunk in chunks:
+                yield pd.DataFrame(chunk, copy=False)
+        except Exception as e:
+            raise myexception(e,sys)
+
+    def collect_in_df (self,collection_name : str,database_name : Optional[str] = None,
+                       chunk_size: int = MONGO_READ_CHUNK_SIZE, batch_size: int = MONGO_READ_BATCH_SIZE,
+                       columns: Optional[List[str]] = None, query: Optional[dict] = None,
+                       parallelism: int = MONGO_READ_PARALLELISM,
+                       partition_field: str = MONGO_PARTITION_FIELD) -> pd.DataFrame:
+        """
+        this function collects data from mongodb and returns dataframe
+        reads the cursor chunk by chunk (parallelism concurrent ranges) into typed column arrays
+        and joins them once at the end
+        """
+        try:
+            if parallelism > 1:
+                chunks = self._iter_partitions(collection_name, database_name, chunk_size, batch_size,
+                                               columns, query, False, parallelism, partition_field)
+            else:
+                chunks = self._iter_column_chunks(collection_name, database_name, chunk_size, batch_size,
+                                                  columns, query)
+            df = pd.DataFrame(self._concat_column_chunks(chunks), copy=False)
+            logging.info(f"extracted {len(df)} rows in typed chunks and converted to df")
             return df
         except Exception as e:
             raise myexception(e,sys)
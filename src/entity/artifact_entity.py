@@ -1,10 +1,12 @@
 from dataclasses import dataclass
+from typing import Optional
 
 
 @dataclass
 class DataIngestionArtifact:
     trained_file_path:str 
     test_file_path:str
+    file_format:str = "csv"
 
 @dataclass
 class DataValidationArtifact:
@@ -17,6 +19,10 @@ class DataTransformationArtifact:
     transformed_object_file_path:str 
     transformed_train_file_path:str
     transformed_test_file_path:str
+    transformed_train_target_file_path:str
+    transformed_test_target_file_path:str
+    resampling:str = "smoteenn"
+    max_train_id:Optional[int] = None
 
 @dataclass
 class ClassificationMetricArtifact:
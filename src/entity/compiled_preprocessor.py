@@ -0,0 +1,142 @@
+import sys
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.preprocessing import StandardScaler, MinMaxScaler, FunctionTransformer
+
+from src.exception import myexception
+
+
+class CompiledPreprocessor:
+    """
+    Pandas free replacement for the fitted preprocessing pipeline.
+
+    The ColumnTransformer (StandardScaler / MinMaxScaler / passthrough) is flattened into
+    an output column order plus per column (subtract, divide, multiply, add) arrays, applied
+    in place with the same operations sklearn uses so the result is bit for bit identical.
+    Features are computed in dtype, the precision the pipeline was fitted in (float32 or float64).
+    """
+    def __init__(self, preprocessing_obj: object, dtype=np.float64) -> None:
+        """
+        :param preprocessing_obj: fitted Pipeline wrapping a ColumnTransformer, or the ColumnTransformer itself
+        :param dtype: dtype raw inputs and the fitted parameters are cast to (sklearn's scalers do the same)
+        """
+        try:
+            self.dtype = np.dtype(dtype)
+            column_transformer = self._get_column_transformer(preprocessing_obj)
+            self.input_columns: List[str] = list(column_transformer.feature_names_in_)
+            n_inputs = len(self.input_columns)
+
+            order, sub, div, mul, add = [], [], [], [], []
+            clip_low, clip_high = [], []
+            for name, transformer, columns in column_transformer.transformers_:
+                if transformer == "drop":
+                    continue
+                indices = self._column_indices(columns)
+                if len(indices) == 0:
+                    continue
+                n = len(indices)
+                t_sub, t_div, t_mul, t_add = np.zeros(n), np.ones(n), np.ones(n), np.zeros(n)
+                t_low, t_high = np.full(n, -np.inf), np.full(n, np.inf)
+
+                if isinstance(transformer, StandardScaler):
+                    if transformer.with_mean:
+                        t_sub = np.asarray(transformer.mean_, dtype=np.float64)
+                    if transformer.with_std:
+                        t_div = np.asarray(transformer.scale_, dtype=np.float64)
+                elif isinstance(transformer, MinMaxScaler):
+                    t_mul = np.asarray(transformer.scale_, dtype=np.float64)
+                    t_add = np.asarray(transformer.min_, dtype=np.float64)
+                    if transformer.clip:
+                        t_low = np.full(n, transformer.feature_range[0], dtype=np.float64)
+                        t_high = np.full(n, transformer.feature_range[1], dtype=np.float64)
+                elif isinstance(transformer, FunctionTransformer) and transformer.func is None:
+                    pass  # fitted "passthrough" remainder
+                elif transformer != "passthrough":
+                    raise ValueError(f"transformer {name} ({type(transformer).__name__}) can not be compiled")
+
+                order.extend(indices)
+                sub.append(t_sub); div.append(t_div); mul.append(t_mul); add.append(t_add)
+                clip_low.append(t_low); clip_high.append(t_high)
+
+            self.output_order = np.asarray(order, dtype=np.intp)
+            self.n_features = len(order)
+            self._sub = np.concatenate(sub).astype(self.dtype)
+            self._div = np.concatenate(div).astype(self.dtype)
+            self._mul = np.concatenate(mul).astype(self.dtype)
+            self._add = np.concatenate(add).astype(self.dtype)
+            self._clip_low = np.concatenate(clip_low).astype(self.dtype)
+            self._clip_high = np.concatenate(clip_high).astype(self.dtype)
+            self._needs_clip = bool(np.isfinite(self._clip_low).any() or np.isfinite(self._clip_high).any())
+
+            # where each input column lands in the output row, -1 if dropped
+            self.scatter = np.full(n_inputs, -1, dtype=np.intp)
+            self.scatter[self.output_order] = np.arange(self.n_features)
+            self._all_inputs_kept = bool((self.scatter >= 0).all())
+        except Exception as e:
+            raise myexception(e, sys)
+
+    @staticmethod
+    def _get_column_transformer(preprocessing_obj: object) -> ColumnTransformer:
+        if isinstance(preprocessing_obj, ColumnTransformer):
+            return preprocessing_obj
+        steps = getattr(preprocessing_obj, "steps", None)
+        if steps and len(steps) == 1 and isinstance(steps[0][1], ColumnTransformer):
+            return steps[0][1]
+        raise ValueError(f"can not compile preprocessing object of type {type(preprocessing_obj).__name__}")
+
+    def _column_indices(self, columns) -> List[int]:
+        if isinstance(columns, (str, int)):
+            columns = [columns]
+        if isinstance(columns, slice) or callable(columns):
+            raise ValueError("slice / callable column selectors can not be compiled")
+        columns = list(columns)
+        if len(columns) and isinstance(columns[0], (bool, np.bool_)):
+            return [i for i, keep in enumerate(columns) if keep]
+        return [self.input_columns.index(c) if isinstance(c, str) else int(c) for c in columns]
+
+    def _apply(self, features: np.ndarray) -> np.ndarray:
+        features -= self._sub
+        features /= self._div
+        features *= self._mul
+        features += self._add
+        if self._needs_clip:
+            np.clip(features, self._clip_low, self._clip_high, out=features)
+        return features
+
+    def transform(self, array: np.ndarray, columns: Optional[Sequence[str]] = None) -> np.ndarray:
+        """
+        transforms a raw (n, n_inputs) array whose columns are input_columns (or columns, if given)
+        """
+        try:
+            array = np.asarray(array, dtype=self.dtype)
+            if array.ndim == 1:
+                array = array.reshape(1, -1)
+            if columns is not None and list(columns) != self.input_columns:
+                array = array[:, [list(columns).index(c) for c in self.input_columns]]
+            return self._apply(array[:, self.output_order])
+        except Exception as e:
+            raise myexception(e, sys)
+
+    def transform_frame(self, dataframe: pd.DataFrame) -> np.ndarray:
+        try:
+            return self.transform(dataframe[self.input_columns].to_numpy(dtype=self.dtype))
+        except Exception as e:
+            raise myexception(e, sys)
+
+    def transform_values(self, values: Sequence[float]) -> np.ndarray:
+        """
+        writes one record (values in input_columns order) straight into an output-ordered row
+        """
+        try:
+            row = np.empty((1, self.n_features), dtype=self.dtype)
+            if self._all_inputs_kept:
+                row[0, self.scatter] = values
+            else:
+                kept = self.scatter >= 0
+                row[0, self.scatter[kept]] = np.asarray(values, dtype=self.dtype)[kept]
+            return self._apply(row)
+        except Exception as e:
+            raise myexception(e, sys)
@@ -1,6 +1,7 @@
 import os
 from src.constants import *
 from dataclasses import dataclass
+from src.utils.main_utils import with_artifact_format
 from datetime import datetime
 
 TIMESTAMP: str = datetime.now().strftime("%m_%d_%Y_%H_%M_%S")
@@ -10,6 +11,12 @@ class TrainingPipelineConfig:
     pipeline_name: str = PIPELINE_NAME
     artifact_dir: str = os.path.join(ARTIFACT_DIR, TIMESTAMP)
     timestamp: str = TIMESTAMP
+    artifact_handoff: str = ARTIFACT_HANDOFF_MODE
+    stage_cache: bool = STAGE_CACHE_ENABLED
+    stage_cache_dir: str = STAGE_CACHE_DIR
+    profile_file_path: str = os.path.join(ARTIFACT_DIR, TIMESTAMP, PIPELINE_PROFILE_FILE_NAME)
+    profile_rss_sample_seconds: float = PIPELINE_PROFILE_RSS_SAMPLE_SECONDS
+    profile_tracemalloc: bool = PIPELINE_PROFILE_TRACEMALLOC
 
 
 training_pipeline_config: TrainingPipelineConfig = TrainingPipelineConfig()
@@ -22,29 +29,61 @@ class DataIngestionConfig:
     testing_file_path: str = os.path.join(data_ingestion_dir, DATA_INGESTION_INGESTED_DIR, TEST_FILE_NAME)
     train_test_split_ratio: float = DATA_INGESTION_TRAIN_TEST_SPLIT_RATIO
     collection_name:str = DATA_INGESTION_COLLECTION_NAME
+    feature_store_root: str = DATA_INGESTION_FEATURE_STORE_ROOT
+    watermark_field: str = DATA_INGESTION_WATERMARK_FIELD
+    watermark_overlap_seconds: int = FEATURE_STORE_WATERMARK_OVERLAP_SECONDS
+    dedup_column: str = DATA_INGESTION_DEDUP_COLUMN
+    artifact_format: str = DATA_INGESTION_ARTIFACT_FORMAT
+    read_parallelism: int = MONGO_READ_PARALLELISM
+
+    def __post_init__(self):
+        # file extensions follow artifact_format
+        self.feature_store_file_path = with_artifact_format(self.feature_store_file_path, self.artifact_format)
+        self.training_file_path = with_artifact_format(self.training_file_path, self.artifact_format)
+        self.testing_file_path = with_artifact_format(self.testing_file_path, self.artifact_format)
 
 @dataclass
 class DataValidationConfig:
     data_validation_dir: str = os.path.join(training_pipeline_config.artifact_dir, DATA_VALIDATION_DIR_NAME)
     validation_report_file_path: str = os.path.join(data_validation_dir, DATA_VALIDATION_REPORT_FILE_NAME)
+    sample_rows: int = DATA_VALIDATION_SAMPLE_ROWS
+    sample_confidence: float = DATA_VALIDATION_SAMPLE_CONFIDENCE
 
 @dataclass
 class DataTransformationConfig:
     data_transformation_dir: str = os.path.join(training_pipeline_config.artifact_dir, DATA_TRANSFORMATION_DIR_NAME)
     transformed_train_file_path: str = os.path.join(data_transformation_dir, DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
-                                                    TRAIN_FILE_NAME.replace("csv", "npy"))
+                                                    DATA_TRANSFORMATION_TRAIN_FEATURES_FILE_NAME)
+    transformed_train_target_file_path: str = os.path.join(data_transformation_dir,
+                                                           DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
+                                                           DATA_TRANSFORMATION_TRAIN_TARGET_FILE_NAME)
     transformed_test_file_path: str = os.path.join(data_transformation_dir, DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
-                                                   TEST_FILE_NAME.replace("csv", "npy"))
+                                                   DATA_TRANSFORMATION_TEST_FEATURES_FILE_NAME)
+    transformed_test_target_file_path: str = os.path.join(data_transformation_dir,
+                                                          DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR,
+                                                          DATA_TRANSFORMATION_TEST_TARGET_FILE_NAME)
     transformed_object_file_path: str = os.path.join(data_transformation_dir,
                                                      DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR,
                                                      PREPROCSSING_OBJECT_FILE_NAME)
+    precision: str = NUMERIC_PRECISION
+    resampling: str = DATA_TRANSFORMATION_RESAMPLING
+    smote_chunk_size: int = DATA_TRANSFORMATION_SMOTE_CHUNK_SIZE
+    smote_k_neighbors: int = DATA_TRANSFORMATION_SMOTE_K_NEIGHBORS
+    resampling_random_state: int = DATA_TRANSFORMATION_RESAMPLING_RANDOM_STATE
+    recency_column: str = DATA_TRANSFORMATION_RECENCY_COLUMN
     
 @dataclass
 class ModelTrainerConfig:
     model_trainer_dir: str = os.path.join(training_pipeline_config.artifact_dir, MODEL_TRAINER_DIR_NAME)
     trained_model_file_path: str = os.path.join(model_trainer_dir, MODEL_TRAINER_TRAINED_MODEL_DIR, MODEL_FILE_NAME)
     expected_accuracy: float = MODEL_TRAINER_EXPECTED_SCORE
+    gate_score: str = MODEL_TRAINER_GATE_SCORE
     model_config_file_path: str = MODEL_TRAINER_MODEL_CONFIG_FILE_PATH
+    search_report_file_path: str = os.path.join(model_trainer_dir, MODEL_TRAINER_SEARCH_REPORT_FILE_NAME)
+    training_mode: str = MODEL_TRAINER_TRAINING_MODE
+    incremental_new_trees: int = MODEL_TRAINER_INCREMENTAL_NEW_TREES
+    incremental_max_trees: int = MODEL_TRAINER_INCREMENTAL_MAX_TREES
+    precision: str = NUMERIC_PRECISION
     _n_estimators = MODEL_TRAINER_N_ESTIMATORS
     _min_samples_split = MODEL_TRAINER_MIN_SAMPLES_SPLIT
     _min_samples_leaf = MODEL_TRAINER_MIN_SAMPLES_LEAF
@@ -66,4 +105,19 @@ class ModelPusherConfig:
 @dataclass
 class VehiclePredictorConfig:
     model_file_path: str = MODEL_FILE_NAME
-    model_bucket_name: str = MODEL_BUCKET_NAME
\ No newline at end of file
+    model_bucket_name: str = MODEL_BUCKET_NAME
+    model_refresh_interval: int = MODEL_REGISTRY_REFRESH_INTERVAL_SECONDS
+
+@dataclass
+class MicroBatcherConfig:
+    enabled: bool = MICRO_BATCH_ENABLED
+    max_batch_size: int = MICRO_BATCH_MAX_SIZE
+    ewma_alpha: float = MICRO_BATCH_EWMA_ALPHA
+
+@dataclass
+class PredictionCacheConfig:
+    enabled: bool = PREDICTION_CACHE_ENABLED
+    max_entries: int = PREDICTION_CACHE_MAX_ENTRIES
+    ttl_seconds: float = PREDICTION_CACHE_TTL_SECONDS
+    max_memory_mb: float = PREDICTION_CACHE_MAX_MEMORY_MB
+    max_batch_rows: int = PREDICTION_CACHE_MAX_BATCH_ROWS
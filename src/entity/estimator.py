@@ -2,32 +2,117 @@ import os
 import sys
 import pandas as pd
 import numpy as np
+from typing import Optional, Sequence
 from src.logger import logging
 from src.exception import myexception
+from src.constants import FOREST_ENGINE_MAX_ROWS
+from src.entity.compiled_preprocessor import CompiledPreprocessor
+from src.entity.forest_engine import FlatForest
+from sklearn.ensemble import RandomForestClassifier, ExtraTreesClassifier
 from imblearn.pipeline import pipeline
 
 class MyModel :
-    def __init__ (self,preprocessing_obj : pipeline , model_obj : object) :
+    def __init__ (self,preprocessing_obj : pipeline , model_obj : object , precision : str = "float64" ,
+                  trained_max_id : Optional[int] = None) :
+        """
+        :param precision: dtype the preprocessing was fitted in, raw inputs are cast to it before transforming
+        :param trained_max_id: highest recency key (id) of the rows the model has learned from
+        """
         try:
             self.preprocessing_obj = preprocessing_obj
             self.model_obj = model_obj
+            self.precision = precision
+            self.trained_max_id = trained_max_id
         except Exception as e:
-            raise myexception(e,sys) 
-        
+            raise myexception(e,sys)
+
+    def __setstate__(self, state):
+        # models pickled before the precision mode were trained in float64
+        state.setdefault("precision", "float64")
+        state.setdefault("trained_max_id", None)
+        self.__dict__.update(state)
+
+    def __getstate__(self):
+        # compiled helpers are rebuilt from the fitted objects, never pickled
+        state = self.__dict__.copy()
+        state.pop("_compiled_preprocessor", None)
+        state.pop("_compiled_model", None)
+        return state
+
+    @property
+    def compiled_preprocessor(self) -> Optional[CompiledPreprocessor]:
+        """
+        pandas free version of preprocessing_obj, built on first use
+        None if the pipeline has steps that can not be compiled (sklearn path is used then)
+        """
+        if "_compiled_preprocessor" not in self.__dict__:
+            try:
+                self._compiled_preprocessor = CompiledPreprocessor(self.preprocessing_obj, dtype=self.precision)
+            except Exception as e:
+                logging.warning(f"falling back to sklearn preprocessing: {e}")
+                self._compiled_preprocessor = None
+        return self._compiled_preprocessor
+
+    @property
+    def compiled_model(self) -> Optional[FlatForest]:
+        """
+        flattened array version of model_obj for forests, built on first use
+        None for other model types (model_obj.predict is used then)
+        """
+        if "_compiled_model" not in self.__dict__:
+            self._compiled_model = None
+            if isinstance(self.model_obj, (RandomForestClassifier, ExtraTreesClassifier)):
+                try:
+                    self._compiled_model = FlatForest(self.model_obj)
+                except Exception as e:
+                    logging.warning(f"falling back to sklearn forest predict: {e}")
+        return self._compiled_model
+
+    def predict_features(self, features : np.ndarray) -> np.ndarray:
+        compiled = self.compiled_model
+        if compiled is not None and len(features) <= FOREST_ENGINE_MAX_ROWS:
+            return compiled.predict(features)
+        return self.model_obj.predict(features)
+
+    def transform(self, dataframe : pd.DataFrame) -> np.ndarray:
+        compiled = self.compiled_preprocessor
+        if compiled is not None:
+            return compiled.transform_frame(dataframe)
+        return self.preprocessing_obj.transform(self._cast(dataframe))
+
+    def _cast(self, dataframe : pd.DataFrame) -> pd.DataFrame:
+        if self.precision == "float64":
+            return dataframe
+        return dataframe.astype(self.precision)
+
     def prediction (self , dataframe : pd.DataFrame) :
         try:
             logging.info("started prediction")
-            features = self.preprocessing_obj.transform(dataframe)
-            features = self.model_obj.predict(features)
+            features = self.transform(dataframe)
+            features = self.predict_features(features)
             logging.info("prediction done sucessfully")
             return features
         except Exception as e:
             raise myexception(e,sys)
-        
+
+    def prediction_with_raw_array (self , array : np.array , columns : Sequence[str]) :
+        """
+        prediction for raw (untransformed) rows whose columns are given by columns
+        """
+        try:
+            compiled = self.compiled_preprocessor
+            if compiled is not None:
+                features = compiled.transform(array, columns=columns)
+            else:
+                features = self.preprocessing_obj.transform(self._cast(pd.DataFrame(array, columns=list(columns))))
+            return self.predict_features(features)
+        except Exception as e:
+            raise myexception(e,sys)
+
     def prediction_with_array (self , array : np.array) :
         try:
             logging.info("started prediction")
-            features = self.model_obj.predict(array)
+            features = self.predict_features(array)
             logging.info("prediction done sucessfully")
             return features
         except Exception as e:
@@ -37,4 +122,4 @@ class MyModel :
         return f"{type(self.model_obj).__name__}()"
 
     def __str__(self):
-        return f"{type(self.model_obj).__name__}()"
\ No newline at end of file
+        return f"{type(self.model_obj).__name__}()"
@@ -0,0 +1,146 @@
+import sys
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier, ExtraTreesClassifier
+
+from src.constants import FOREST_ENGINE_CHUNK_SIZE
+
+from src.exception import myexception
+
+
+class FlatForest:
+    """
+    Array backed inference engine for a fitted sklearn forest classifier.
+
+    Every tree is exported into shared contiguous arrays (feature, threshold, first child,
+    leaf value per class) and all trees are walked over a batch at once, one depth level per step.
+    Inputs are compared as float32, missing values (NaN) follow each split's missing_go_to_left
+    and leaf probabilities are summed in tree order, exactly like sklearn, so predict /
+    predict_proba return the same values as the forest.
+    """
+    def __init__(self, forest: RandomForestClassifier, chunk_size: int = FOREST_ENGINE_CHUNK_SIZE) -> None:
+        """
+        :param forest: fitted RandomForestClassifier (or ExtraTreesClassifier)
+        :param chunk_size: rows walked at once, bounds the (n_trees, chunk_size) working set
+        """
+        try:
+            if not isinstance(forest, (RandomForestClassifier, ExtraTreesClassifier)):
+                raise ValueError(f"{type(forest).__name__} is not a sklearn forest classifier")
+            if getattr(forest, "n_outputs_", 1) != 1:
+                raise ValueError("multi output forests are not supported")
+
+            self.classes_ = forest.classes_
+            self.n_features = forest.n_features_in_
+            self.n_trees = len(forest.estimators_)
+            self.chunk_size = chunk_size
+
+            trees = [estimator.tree_ for estimator in forest.estimators_]
+            features, thresholds, first_children, values, internals, missing_rights = [], [], [], [], [], []
+            roots = []
+            offset = 0
+            for tree in trees:
+                order = self._sibling_order(tree)
+                new_id = np.empty(tree.node_count, dtype=np.int64)
+                new_id[order] = np.arange(tree.node_count) + offset
+
+                left = tree.children_left[order]
+                is_leaf = left == -1
+                # siblings are stored next to each other, so the next node is first_child + went_right;
+                # leaves point at themselves and are never stepped off (went_right is masked by internal),
+                # whatever their row's value compares to
+                first_children.append(np.where(is_leaf, new_id[order], new_id[np.where(is_leaf, 0, left)]))
+                features.append(np.where(is_leaf, 0, tree.feature[order]))
+                thresholds.append(np.where(is_leaf, np.inf, tree.threshold[order]))
+                internals.append(~is_leaf)
+                # sklearn sends a missing value to the child missing_go_to_left names (the bigger child
+                # for features that had no missing values in training)
+                missing_left = getattr(tree, "missing_go_to_left", None)
+                missing_left = np.ones(tree.node_count, dtype=bool) if missing_left is None else missing_left.astype(bool)
+                missing_rights.append(~is_leaf & ~missing_left[order])
+
+                proba = tree.value[order, 0, :].astype(np.float64)
+                normalizer = proba.sum(axis=1)[:, np.newaxis]
+                normalizer[normalizer == 0.0] = 1.0
+                values.append(proba / normalizer)
+
+                roots.append(offset)
+                offset += tree.node_count
+
+            index_dtype = np.int32 if offset < np.iinfo(np.int32).max else np.int64
+            self.feature = np.ascontiguousarray(np.concatenate(features), dtype=index_dtype)
+            self.threshold = self._float32_thresholds(np.concatenate(thresholds))
+            self.first_child = np.ascontiguousarray(np.concatenate(first_children), dtype=index_dtype)
+            self.internal = np.ascontiguousarray(np.concatenate(internals))
+            self.missing_right = np.ascontiguousarray(np.concatenate(missing_rights))
+            value = np.concatenate(values)
+            self.class_values = [np.ascontiguousarray(value[:, k]) for k in range(value.shape[1])]
+            self.roots = np.asarray(roots, dtype=index_dtype)
+            self.max_depth = int(max(tree.max_depth for tree in trees))
+        except Exception as e:
+            raise myexception(e, sys)
+
+    @staticmethod
+    def _float32_thresholds(thresholds: np.ndarray) -> np.ndarray:
+        """
+        largest float32 <= each float64 threshold, so for float32 x: x <= t32 exactly when x <= t64
+        """
+        thresholds_32 = thresholds.astype(np.float32)
+        rounded_up = thresholds_32.astype(np.float64) > thresholds
+        thresholds_32[rounded_up] = np.nextafter(thresholds_32[rounded_up], np.float32(-np.inf))
+        return np.ascontiguousarray(thresholds_32)
+
+    @staticmethod
+    def _sibling_order(tree) -> np.ndarray:
+        """
+        breadth first node order, so the two children of every split get consecutive ids
+        """
+        order = [0]
+        for node in order:
+            left = tree.children_left[node]
+            if left != -1:
+                order.append(left)
+                order.append(tree.children_right[node])
+        return np.asarray(order, dtype=np.int64)
+
+    def _leaves(self, X: np.ndarray) -> np.ndarray:
+        """
+        (n_trees, n_rows) index of the leaf every row lands in, for every tree
+        """
+        n_rows = X.shape[0]
+        flat_X = X.ravel()
+        has_missing = bool(np.isnan(flat_X).any())
+        row_offsets = (np.arange(n_rows, dtype=self.feature.dtype) * self.n_features)[np.newaxis, :]
+        nodes = np.repeat(self.roots[:, np.newaxis], n_rows, axis=1)
+        for _ in range(self.max_depth):
+            values = np.take(flat_X, row_offsets + np.take(self.feature, nodes))
+            # NaN > t is False, so a missing value goes left unless its split sends it right
+            went_right = values > np.take(self.threshold, nodes)
+            if has_missing:
+                went_right |= np.isnan(values) & np.take(self.missing_right, nodes)
+            went_right &= np.take(self.internal, nodes)
+            nodes = np.take(self.first_child, nodes)
+            nodes += went_right
+        return nodes
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        try:
+            X = np.ascontiguousarray(X, dtype=np.float32)
+            if X.ndim != 2 or X.shape[1] != self.n_features:
+                raise ValueError(f"expected input with {self.n_features} features, got shape {X.shape}")
+            proba = np.empty((X.shape[0], len(self.class_values)), dtype=np.float64)
+            for start in range(0, X.shape[0], self.chunk_size):
+                stop = start + self.chunk_size
+                leaves = self._leaves(X[start:stop])
+                # cumsum adds trees strictly one after another (sum() may pair them up), same order as sklearn
+                for k, class_value in enumerate(self.class_values):
+                    proba[start:stop, k] = np.cumsum(np.take(class_value, leaves), axis=0)[-1]
+            proba /= self.n_trees
+            return proba
+        except Exception as e:
+            raise myexception(e, sys)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        try:
+            return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+        except Exception as e:
+            raise myexception(e, sys)
@@ -0,0 +1,169 @@
+import sys
+import time
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.constants import MODEL_REGISTRY_LOAD_ATTEMPTS, MODEL_REGISTRY_REFRESH_INTERVAL_SECONDS
+from src.entity.s3_estimator import Proj1Estimator
+from src.exception import myexception
+from src.logger import logging
+
+
+class ModelRegistry:
+    """
+    Process wide registry that keeps one loaded Proj1Estimator per (bucket, model path).
+
+    The model is downloaded once (single-flight, concurrent first callers wait on the same load)
+    and a background thread re-checks the S3 ETag so a newly pushed model is swapped in
+    without a download on the request path.
+    """
+    _registries: Dict[Tuple[str, str], "ModelRegistry"] = {}
+    _registries_lock = threading.Lock()
+
+    @classmethod
+    def get_registry(cls, bucket_name: str, model_path: str,
+                     refresh_interval: int = MODEL_REGISTRY_REFRESH_INTERVAL_SECONDS) -> "ModelRegistry":
+        """
+        returns the shared registry for bucket_name/model_path, creating it on first use
+        """
+        key = (bucket_name, model_path)
+        with cls._registries_lock:
+            if key not in cls._registries:
+                cls._registries[key] = cls(bucket_name=bucket_name,
+                                           model_path=model_path,
+                                           refresh_interval=refresh_interval)
+            return cls._registries[key]
+
+    def __init__(self, bucket_name: str, model_path: str,
+                 refresh_interval: int = MODEL_REGISTRY_REFRESH_INTERVAL_SECONDS) -> None:
+        """
+        :param bucket_name: Name of your model bucket
+        :param model_path: Location of your model in bucket
+        :param refresh_interval: seconds between background ETag checks, 0 disables the watcher
+        """
+        self.bucket_name = bucket_name
+        self.model_path = model_path
+        self.refresh_interval = refresh_interval
+
+        self.model_version: Optional[str] = None
+        self.loaded_at: Optional[float] = None
+        self.load_time: Optional[float] = None
+
+        self._estimator: Optional[Proj1Estimator] = None
+        self._load_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._listeners: List[Callable[[Optional[str]], None]] = []
+        self._stop_event = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._estimator is not None
+
+    def get_estimator(self) -> Proj1Estimator:
+        """
+        returns the loaded estimator, loading it once if nobody has yet
+        """
+        estimator = self._estimator
+        if estimator is not None:
+            return estimator
+        try:
+            with self._load_lock:
+                if self._estimator is None:
+                    estimator, etag, load_time = self._load()
+                    self._swap(estimator, etag, load_time)
+                    self._start_watcher()
+                return self._estimator
+        except Exception as e:
+            raise myexception(e, sys)
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        checks the S3 ETag and reloads the model if it changed (or if force is set)
+        :return: True if a new model was swapped in
+        """
+        try:
+            with self._refresh_lock:
+                if not force and self._estimator is not None:
+                    estimator = self._estimator
+                    etag = estimator.s3.get_object_etag(self.model_path, bucket_name=self.bucket_name)
+                    if etag == self.model_version:
+                        return False
+                    logging.info(f"model etag changed from {self.model_version} to {etag}, reloading")
+                estimator, etag, load_time = self._load()
+                self._swap(estimator, etag, load_time)
+                return True
+        except Exception as e:
+            raise myexception(e, sys)
+
+    @classmethod
+    def notify_model_pushed(cls, bucket_name: str, model_path: str) -> bool:
+        """
+        called after a new model was uploaded; if this process serves that model, swap it in now
+        (which also fires the listeners, e.g. prediction cache invalidation)
+        """
+        with cls._registries_lock:
+            registry = cls._registries.get((bucket_name, model_path))
+        if registry is None or not registry.is_loaded:
+            return False
+        return registry.refresh()
+
+    def add_listener(self, callback: Callable[[Optional[str]], None]) -> None:
+        """
+        registers a callback that gets the new model version every time a model is swapped in
+        """
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def stop(self) -> None:
+        """
+        stops the background ETag watcher
+        """
+        self._stop_event.set()
+
+    def _load(self) -> Tuple[Proj1Estimator, str, float]:
+        """
+        downloads the model with the ETag it was stored under. A model pushed between the ETag read
+        and the download would be served under the old version, so the ETag is read again afterwards
+        and the download retried if it moved. If it still moves after every attempt the ETag from
+        before the last download is kept: at worst the watcher reloads the same model once more.
+        """
+        start = time.perf_counter()
+        estimator = Proj1Estimator(bucket_name=self.bucket_name, model_path=self.model_path)
+        etag = estimator.s3.get_object_etag(self.model_path, bucket_name=self.bucket_name)
+        for attempt in range(1, MODEL_REGISTRY_LOAD_ATTEMPTS + 1):
+            estimator.loaded_model = estimator.load_model()
+            etag_after = estimator.s3.get_object_etag(self.model_path, bucket_name=self.bucket_name)
+            if etag_after == etag:
+                break
+            logging.warning(f"model {self.model_path} changed from etag {etag} to {etag_after} while it was "
+                            f"downloaded (attempt {attempt} of {MODEL_REGISTRY_LOAD_ATTEMPTS})")
+            if attempt < MODEL_REGISTRY_LOAD_ATTEMPTS:
+                etag = etag_after
+        load_time = time.perf_counter() - start
+        logging.info(f"model {self.model_path} (etag {etag}) loaded in {load_time:.3f}s")
+        return estimator, etag, load_time
+
+    def _swap(self, estimator: Proj1Estimator, etag: str, load_time: float) -> None:
+        self._estimator = estimator
+        self.model_version = etag
+        self.load_time = load_time
+        self.loaded_at = time.time()
+        for callback in self._listeners:
+            try:
+                callback(etag)
+            except Exception as e:
+                logging.warning(f"model registry listener failed: {e}")
+
+    def _start_watcher(self) -> None:
+        if self.refresh_interval <= 0 or self._watcher is not None:
+            return
+        self._watcher = threading.Thread(target=self._watch, name="model-registry-watcher", daemon=True)
+        self._watcher.start()
+
+    def _watch(self) -> None:
+        while not self._stop_event.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logging.warning(f"background model refresh failed: {e}")
@@ -74,4 +74,16 @@ class Proj1Estimator:
                 self.loaded_model = self.load_model()
             return self.loaded_model.prediction_with_array(array=array)
         except Exception as e:
-            raise myexception(e, sys)
\ No newline at end of file
+            raise myexception(e, sys)
+    def predict_with_raw_array(self,array: np.array,columns):
+        """
+        :param array: raw (untransformed) rows
+        :param columns: column name of every array column
+        :return:
+        """
+        try:
+            if self.loaded_model is None:
+                self.loaded_model = self.load_model()
+            return self.loaded_model.prediction_with_raw_array(array=array,columns=columns)
+        except Exception as e:
+            raise myexception(e, sys)
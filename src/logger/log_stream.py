@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import threading
+import uuid
+from collections import deque
+from contextvars import ContextVar
+from functools import wraps
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple, Union
+
+# a log line, or an (event name, data) pair for a named SSE event
+StreamMessage = Union[str, Tuple[str, str]]
+
+# id of the log stream the current code is running for (None outside any stream)
+current_log_stream: ContextVar[Optional[str]] = ContextVar("current_log_stream", default=None)
+
+
+class AsyncLogChannel(logging.Handler):
+    """
+    Logging handler that hands formatted records from worker threads to an asyncio loop.
+
+    Records go into a thread safe deque; the loop is only woken (call_soon_threadsafe) when
+    no wakeup is pending, so a burst of records costs one wakeup and is drained as one batch.
+    Nothing polls: an idle stream is just a coroutine waiting on an asyncio.Event.
+    """
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None, level: int = logging.INFO) -> None:
+        super().__init__(level)
+        self.loop = loop or asyncio.get_running_loop()
+        self._buffer = deque()
+        self._ready = asyncio.Event()
+        self._wakeup_pending = False
+        self._closed = False
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            message = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        self.put(message)
+
+    def put(self, message: str) -> None:
+        """
+        thread safe, callable from any thread
+        """
+        self._buffer.append(message)
+        self._schedule_wakeup()
+
+    def put_event(self, event: str, data: str) -> None:
+        """
+        thread safe, queues a named SSE event (e.g. a json stage profile) in order with the log lines
+        """
+        self.put((event, data))
+
+    def finish(self) -> None:
+        """
+        thread safe, marks the end of the stream once everything queued so far is delivered
+        """
+        self._closed = True
+        self._schedule_wakeup()
+
+    def _schedule_wakeup(self) -> None:
+        if self._wakeup_pending:
+            return
+        self._wakeup_pending = True
+        try:
+            self.loop.call_soon_threadsafe(self._wake)
+        except RuntimeError:
+            # loop already closed, client went away
+            pass
+
+    def _wake(self) -> None:
+        self._wakeup_pending = False
+        self._ready.set()
+
+    async def batches(self) -> AsyncIterator[List[StreamMessage]]:
+        """
+        yields lists of messages as they arrive, until finish() was called and the buffer is empty
+        """
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            if self._buffer:
+                batch = []
+                while self._buffer:
+                    batch.append(self._buffer.popleft())
+                yield batch
+            if self._closed and not self._buffer:
+                return
+
+
+def format_sse(messages: List[StreamMessage]) -> str:
+    """
+    one SSE chunk carrying every message of a batch as its own event; (event, data) pairs become
+    named events, which clients only see through addEventListener(event), not onmessage
+    """
+    return "".join(f"event: {message[0]}\ndata: {message[1]}\n\n" if isinstance(message, tuple)
+                   else f"data: {message}\n\n" for message in messages)
+
+
+class LogStreamRouter(logging.Handler):
+    """
+    One root handler shared by every stream.
+
+    A record is routed by the current_log_stream contextvar of the code that logged it, and only
+    that stream's channel formats it, so the cost per record stays constant however many
+    streams are open and streams never see each other's lines. The root level is never touched.
+    """
+    def __init__(self, level: int = logging.INFO) -> None:
+        super().__init__(level)
+        self._channels: Dict[str, AsyncLogChannel] = {}
+
+    def register(self, channel: AsyncLogChannel) -> str:
+        stream_id = uuid.uuid4().hex
+        self._channels[stream_id] = channel
+        return stream_id
+
+    def unregister(self, stream_id: str) -> None:
+        self._channels.pop(stream_id, None)
+
+    @property
+    def open_streams(self) -> int:
+        return len(self._channels)
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        # no handler wide lock here, the channel that owns the record does its own locking
+        if not self.filter(record):
+            return False
+        self.emit(record)
+        return True
+
+    def emit(self, record: logging.LogRecord) -> None:
+        stream_id = current_log_stream.get()
+        if stream_id is None:
+            return
+        channel = self._channels.get(stream_id)
+        if channel is not None:
+            channel.handle(record)
+
+
+_router: Optional[LogStreamRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_log_stream_router() -> LogStreamRouter:
+    """
+    returns the process wide router, attaching it to the root logger on first use
+    """
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = LogStreamRouter()
+            logging.getLogger().addHandler(_router)
+        return _router
+
+
+def bind_log_stream(stream_id: str, func: Callable) -> Callable:
+    """
+    wraps func so that, in whatever thread it runs, its log records go to stream_id
+    """
+    @wraps(func)
+    def runner(*args, **kwargs):
+        token = current_log_stream.set(stream_id)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            current_log_stream.reset(token)
+    return runner
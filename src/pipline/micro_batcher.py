@@ -0,0 +1,163 @@
+import time
+import threading
+from concurrent.futures import Future
+from queue import Queue, Empty
+from typing import Callable, Dict, Hashable, List, Optional
+
+import numpy as np
+
+from src.entity.config_entity import MicroBatcherConfig
+from src.logger import logging
+
+
+class _PendingRequest:
+    __slots__ = ("rows", "future", "enqueued_at")
+
+    def __init__(self, rows: np.ndarray):
+        self.rows = rows
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class MicroBatcher:
+    """
+    Collects concurrent small prediction requests, scores them with one predict call and fans
+    the results back out to every waiting request.
+
+    The batcher never waits for requests that may not come: a batch is the request it woke up
+    for plus whatever queued up meanwhile (up to max_batch_size), so a lone caller goes out
+    immediately and under concurrent load batches grow by themselves with the requests that
+    arrive while the previous batch is scored.
+    """
+    _batchers: Dict[Hashable, "MicroBatcher"] = {}
+    _batchers_lock = threading.Lock()
+
+    @classmethod
+    def get_batcher(cls, key: Hashable, predict_fn: Callable[[np.ndarray], np.ndarray],
+                    config: MicroBatcherConfig = MicroBatcherConfig()) -> "MicroBatcher":
+        """
+        returns the shared batcher for key, creating it on first use
+        """
+        with cls._batchers_lock:
+            if key not in cls._batchers:
+                cls._batchers[key] = cls(predict_fn=predict_fn, config=config)
+            return cls._batchers[key]
+
+    def __init__(self, predict_fn: Callable[[np.ndarray], np.ndarray],
+                 config: MicroBatcherConfig = MicroBatcherConfig()) -> None:
+        """
+        :param predict_fn: scores a 2d array of raw rows and returns one prediction per row
+        :param config: MicroBatcherConfig with the batch size
+        """
+        self.predict_fn = predict_fn
+        self.config = config
+
+        self._queue: "Queue[_PendingRequest]" = Queue()
+        self._stop_event = threading.Event()
+        self._stats_lock = threading.Lock()
+
+        self._queue_wait_ewma: Optional[float] = None
+        self._batch_latency_ewma: Optional[float] = None
+        self._batch_size_ewma: Optional[float] = None
+
+        self.total_requests = 0
+        self.total_batches = 0
+        self.batch_size_histogram: Dict[str, int] = {}
+
+        self._worker = threading.Thread(target=self._run, name="prediction-micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, rows: np.ndarray) -> Future:
+        """
+        queues rows for the next batch and returns a future with their predictions
+        """
+        request = _PendingRequest(rows)
+        self._queue.put(request)
+        return request.future
+
+    def predict(self, rows: np.ndarray, timeout: Optional[float] = None) -> np.ndarray:
+        """
+        blocking helper around submit
+        """
+        return self.submit(rows).result(timeout=timeout)
+
+    def stats(self) -> dict:
+        """
+        moving averages (queue wait of a batch's oldest request, batch latency and size) and the batch size histogram
+        """
+        with self._stats_lock:
+            return {
+                "total_requests": self.total_requests,
+                "total_batches": self.total_batches,
+                "queue_wait_ms": None if self._queue_wait_ewma is None
+                else round(self._queue_wait_ewma * 1000, 3),
+                "batch_latency_ms": None if self._batch_latency_ewma is None
+                else round(self._batch_latency_ewma * 1000, 3),
+                "batch_size_avg": None if self._batch_size_ewma is None else round(self._batch_size_ewma, 3),
+                "batch_size_histogram": dict(self.batch_size_histogram),
+            }
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def _ewma(self, current: Optional[float], sample: float) -> float:
+        if current is None:
+            return sample
+        alpha = self.config.ewma_alpha
+        return alpha * sample + (1 - alpha) * current
+
+    def _record_batch(self, batch_size: int, queue_wait: float, latency: float) -> None:
+        bucket = str(1 << (batch_size.bit_length() - 1))
+        with self._stats_lock:
+            self.total_batches += 1
+            self.total_requests += batch_size
+            self.batch_size_histogram[bucket] = self.batch_size_histogram.get(bucket, 0) + 1
+            self._batch_latency_ewma = self._ewma(self._batch_latency_ewma, latency)
+            self._batch_size_ewma = self._ewma(self._batch_size_ewma, batch_size)
+            self._queue_wait_ewma = self._ewma(self._queue_wait_ewma, queue_wait)
+
+    def _collect(self) -> List[_PendingRequest]:
+        try:
+            first = self._queue.get(timeout=0.5)
+        except Empty:
+            return []
+        batch = [first]
+        rows = len(first.rows)
+        # only what is already queued, stop as soon as the queue is empty
+        while rows < self.config.max_batch_size:
+            try:
+                request = self._queue.get_nowait()
+            except Empty:
+                break
+            batch.append(request)
+            rows += len(request.rows)
+        return batch
+
+    def _score(self, batch: List[_PendingRequest]) -> None:
+        start = time.perf_counter()
+        try:
+            if len(batch) == 1:
+                rows = batch[0].rows
+            else:
+                rows = np.concatenate([request.rows for request in batch])
+            predictions = np.asarray(self.predict_fn(rows))
+        except Exception as e:
+            for request in batch:
+                request.future.set_exception(e)
+            return
+
+        offset = 0
+        for request in batch:
+            size = len(request.rows)
+            request.future.set_result(predictions[offset:offset + size])
+            offset += size
+        self._record_batch(len(batch), start - batch[0].enqueued_at, time.perf_counter() - start)
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                batch = self._collect()
+                if batch:
+                    self._score(batch)
+            except Exception as e:
+                logging.error(f"micro batcher loop failed: {e}")
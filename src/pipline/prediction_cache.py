@@ -0,0 +1,120 @@
+import sys
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+from src.entity.config_entity import PredictionCacheConfig
+from src.logger import logging
+
+# rough per entry bookkeeping cost on top of the key tuple (OrderedDict node, value tuple, ints)
+_ENTRY_OVERHEAD_BYTES = 200
+
+
+class PredictionCache:
+    """
+    Bounded LRU + TTL cache of single record predictions.
+
+    Keys are (model version, normalized feature tuple), so entries of an old model can never be
+    served; the whole cache is also dropped when a new model version is swapped in.
+    Size is capped both by entry count and by an estimate of the memory the entries use.
+    """
+    _caches: Dict[Hashable, "PredictionCache"] = {}
+    _caches_lock = threading.Lock()
+
+    @classmethod
+    def get_cache(cls, key: Hashable, config: PredictionCacheConfig = PredictionCacheConfig()) -> "PredictionCache":
+        """
+        returns the shared cache for key, creating it on first use
+        """
+        with cls._caches_lock:
+            if key not in cls._caches:
+                cls._caches[key] = cls(config=config)
+            return cls._caches[key]
+
+    def __init__(self, config: PredictionCacheConfig = PredictionCacheConfig()) -> None:
+        self.config = config
+        self.max_memory_bytes = int(config.max_memory_mb * 1024 * 1024)
+
+        self._entries: "OrderedDict[tuple, Tuple[int, float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._memory_bytes = 0
+        self.model_version: Optional[str] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(model_version: Optional[str], values) -> tuple:
+        """
+        (model version, float feature values), 0.0 + v folds -0.0 into 0.0
+        """
+        return (model_version,) + tuple(0.0 + float(value) for value in values)
+
+    @staticmethod
+    def _entry_size(key: tuple) -> int:
+        return _ENTRY_OVERHEAD_BYTES + sys.getsizeof(key) + sum(sys.getsizeof(item) for item in key)
+
+    def get(self, key: tuple) -> Optional[int]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at, size = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self._memory_bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: tuple, value: int) -> None:
+        size = self._entry_size(key)
+        expires_at = time.monotonic() + self.config.ttl_seconds
+        with self._lock:
+            if key[0] != self.model_version:
+                # result of a model that was swapped out meanwhile
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._memory_bytes -= previous[2]
+            self._entries[key] = (value, expires_at, size)
+            self._memory_bytes += size
+            while self._entries and (len(self._entries) > self.config.max_entries
+                                     or self._memory_bytes > self.max_memory_bytes):
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._memory_bytes -= evicted_size
+                self.evictions += 1
+
+    def invalidate(self, model_version: Optional[str] = None) -> None:
+        """
+        drops every entry and starts caching for model_version
+        """
+        with self._lock:
+            self._entries.clear()
+            self._memory_bytes = 0
+            self.model_version = model_version
+            self.invalidations += 1
+        logging.info(f"prediction cache invalidated for model version {model_version}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "model_version": self.model_version,
+                "entries": len(self._entries),
+                "memory_bytes": self._memory_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
@@ -1,6 +1,13 @@
 import sys
-from src.entity.config_entity import VehiclePredictorConfig
-from src.entity.s3_estimator import Proj1Estimator
+import time
+from typing import Iterable, List, Tuple
+
+import numpy as np
+from src.constants import PREDICTION_INPUT_COLUMNS
+from src.entity.config_entity import VehiclePredictorConfig, MicroBatcherConfig, PredictionCacheConfig
+from src.entity.model_registry import ModelRegistry
+from src.pipline.micro_batcher import MicroBatcher
+from src.pipline.prediction_cache import PredictionCache
 from src.exception import myexception
 from src.logger import logging
 from pandas import DataFrame
@@ -48,9 +55,20 @@ class VehicleData:
             raise myexception(e, sys) from e
 
 
+    def get_vehicle_input_array(self) -> np.ndarray:
+        """
+        raw feature row in PREDICTION_INPUT_COLUMNS order, written straight into a numpy row (no pandas)
+        """
+        try:
+            row = np.empty((1, len(PREDICTION_INPUT_COLUMNS)), dtype=np.float64)
+            row[0] = [getattr(self, column) for column in PREDICTION_INPUT_COLUMNS]
+            return row
+        except Exception as e:
+            raise myexception(e, sys) from e
+
     def get_vehicle_data_as_dict(self):
 
-        logging.info("Entered get_usvisa_data_as_dict method as VehicleData class")
+        logging.debug("Entered get_vehicle_data_as_dict method as VehicleData class")
 
         try:
             input_data = {
@@ -67,32 +85,163 @@ class VehicleData:
                 "Vehicle_Damage_Yes": [self.Vehicle_Damage_Yes]
             }
 
-            logging.info("Created vehicle data dict")
-            logging.info("Exited get_vehicle_data_as_dict method as VehicleData class")
+            logging.debug("Exited get_vehicle_data_as_dict method as VehicleData class")
             return input_data
 
         except Exception as e:
             raise myexception(e, sys) from e
 
+class VehicleDataBatch:
+    """
+    builds one columnar dataframe out of many vehicle records so they can be scored in a single pass
+    """
+    def __init__(self, records: Iterable[dict]):
+
+        try:
+            self.records = list(records)
+        except Exception as e:
+            raise myexception(e, sys) from e
+
+    def get_vehicle_input_data_frame(self) -> DataFrame:
+
+        try:
+            columns = {column: [record[column] for record in self.records] for column in PREDICTION_INPUT_COLUMNS}
+            return DataFrame(columns, columns=PREDICTION_INPUT_COLUMNS)
+        except Exception as e:
+            raise myexception(e, sys) from e
+
+
+def get_risk_levels(predictions, previously_insured, vehicle_damage_yes) -> np.ndarray:
+    """
+    vectorized risk level for a batch of predictions
+    positive + damaged + not previously insured -> High, positive + damaged -> Medium, rest -> Low
+    """
+    predictions = np.asarray(predictions)
+    damaged = np.asarray(vehicle_damage_yes) == 1
+    not_insured = np.asarray(previously_insured) == 0
+
+    risk_levels = np.full(predictions.shape[0], "Low", dtype=object)
+    positive_damaged = (predictions == 1) & damaged
+    risk_levels[positive_damaged] = "Medium"
+    risk_levels[positive_damaged & not_insured] = "High"
+    return risk_levels
+
+
 class VehicleDataClassifier:
-    def __init__(self,prediction_pipeline_config: VehiclePredictorConfig = VehiclePredictorConfig(),) -> None:
+    def __init__(self,prediction_pipeline_config: VehiclePredictorConfig = VehiclePredictorConfig(),
+                 micro_batcher_config: MicroBatcherConfig = MicroBatcherConfig(),
+                 prediction_cache_config: PredictionCacheConfig = PredictionCacheConfig(),) -> None:
 
         try:
             self.prediction_pipeline_config = prediction_pipeline_config
+            self.micro_batcher_config = micro_batcher_config
+            self.prediction_cache_config = prediction_cache_config
+            self.model_registry = ModelRegistry.get_registry(
+                bucket_name=self.prediction_pipeline_config.model_bucket_name,
+                model_path=self.prediction_pipeline_config.model_file_path,
+                refresh_interval=self.prediction_pipeline_config.model_refresh_interval,
+            )
+            self.micro_batcher = None
+            if self.micro_batcher_config.enabled:
+                self.micro_batcher = MicroBatcher.get_batcher(
+                    key=(self.model_registry.bucket_name, self.model_registry.model_path),
+                    predict_fn=self._predict_direct,
+                    config=self.micro_batcher_config,
+                )
+            self.prediction_cache = None
+            if self.prediction_cache_config.enabled:
+                self.prediction_cache = PredictionCache.get_cache(
+                    key=(self.model_registry.bucket_name, self.model_registry.model_path),
+                    config=self.prediction_cache_config,
+                )
+                self.model_registry.add_listener(self.prediction_cache.invalidate)
         except Exception as e:
             raise myexception(e, sys)
 
-    def predict(self, dataframe) -> str:
+    def _predict_direct(self, dataframe):
+        model = self.model_registry.get_estimator()
+        if isinstance(dataframe, DataFrame):
+            return model.predict(dataframe)
+        return model.predict_with_raw_array(dataframe, columns=PREDICTION_INPUT_COLUMNS)
+
+    def _score(self, dataframe):
+        """
+        small inputs (single applicants) go through the shared micro batcher so concurrent
+        requests are scored together, bigger frames are already a batch and are scored directly
+        """
+        if self.micro_batcher is not None and len(dataframe) < self.micro_batcher_config.max_batch_size:
+            if isinstance(dataframe, DataFrame):
+                dataframe = dataframe[PREDICTION_INPUT_COLUMNS].to_numpy(dtype=np.float64)
+            return self.micro_batcher.predict(dataframe)
+        return self._predict_direct(dataframe)
+
+    def _predict_cached(self, dataframe):
+        """
+        serves repeated feature tuples from the prediction cache, scores only the misses
+        """
+        if isinstance(dataframe, DataFrame):
+            rows = dataframe[PREDICTION_INPUT_COLUMNS].to_numpy(dtype=np.float64)
+        else:
+            rows = np.asarray(dataframe, dtype=np.float64)
+
+        self.model_registry.get_estimator()
+        model_version = self.model_registry.model_version
+        if self.prediction_cache.model_version != model_version:
+            self.prediction_cache.invalidate(model_version)
+
+        keys = [PredictionCache.make_key(model_version, row) for row in rows.tolist()]
+        predictions = [self.prediction_cache.get(key) for key in keys]
+        missing = [i for i, value in enumerate(predictions) if value is None]
+        if missing:
+            scored = self._score(rows[missing])
+            for i, value in zip(missing, scored):
+                self.prediction_cache.put(keys[i], value)
+                predictions[i] = value
+        return np.asarray(predictions)
 
+    def predict(self, dataframe) -> str:
+        """
+        dataframe is a DataFrame or a raw array with PREDICTION_INPUT_COLUMNS columns
+        """
         try:
             logging.info("Entered predict method of VehicleDataClassifier class")
-            model = Proj1Estimator(
-                bucket_name=self.prediction_pipeline_config.model_bucket_name,
-                model_path=self.prediction_pipeline_config.model_file_path,
-            )
-            result =  model.predict(dataframe)
-            
-            return result
+            # batches (/predict-batch) are scored directly, only small inputs go through the cache
+            if self.prediction_cache is not None and len(dataframe) < self.prediction_cache_config.max_batch_rows:
+                return self._predict_cached(dataframe)
+            return self._score(dataframe)
         
         except Exception as e:
-            raise myexception(e, sys)
\ No newline at end of file
+            raise myexception(e, sys)
+
+    def warm_up(self) -> dict:
+        """
+        loads the model and scores a dummy applicant through the raw array and the DataFrame paths,
+        so the download, unpickling and compiled preprocessor / forest are paid before serving
+        (the prediction cache and micro batcher are bypassed, the dummy result is not cached)
+        """
+        try:
+            start = time.perf_counter()
+            self.model_registry.get_estimator()
+            dummy_row = np.zeros((1, len(PREDICTION_INPUT_COLUMNS)), dtype=np.float64)
+            self._predict_direct(dummy_row)
+            self._predict_direct(DataFrame(dummy_row, columns=PREDICTION_INPUT_COLUMNS))
+            warmup_time = time.perf_counter() - start
+            logging.info(f"prediction pipeline warmed up in {warmup_time:.3f}s")
+            return {"model_version": self.model_registry.model_version,
+                    "model_load_time": self.model_registry.load_time,
+                    "warmup_time": warmup_time}
+        except Exception as e:
+            raise myexception(e, sys)
+
+    def predict_with_risk(self, dataframe: DataFrame) -> Tuple[List[int], List[str]]:
+        """
+        scores every row of dataframe in one vectorized pass and returns predictions with risk levels
+        """
+        try:
+            predictions = self.predict(dataframe)
+            risk_levels = get_risk_levels(predictions,
+                                          dataframe["Previously_Insured"].to_numpy(),
+                                          dataframe["Vehicle_Damage_Yes"].to_numpy())
+            return np.asarray(predictions).astype(int).tolist(), risk_levels.tolist()
+        except Exception as e:
+            raise myexception(e, sys)
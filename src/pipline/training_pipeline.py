@@ -4,11 +4,13 @@ from src.components.data_ingestion import dataIngestion
 from src.logger import logging
 from src.exception import myexception
 from src.entity.artifact_entity import (DataIngestionArtifact ,
+                                        DataValidationArtifact,
                                         DataTransformationArtifact,
                                         ModelTrainerArtifact,
                                         ModelEvaluationArtifact,
                                         ModelPusherArtifact)
-from src.entity.config_entity import (DataIngestionConfig,
+from src.entity.config_entity import (TrainingPipelineConfig,
+                                      DataIngestionConfig,
                                       DataValidationConfig,
                                       DataTransformationConfig,
                                       ModelTrainerConfig,
@@ -19,9 +21,31 @@ from src.components.data_transformation import DataTransformation
 from src.components.model_trainer import ModelTraining
 from src.components.model_evaluation import ModelEvaluation
 from src.components.model_pusher import ModelPusher
+from src.utils.artifact_store import ArtifactStore
+from src.utils.stage_cache import StageCache, code_version, config_key, hash_file
+from src.utils.stage_profiler import StageProfiler
+from src.utils import resampling
+from src.utils.main_utils import save_dataframe, load_dataframe, count_rows
+from src.data_access.feature_store import FeatureStore
+from src.data_access.proj1_data import proj1
+from src.constants import SCHEMA_FILE_PATH
+from src.entity.estimator import MyModel
+from src.entity.s3_estimator import Proj1Estimator
+from typing import Callable, Dict, Optional, Tuple
 
 class TrainingPipeline :
-    def __init__(self)->None:
+    def __init__(self, training_pipeline_config: TrainingPipelineConfig = TrainingPipelineConfig())->None:
+        self.training_pipeline_config = training_pipeline_config
+        # stage outputs are handed over in memory (and written in background) unless handoff is "file"
+        self.artifact_store = ArtifactStore(in_memory=training_pipeline_config.artifact_handoff == "memory")
+        # ingestion / validation / transformation are skipped when a previous run had the same inputs
+        self.stage_cache = StageCache(training_pipeline_config.stage_cache_dir) if training_pipeline_config.stage_cache else None
+        self.stage_fingerprints: Dict[str, str] = {}
+        self.base_model: Optional[MyModel] = None
+        self.base_model_version: Optional[str] = None
+        # every start_* stage run by run_pipeline is timed and measured, subscribe to follow it live
+        self.profiler = StageProfiler(rss_sample_seconds=training_pipeline_config.profile_rss_sample_seconds,
+                                      trace_allocations=training_pipeline_config.profile_tracemalloc)
         self.data_validation_config = DataValidationConfig()
         self.data_ingestion_config = DataIngestionConfig()
         self.data_transform_config = DataTransformationConfig()
@@ -30,11 +54,99 @@ class TrainingPipeline :
         self.model_pusher_config = ModelPusherConfig()
         logging.info("training pipeline started")
     
+    def stage_fingerprint (self , stage : str , upstream : Optional[str] , config , *code , exclude=()) -> Optional[str]:
+        """
+        fingerprint of a stage's inputs: upstream data / stage fingerprint, schema, config and the
+        source of the code that computes it; None when caching is off or the upstream is unknown
+        """
+        if self.stage_cache is None or upstream is None:
+            return None
+        return self.stage_cache.fingerprint(stage, upstream, hash_file(SCHEMA_FILE_PATH),
+                                            config_key(config, exclude), code_version(*code))
+
+    def run_cached_stage (self , stage : str , fingerprint : Optional[str] , files : Dict[str, str] ,
+                          compute : Callable , restore : Callable[[dict], object] ,
+                          meta : Callable[[object], dict] = lambda artifact: {}):
+        """
+        restore(meta) rebuilds the artifact when the stage's files came from the cache, else compute()
+        runs the stage and its files are recorded for the cache (stored once the run is flushed)
+        """
+        if fingerprint is None:
+            return compute()
+        cached = self.stage_cache.restore(stage, fingerprint, files)
+        self.profiler.annotate(cached=cached is not None)
+        if cached is not None:
+            artifact = restore(cached)
+        else:
+            # outputs left by an earlier run may be hard links into the cache, never write through them
+            for file_path in files.values():
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+            artifact = compute()
+            self.stage_cache.record(stage, fingerprint, files, meta(artifact))
+        self.stage_fingerprints[stage] = fingerprint
+        return artifact
+
+    def count_rows (self , file_path : str) -> Optional[int]:
+        """
+        rows of an artifact of this run, from memory or the file's metadata (never a full read)
+        """
+        obj = self.artifact_store.peek(file_path)
+        return len(obj) if obj is not None else count_rows(file_path)
+
+    def run_profiled (self , stage : str , start : Callable , rows : Callable[[object], dict] = lambda artifact: {},
+                      **kwargs):
+        """
+        start(**kwargs) as a profiled stage; rows(artifact) gives its rows_in / rows_out
+        """
+        with self.profiler.stage(stage):
+            artifact = start(**kwargs)
+            self.profiler.annotate(**rows(artifact))
+            return artifact
+
+    def load_base_model (self) -> Tuple[Optional[MyModel], Optional[str]]:
+        """
+        production model (and its version) to grow in incremental training mode,
+        (None, None) in full mode or while no model has been pushed yet
+        """
+        try:
+            if self.model_training_config.training_mode != "incremental":
+                return None, None
+            estimator = Proj1Estimator(bucket_name=self.model_eval_config.bucket_name,
+                                       model_path=self.model_eval_config.s3_model_key_path)
+            if not estimator.is_model_present(model_path=self.model_eval_config.s3_model_key_path):
+                logging.info("no production model yet, training from scratch")
+                return None, None
+            version = estimator.s3.get_object_etag(self.model_eval_config.s3_model_key_path,
+                                                   bucket_name=self.model_eval_config.bucket_name)
+            logging.info(f"incremental training on top of production model {version}")
+            return estimator.load_model(), version
+        except Exception as e:
+            raise myexception(e,sys)
+
     def start_ingestion (self) -> DataIngestionArtifact:
         try:
             logging.info("entered ingestion module")
-            data_ingestion = dataIngestion()
-            data_artifact = data_ingestion.data_ingestion_start()
+            data_ingestion = dataIngestion(data_config=self.data_ingestion_config,
+                                           artifact_store=self.artifact_store)
+            if self.stage_cache is None:
+                data_artifact = data_ingestion.data_ingestion_start()
+            else:
+                # the (incremental) mongo sync always runs, the stage is keyed by what is in the store after it
+                feature_store = data_ingestion.update_feature_store()
+                config = self.data_ingestion_config
+                fingerprint = self.stage_fingerprint("ingestion", feature_store.content_hash(), config,
+                                                     dataIngestion, FeatureStore, proj1, save_dataframe,
+                                                     exclude=("read_parallelism",))
+                data_artifact = self.run_cached_stage(
+                    "ingestion", fingerprint,
+                    files={"data": config.feature_store_file_path,
+                           "train": config.training_file_path,
+                           "test": config.testing_file_path},
+                    compute=lambda: data_ingestion.data_ingestion_start(feature_store),
+                    restore=lambda meta: DataIngestionArtifact(trained_file_path=config.training_file_path,
+                                                               test_file_path=config.testing_file_path,
+                                                               file_format=config.artifact_format))
             logging.info("data ingestion done sucessfully")
         except Exception as e:
             raise myexception(e,sys)
@@ -45,8 +157,19 @@ class TrainingPipeline :
     def start_validation (self,injection_artifact : DataIngestionArtifact , validation_config : DataValidationConfig) -> DataIngestionArtifact :
         try:
             logging.info("entered validation module")
-            data_val = DataValidation(injection_artifact=injection_artifact, validation_config=validation_config)
-            data_artifact = data_val.initiate_validation()
+            data_val = DataValidation(injection_artifact=injection_artifact, validation_config=validation_config,
+                                      artifact_store=self.artifact_store)
+            fingerprint = self.stage_fingerprint("validation", self.stage_fingerprints.get("ingestion"),
+                                                 validation_config, DataValidation, load_dataframe)
+            data_artifact = self.run_cached_stage(
+                "validation", fingerprint,
+                files={"report": validation_config.validation_report_file_path},
+                compute=data_val.initiate_validation,
+                restore=lambda meta: DataValidationArtifact(
+                    validation_status=meta["validation_status"], message=meta["message"],
+                    validation_report_file_path=validation_config.validation_report_file_path),
+                meta=lambda artifact: {"validation_status": artifact.validation_status,
+                                       "message": artifact.message})
             logging.info("data validation done sucessfully")
             return data_artifact
         except Exception as e:
@@ -58,8 +181,33 @@ class TrainingPipeline :
         try:
             transform = DataTransformation(ingection_artifact,
                                            validation_articat,
-                                           transformation_config)
-            transform_artifact = transform.start_transform()
+                                           transformation_config,
+                                           artifact_store=self.artifact_store,
+                                           base_model=self.base_model)
+            # a failed validation is never cached past, start_transform raises on it
+            upstream = self.stage_fingerprints.get("validation") if validation_articat.validation_status else None
+            if upstream is not None and self.base_model is not None:
+                # incremental runs transform with the production model's preprocessing
+                upstream = f"{upstream}:{self.base_model_version}"
+            fingerprint = self.stage_fingerprint("transformation", upstream, transformation_config,
+                                                 DataTransformation, load_dataframe, resampling)
+            transform_artifact = self.run_cached_stage(
+                "transformation", fingerprint,
+                files={"object": transformation_config.transformed_object_file_path,
+                       "train": transformation_config.transformed_train_file_path,
+                       "train_target": transformation_config.transformed_train_target_file_path,
+                       "test": transformation_config.transformed_test_file_path,
+                       "test_target": transformation_config.transformed_test_target_file_path},
+                compute=transform.start_transform,
+                restore=lambda meta: DataTransformationArtifact(
+                    transformed_object_file_path=transformation_config.transformed_object_file_path,
+                    transformed_train_file_path=transformation_config.transformed_train_file_path,
+                    transformed_test_file_path=transformation_config.transformed_test_file_path,
+                    transformed_train_target_file_path=transformation_config.transformed_train_target_file_path,
+                    transformed_test_target_file_path=transformation_config.transformed_test_target_file_path,
+                    resampling=meta.get("resampling", transformation_config.resampling),
+                    max_train_id=meta.get("max_train_id")),
+                meta=lambda artifact: {"resampling": artifact.resampling, "max_train_id": artifact.max_train_id})
 
             return transform_artifact
         except Exception as e:
@@ -69,7 +217,9 @@ class TrainingPipeline :
                         model_training_config : ModelTrainerConfig) -> ModelTrainerArtifact:
         try:
             trainer = ModelTraining(Data_tranform_artifact=Data_transform_artifact , 
-                                    model_training_config=model_training_config)
+                                    model_training_config=model_training_config,
+                                    artifact_store=self.artifact_store,
+                                    base_model=self.base_model)
             artifact = trainer.start_training()
 
             return artifact
@@ -82,7 +232,8 @@ class TrainingPipeline :
             logging.info("entered model eval stage")
             model_evaluation = ModelEvaluation(model_eval_config=self.model_eval_config,
                                                data_transform_artifact=data_transform_artifact,
-                                               model_train_artifact=model_trainer_artifact)
+                                               model_train_artifact=model_trainer_artifact,
+                                               artifact_store=self.artifact_store)
             model_evaluation_artifact = model_evaluation.start_eval()
             logging.info("completed model evaluation")
             return model_evaluation_artifact
@@ -104,22 +255,69 @@ class TrainingPipeline :
 
     def run_pipeline (self) ->None:
         try:   
-            data_artifact = self.start_ingestion()
-            data_val_artifact = self.start_validation(injection_artifact=data_artifact , 
-                                                      validation_config=self.data_validation_config)
-            data_transform_artifact = self.start_transformation(data_artifact,
-                                                                data_val_artifact,
-                                                                self.data_transform_config)
-            model_training_artifact = self.start_training(Data_transform_artifact=data_transform_artifact,
-                                                          model_training_config= self.model_training_config)
+            self.stage_fingerprints = {}
+            self.profiler.reset()
+            self.base_model, self.base_model_version = self.load_base_model()
+            ingestion_config = self.data_ingestion_config
+            split_rows = lambda artifact: {"train": self.count_rows(ingestion_config.training_file_path),
+                                           "test": self.count_rows(ingestion_config.testing_file_path)}
+            transformed_rows = lambda artifact: {"train": self.count_rows(artifact.transformed_train_target_file_path),
+                                                 "test": self.count_rows(artifact.transformed_test_target_file_path)}
+
+            data_artifact = self.run_profiled(
+                "ingestion", self.start_ingestion,
+                rows=lambda artifact: {"rows_in": {"feature_store": self.count_rows(ingestion_config.feature_store_file_path)},
+                                       "rows_out": split_rows(artifact)})
+            data_val_artifact = self.run_profiled(
+                "validation", self.start_validation,
+                rows=lambda artifact: {"rows_in": split_rows(artifact),
+                                       "rows_out": split_rows(artifact) if artifact.validation_status else {}},
+                injection_artifact=data_artifact, validation_config=self.data_validation_config)
+            data_transform_artifact = self.run_profiled(
+                "transformation", self.start_transformation,
+                rows=lambda artifact: {"rows_in": split_rows(artifact), "rows_out": transformed_rows(artifact)},
+                ingection_artifact=data_artifact, validation_articat=data_val_artifact,
+                transformation_config=self.data_transform_config)
+            model_training_artifact = self.run_profiled(
+                "training", self.start_training,
+                rows=lambda artifact: {"rows_in": {"train": transformed_rows(data_transform_artifact)["train"]}},
+                Data_transform_artifact=data_transform_artifact, model_training_config=self.model_training_config)
             
-            model_evaluation_artifact = self.start_model_evaluation(data_transform_artifact=data_transform_artifact,
-                                                                    model_trainer_artifact=model_training_artifact)
+            model_evaluation_artifact = self.run_profiled(
+                "evaluation", self.start_model_evaluation,
+                rows=lambda artifact: {"rows_in": {"test": transformed_rows(data_transform_artifact)["test"]}},
+                data_transform_artifact=data_transform_artifact, model_trainer_artifact=model_training_artifact)
             if not model_evaluation_artifact.is_model_accepted:
                 logging.info("Model not accepted.")
                 logging.info("aws model is better than trained model")
                 logging.info(f"{model_evaluation_artifact}")
+                self.artifact_store.flush()
                 return None
-            model_pusher_artifact = self.start_model_pusher(model_evaluation_artifact=model_evaluation_artifact)
+            # the pusher uploads the model file, so every background write must be on disk first
+            self.artifact_store.flush()
+            model_pusher_artifact = self.run_profiled("pusher", self.start_model_pusher,
+                                                      model_evaluation_artifact=model_evaluation_artifact)
         except Exception as e:
-            raise myexception(e,sys)
\ No newline at end of file
+            raise myexception(e,sys)
+        finally:
+            # files of a failed run are still written, so the run can be inspected or resumed
+            try:
+                self.artifact_store.close()
+            except Exception as e:
+                logging.error(f"writing artifacts failed: {e}")
+            if self.stage_cache is not None:
+                try:
+                    self.stage_cache.commit()
+                except Exception as e:
+                    logging.error(f"updating the stage cache failed: {e}")
+            try:
+                config = self.training_pipeline_config
+                self.profiler.save(config.profile_file_path,
+                                   timestamp=config.timestamp,
+                                   artifact_handoff=config.artifact_handoff,
+                                   stage_cache=config.stage_cache,
+                                   training_mode=self.model_training_config.training_mode,
+                                   resampling=self.data_transform_config.resampling,
+                                   precision=self.data_transform_config.precision)
+            except Exception as e:
+                logging.error(f"saving the pipeline profile failed: {e}")
\ No newline at end of file
@@ -0,0 +1,138 @@
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from src.exception import myexception
+from src.logger import logging
+
+
+class ArtifactStore:
+    """
+    Hands stage outputs (frames, arrays, fitted objects) to the next stage of a pipeline run.
+
+    Artifacts are always addressed by their file path, so the artifact dataclasses do not change.
+    In memory mode the object is kept in memory, returned as is to the next stage and written
+    to its path by a background thread; in file mode it is written at once and every stage
+    loads from disk (which is also what a resumed run, holding only paths, does).
+    Call flush() before anything reads the files themselves (e.g. uploading the model).
+    A stage that would rather map a file than hold the array (load(prefer_file=True)) waits for
+    that file's write, the in memory copy is dropped then and the file is loaded instead.
+    An object is only kept until the consumers given to save() have loaded it and it is on disk,
+    so a run never holds every artifact it produced (later loads read the file).
+    """
+    def __init__(self, in_memory: bool = False) -> None:
+        self.in_memory = in_memory
+        self._objects: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._pending: List[Future] = []
+        self._writes: Dict[str, Future] = {}
+        # loads left before an object can be dropped (once it is written)
+        self._consumers: Dict[str, int] = {}
+        self._writer: Optional[ThreadPoolExecutor] = None
+        if in_memory:
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="artifact-writer")
+
+    def save(self, file_path: str, obj: Any, writer: Callable[[str, Any], None], consumers: int = 1) -> None:
+        """
+        writer(file_path, obj) persists obj, e.g. save_dataframe, save_numpy_array_data or save_object
+        consumers is how many load() calls of later stages get the in memory object
+        (0 for artifacts nothing loads back, they are dropped as soon as they are written)
+        """
+        try:
+            if not self.in_memory:
+                writer(file_path, obj)
+                return
+            with self._lock:
+                self._objects[file_path] = obj
+                self._consumers[file_path] = consumers
+                future = self._writer.submit(self._write, file_path, obj, writer)
+                self._pending.append(future)
+                self._writes[file_path] = future
+            future.add_done_callback(lambda write: self._written(file_path, write))
+        except Exception as e:
+            raise myexception(e, sys)
+
+    def _written(self, file_path: str, write: Future) -> None:
+        if write.exception() is not None:
+            # kept in memory and raised by flush() / load(prefer_file=True)
+            logging.error(f"background write of artifact {file_path} failed: {write.exception()}")
+            return
+        with self._lock:
+            if self._writes.get(file_path) is write:
+                self._evict_if_consumed(file_path)
+
+    def _evict_if_consumed(self, file_path: str) -> None:
+        """
+        drops the object once nothing is left to load it and its file is complete (never when the write
+        failed, there is no file to fall back to); call with the lock held
+        """
+        write = self._writes.get(file_path)
+        written = write is None or (write.done() and write.exception() is None)
+        if self._consumers.get(file_path, 0) <= 0 and written and file_path in self._objects:
+            del self._objects[file_path]
+            logging.info(f"artifact released from memory: {file_path}")
+
+    @staticmethod
+    def _write(file_path: str, obj: Any, writer: Callable[[str, Any], None]) -> None:
+        writer(file_path, obj)
+        logging.info(f"artifact written in background: {file_path}")
+
+    def load(self, file_path: str, loader: Callable[..., Any], columns: Optional[List[str]] = None,
+             prefer_file: bool = False) -> Any:
+        """
+        the in memory object for file_path if this run produced it, else loader(file_path)
+        columns selects a subset of a frame (and is passed on to loader when reading from disk)
+        prefer_file waits for the background write and loads the file (e.g. memory mapped arrays)
+        """
+        try:
+            if prefer_file:
+                with self._lock:
+                    write = self._writes.pop(file_path, None)
+                if write is not None:
+                    write.result()
+                    with self._lock:
+                        self._objects.pop(file_path, None)
+                    logging.info(f"artifact loaded from its file once written: {file_path}")
+            with self._lock:
+                obj = self._objects.get(file_path)
+                if obj is not None:
+                    self._consumers[file_path] = self._consumers.get(file_path, 0) - 1
+                    self._evict_if_consumed(file_path)
+            if obj is None:
+                return loader(file_path) if columns is None else loader(file_path, columns=columns)
+            logging.info(f"artifact handed over in memory: {file_path}")
+            return obj if columns is None else obj[columns]
+        except Exception as e:
+            raise myexception(e, sys)
+
+    def peek(self, file_path: str) -> Any:
+        """
+        the in memory object for file_path, None if it has to be read from disk
+        """
+        with self._lock:
+            return self._objects.get(file_path)
+
+    def flush(self) -> None:
+        """
+        waits until every background write is on disk, raising the first write error
+        """
+        try:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            for future in pending:
+                future.result()
+        except Exception as e:
+            raise myexception(e, sys)
+
+    def close(self) -> None:
+        """
+        flushes, then drops the in memory objects (the store can be used again for the next run)
+        """
+        try:
+            self.flush()
+        finally:
+            with self._lock:
+                self._objects.clear()
+                self._writes.clear()
+                self._consumers.clear()
@@ -0,0 +1,44 @@
+import threading
+from collections import deque
+from typing import Optional
+
+import numpy as np
+
+
+class LatencyTracker:
+    """
+    keeps the last `window` latencies and reports percentiles against a p50/p99 budget
+    """
+    def __init__(self, p50_budget_ms: float, p99_budget_ms: float, window: int = 10000) -> None:
+        self.p50_budget_ms = p50_budget_ms
+        self.p99_budget_ms = p99_budget_ms
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds * 1000)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            samples = np.fromiter(self._samples, dtype=np.float64)
+        if samples.size == 0:
+            return None
+        return float(np.percentile(samples, q))
+
+    def report(self) -> dict:
+        """
+        p50/p99 in ms, the budget and whether the current window is within it
+        """
+        p50, p99 = self.percentile(50), self.percentile(99)
+        within_budget = None
+        if p50 is not None:
+            within_budget = p50 <= self.p50_budget_ms and p99 <= self.p99_budget_ms
+        return {
+            "samples": len(self._samples),
+            "p50_ms": p50,
+            "p99_ms": p99,
+            "p50_budget_ms": self.p50_budget_ms,
+            "p99_budget_ms": self.p99_budget_ms,
+            "within_budget": within_budget,
+        }
@@ -4,7 +4,11 @@ import sys
 import numpy as np
 import dill
 import yaml
+import pandas as pd
 from pandas import DataFrame
+from typing import List, Optional
+
+from src.constants import ARTIFACT_PARQUET_COMPRESSION, TRANSFORMED_ARRAY_MMAP_MODE
 
 from src.exception import myexception
 from src.logger import logging
@@ -59,19 +63,190 @@ def save_numpy_array_data(file_path: str, array: np.array):
         raise myexception(e, sys) from e
 
 
-def load_numpy_array_data(file_path: str) -> np.array:
+def load_numpy_array_data(file_path: str, mmap_mode: Optional[str] = None) -> np.array:
     """
     load numpy array data from file
     file_path: str location of file to load
+    mmap_mode: e.g. "r" maps the file instead of reading it, pages are loaded when touched
     return: np.array data loaded
     """
     try:
+        if mmap_mode is not None:
+            return np.load(file_path, mmap_mode=mmap_mode)
         with open(file_path, 'rb') as file_obj:
             return np.load(file_obj)
     except Exception as e:
         raise myexception(e, sys) from e
 
 
+def precision_dtype(precision: str) -> np.dtype:
+    """
+    numpy dtype of a precision mode, "float32" or "float64"
+    """
+    if precision not in ("float32", "float64"):
+        raise ValueError(f"precision must be float32 or float64, got {precision}")
+    return np.dtype(precision)
+
+
+def load_mapped_array(file_path: str) -> np.array:
+    """
+    transformed dataset array, memory-mapped read only (slices of it are views, not copies)
+    """
+    return load_numpy_array_data(file_path, mmap_mode=TRANSFORMED_ARRAY_MMAP_MODE)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    peak resident memory of this process so far in MB, None where the resource module is missing (windows)
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macos
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+ARTIFACT_FORMATS = {"csv": ".csv", "parquet": ".parquet", "feather": ".feather"}
+
+
+def artifact_format_of(file_path: str) -> str:
+    """
+    artifact format from the file extension (csv, parquet or feather)
+    """
+    extension = os.path.splitext(file_path)[1]
+    for file_format, format_extension in ARTIFACT_FORMATS.items():
+        if extension == format_extension:
+            return file_format
+    raise ValueError(f"unknown artifact format for {file_path}, expected one of {list(ARTIFACT_FORMATS.values())}")
+
+
+def with_artifact_format(file_path: str, file_format: str) -> str:
+    """
+    file_path with its extension replaced by the one of file_format
+    """
+    if file_format not in ARTIFACT_FORMATS:
+        raise ValueError(f"unknown artifact format {file_format}, expected one of {list(ARTIFACT_FORMATS)}")
+    return os.path.splitext(file_path)[0] + ARTIFACT_FORMATS[file_format]
+
+
+def save_dataframe(file_path: str, dataframe: DataFrame) -> None:
+    """
+    Save a dataframe as csv, parquet or feather (picked by the file extension)
+    parquet and feather keep the column dtypes and are compressed
+    """
+    try:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        file_format = artifact_format_of(file_path)
+        if file_format == "parquet":
+            dataframe.to_parquet(file_path, index=False, compression=ARTIFACT_PARQUET_COMPRESSION)
+        elif file_format == "feather":
+            dataframe.reset_index(drop=True).to_feather(file_path, compression=ARTIFACT_PARQUET_COMPRESSION)
+        else:
+            dataframe.to_csv(file_path, index=False)
+    except Exception as e:
+        raise myexception(e, sys) from e
+
+
+def load_dataframe(file_path: str, columns: Optional[List[str]] = None) -> DataFrame:
+    """
+    Load a dataframe saved by save_dataframe
+    columns: only read these columns (parquet and feather skip the others on disk)
+    """
+    try:
+        file_format = artifact_format_of(file_path)
+        if file_format == "parquet":
+            return pd.read_parquet(file_path, columns=columns)
+        if file_format == "feather":
+            return pd.read_feather(file_path, columns=columns)
+        return pd.read_csv(file_path, usecols=columns)
+    except Exception as e:
+        raise myexception(e, sys) from e
+
+
+def to_storage_dtype(series: pd.Series, dtype: str) -> pd.Series:
+    """
+    series cast to a schema storage dtype (int8/uint8/int16/int32/float32/category) without losing values:
+    integer types fall back to float32 when values are missing and are skipped when a value is out of range
+    """
+    if dtype == "category":
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            return series
+        # sorted categories, so get_dummies(drop_first=True) drops the same level as for strings
+        return series.astype(pd.CategoricalDtype(sorted(series.dropna().unique())))
+    target = np.dtype(dtype)
+    if series.dtype == target:
+        return series
+    if target.kind in "iu":
+        if series.isna().any():
+            return series.astype(np.float32)
+        info = np.iinfo(target)
+        if len(series) and (series.min() < info.min or series.max() > info.max):
+            logging.warning(f"{series.name} does not fit {dtype}, kept as {series.dtype}")
+            return series
+    return series.astype(target)
+
+
+def compact_dataframe(dataframe: DataFrame, storage_dtypes: dict, name: str = "dataframe") -> DataFrame:
+    """
+    new frame with every column listed in storage_dtypes cast to its storage dtype, logs memory before/after
+    """
+    try:
+        before = dataframe.memory_usage(deep=True).sum()
+        casted = {column: to_storage_dtype(dataframe[column], dtype)
+                  for column, dtype in storage_dtypes.items() if column in dataframe.columns}
+        dataframe = dataframe.assign(**casted)
+        after = dataframe.memory_usage(deep=True).sum()
+        logging.info(f"{name} memory {before / 2**20:.1f} MB -> {after / 2**20:.1f} MB ({len(dataframe)} rows)")
+        return dataframe
+    except Exception as e:
+        raise myexception(e, sys) from e
+
+
+def load_dataframe_columns(file_path: str) -> List[str]:
+    """
+    column names of a saved dataframe, read from the parquet/feather schema or the csv header only
+    """
+    try:
+        file_format = artifact_format_of(file_path)
+        if file_format == "parquet":
+            import pyarrow.parquet as pq
+            return list(pq.read_schema(file_path).names)
+        if file_format == "feather":
+            import pyarrow.ipc as ipc
+            with ipc.open_file(file_path) as reader:
+                return list(reader.schema.names)
+        return pd.read_csv(file_path, nrows=0).columns.to_list()
+    except Exception as e:
+        raise myexception(e, sys) from e
+
+
+def count_rows(file_path: str) -> Optional[int]:
+    """
+    rows of a saved array (.npy header) or dataframe (parquet / feather metadata) without reading the data;
+    None for csv (it would take a full pass) and missing files
+    """
+    try:
+        if not os.path.exists(file_path):
+            return None
+        if file_path.endswith(".npy"):
+            return int(np.load(file_path, mmap_mode="r").shape[0])
+        file_format = artifact_format_of(file_path)
+        if file_format == "parquet":
+            import pyarrow.parquet as pq
+            return int(pq.ParquetFile(file_path).metadata.num_rows)
+        if file_format == "feather":
+            import pyarrow as pa
+            import pyarrow.ipc as ipc
+            # memory mapped, so the batches are not read to count their rows
+            with ipc.open_file(pa.memory_map(file_path)) as reader:
+                return sum(reader.get_record_batch(i).num_rows for i in range(reader.num_record_batches))
+        return None
+    except Exception as e:
+        raise myexception(e, sys) from e
+
+
 def save_object(file_path: str, obj: object) -> None:
     logging.info("Entered the save_object method of utils")
 
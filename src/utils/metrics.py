@@ -0,0 +1,82 @@
+import sys
+import threading
+from typing import Tuple
+
+import numpy as np
+from joblib import Parallel, delayed
+
+from src.entity.artifact_entity import ClassificationMetricArtifact
+from src.exception import myexception
+
+
+def confusion_matrix(y_true: np.ndarray, y_pred: np.ndarray, n_classes: int = 2) -> np.ndarray:
+    """
+    counts[true, predicted] of integer class labels 0..n_classes-1, one bincount over both arrays
+    """
+    try:
+        y_true = np.asarray(y_true, dtype=np.intp)
+        y_pred = np.asarray(y_pred, dtype=np.intp)
+        if len(y_true):
+            n_classes = max(n_classes, int(y_true.max()) + 1, int(y_pred.max()) + 1)
+        return np.bincount(y_true * n_classes + y_pred, minlength=n_classes * n_classes).reshape(n_classes, n_classes)
+    except Exception as e:
+        raise myexception(e, sys)
+
+
+def _ratio(numerator: float, denominator: float) -> float:
+    # 0 for an empty denominator, as sklearn does (without its warning)
+    return float(numerator / denominator) if denominator else 0.0
+
+
+def metrics_from_confusion(matrix: np.ndarray, pos_label: int = 1) -> ClassificationMetricArtifact:
+    """
+    accuracy over every class, f1 / precision / recall of pos_label (sklearn's binary average)
+    """
+    true_positive = matrix[pos_label, pos_label]
+    predicted_positive = matrix[:, pos_label].sum()
+    actual_positive = matrix[pos_label, :].sum()
+    return ClassificationMetricArtifact(
+        accuracy=_ratio(np.trace(matrix), matrix.sum()),
+        f1_score=_ratio(2 * true_positive, predicted_positive + actual_positive),
+        precision_score=_ratio(true_positive, predicted_positive),
+        recall_score=_ratio(true_positive, actual_positive))
+
+
+def classification_metrics(y_true: np.ndarray, y_pred: np.ndarray, pos_label: int = 1) -> ClassificationMetricArtifact:
+    """
+    every metric of one prediction pass from a single confusion matrix, instead of a pass per metric
+    """
+    return metrics_from_confusion(confusion_matrix(y_true, y_pred), pos_label=pos_label)
+
+
+def oob_predict(forest, x: np.ndarray, unseen_trees: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    out of bag predictions of a bagged forest for the rows it was fitted on: a row gets the mean
+    class probability of only the trees whose bootstrap sample did not contain it, so the score
+    costs each tree ~37% of the rows instead of re-predicting all of them with every tree.
+    The first unseen_trees trees were fitted on other rows (a warm started forest) and vote on every row.
+    :return: predicted labels and the mask of rows at least one tree could vote on
+    """
+    try:
+        if not getattr(forest, "bootstrap", False):
+            raise ValueError(f"{type(forest).__name__} is not bagged, it has no out of bag rows")
+        n_rows = len(x)
+        proba = np.zeros((n_rows, len(forest.classes_)))
+        lock = threading.Lock()
+
+        def vote(tree, in_bag):
+            # row indices and take() copy the out of bag rows faster than a boolean mask
+            rows = np.arange(n_rows) if in_bag is None else np.flatnonzero(np.bincount(in_bag, minlength=n_rows) == 0)
+            tree_proba = tree.predict_proba(x.take(rows, axis=0))
+            with lock:
+                proba[rows] += tree_proba
+
+        trees = forest.estimators_
+        # estimators_samples_ redraws every tree's bootstrap sample from its seed and the current row count
+        samples = [None] * unseen_trees + list(forest.estimators_samples_[unseen_trees:])
+        Parallel(n_jobs=forest.n_jobs, prefer="threads")(delayed(vote)(tree, in_bag)
+                                                         for tree, in_bag in zip(trees, samples))
+        voted = proba.sum(axis=1) > 0
+        return forest.classes_.take(np.argmax(proba, axis=1)), voted
+    except Exception as e:
+        raise myexception(e, sys)
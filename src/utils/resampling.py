@@ -0,0 +1,82 @@
+import sys
+import math
+from typing import Optional, Tuple
+
+import numpy as np
+from sklearn.neighbors import NearestNeighbors
+from imblearn.combine import SMOTEENN
+from imblearn.over_sampling import RandomOverSampler
+from imblearn.under_sampling import RandomUnderSampler
+
+from src.exception import myexception
+from src.logger import logging
+
+RESAMPLING_STRATEGIES = ("smoteenn", "chunked_smote", "random_over", "random_under", "class_weight", "none")
+
+
+def chunked_smote(x: np.ndarray, y: np.ndarray, k_neighbors: int = 5, chunk_size: int = 50000,
+                  random_state: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    SMOTE up to a balanced minority class, with neighbours searched inside random chunks of at most
+    chunk_size minority rows instead of the whole class (approximate neighbours, k-NN cost per chunk
+    instead of over all rows); synthetic rows lie between a minority row and one of its k neighbours
+    """
+    try:
+        classes, counts = np.unique(y, return_counts=True)
+        minority = classes[np.argmin(counts)]
+        n_new = int(counts.max() - counts.min())
+        if n_new == 0:
+            return x, y
+        rng = np.random.default_rng(random_state)
+        minority_rows = rng.permutation(np.flatnonzero(y == minority))
+        chunks = np.array_split(minority_rows, math.ceil(len(minority_rows) / chunk_size))
+        # synthetic rows per chunk in proportion to its size, the remainder spread one by one
+        per_chunk = [n_new * len(chunk) // len(minority_rows) for chunk in chunks]
+        for i in range(n_new - sum(per_chunk)):
+            per_chunk[i % len(chunks)] += 1
+
+        synthetic = np.empty((n_new, x.shape[1]), dtype=x.dtype)
+        start = 0
+        for chunk, n in zip(chunks, per_chunk):
+            points = np.asarray(x[chunk])
+            base = rng.integers(0, len(points), n)
+            k = min(k_neighbors, len(points) - 1)
+            if k < 1:
+                synthetic[start:start + n] = points[base]
+            else:
+                neighbours = NearestNeighbors(n_neighbors=k + 1).fit(points).kneighbors(points, return_distance=False)
+                # column 0 is the row itself
+                partner = neighbours[base, rng.integers(1, k + 1, n)]
+                gap = rng.random((n, 1)).astype(x.dtype)
+                synthetic[start:start + n] = points[base] + gap * (points[partner] - points[base])
+            start += n
+        logging.info(f"chunked smote: {n_new} synthetic rows from {len(chunks)} chunk(s) of "
+                     f"{len(minority_rows)} minority rows")
+        return np.concatenate((x, synthetic)), np.concatenate((y, np.full(n_new, minority, dtype=y.dtype)))
+    except Exception as e:
+        raise myexception(e, sys)
+
+
+def resample(x: np.ndarray, y: np.ndarray, strategy: str, k_neighbors: int = 5, chunk_size: int = 50000,
+             random_state: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    balances the training rows with strategy (one of RESAMPLING_STRATEGIES);
+    "class_weight" and "none" return them unchanged, class_weight is applied by the trainer
+    """
+    try:
+        if strategy not in RESAMPLING_STRATEGIES:
+            raise ValueError(f"resampling must be one of {RESAMPLING_STRATEGIES}, got {strategy}")
+        logging.info(f"resampling {len(y)} training rows with {strategy}")
+        if strategy in ("class_weight", "none"):
+            return x, y
+        if strategy == "chunked_smote":
+            return chunked_smote(x, y, k_neighbors=k_neighbors, chunk_size=chunk_size, random_state=random_state)
+        if strategy == "smoteenn":
+            sampler = SMOTEENN(sampling_strategy="minority", random_state=random_state)
+        elif strategy == "random_over":
+            sampler = RandomOverSampler(random_state=random_state)
+        else:
+            sampler = RandomUnderSampler(random_state=random_state)
+        return sampler.fit_resample(x, y)
+    except Exception as e:
+        raise myexception(e, sys)
@@ -0,0 +1,162 @@
+import os
+import sys
+import json
+import shutil
+import hashlib
+import inspect
+import dataclasses
+from typing import Dict, List, Optional, Tuple
+
+from src.constants import STAGE_CACHE_DIR, STAGE_CACHE_MAX_ENTRIES_PER_STAGE
+from src.exception import myexception
+from src.logger import logging
+
+
+def hash_file(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def code_version(*objects) -> str:
+    """
+    hash of the source files the given modules / classes / functions are defined in
+    """
+    digest = hashlib.sha256()
+    for source_file in sorted({inspect.getsourcefile(obj) for obj in objects}):
+        digest.update(os.path.basename(source_file).encode())
+        digest.update(hash_file(source_file).encode())
+    return digest.hexdigest()
+
+
+def config_key(config, exclude=()) -> dict:
+    """
+    the fields of a config dataclass that change a stage's output (paths of the current run and
+    exclude, e.g. tuning knobs that do not change the result, left out)
+    """
+    return {name: value for name, value in dataclasses.asdict(config).items()
+            if not (name.endswith("_path") or name.endswith("_dir") or name in exclude)}
+
+
+class StageCache:
+    """
+    Content addressed cache of pipeline stage outputs, shared by every run.
+
+    A stage is keyed by a fingerprint of everything that decides its output (input data
+    fingerprint, schema, config, code version). Output files are stored once per content hash
+    under blobs/ and a manifest per (stage, fingerprint) maps output names to blobs. A run that
+    finds a manifest hard links the blobs into its own artifact dir (copy across devices) instead
+    of recomputing the stage. Only the newest max_entries manifests per stage are kept, blobs no
+    manifest refers to are deleted.
+    """
+    def __init__(self, root_dir: str = STAGE_CACHE_DIR,
+                 max_entries_per_stage: int = STAGE_CACHE_MAX_ENTRIES_PER_STAGE) -> None:
+        self.root_dir = root_dir
+        self.blob_dir = os.path.join(root_dir, "blobs")
+        self.manifest_dir = os.path.join(root_dir, "stages")
+        self.max_entries_per_stage = max_entries_per_stage
+        self._pending: List[Tuple[str, str, Dict[str, str], dict]] = []
+
+    @staticmethod
+    def fingerprint(stage: str, *parts) -> str:
+        payload = json.dumps([stage, parts], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _manifest_path(self, stage: str, fingerprint: str) -> str:
+        return os.path.join(self.manifest_dir, stage, f"{fingerprint}.json")
+
+    def _blob_path(self, content_hash: str) -> str:
+        return os.path.join(self.blob_dir, content_hash[:2], content_hash)
+
+    @staticmethod
+    def _link(source: str, target: str) -> None:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if os.path.exists(target):
+            os.remove(target)
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copy2(source, target)
+
+    def restore(self, stage: str, fingerprint: str, targets: Dict[str, str]) -> Optional[dict]:
+        """
+        links the cached outputs of stage to targets (output name -> path of this run)
+        :return: the meta data recorded with the outputs, None on a cache miss
+        """
+        try:
+            manifest_path = self._manifest_path(stage, fingerprint)
+            if not os.path.exists(manifest_path):
+                return None
+            with open(manifest_path) as file:
+                manifest = json.load(file)
+            blobs = {name: self._blob_path(content_hash) for name, content_hash in manifest["files"].items()}
+            if set(targets) - set(blobs) or not all(os.path.exists(blobs[name]) for name in targets):
+                logging.warning(f"stage cache entry {stage}/{fingerprint[:12]} is incomplete, recomputing")
+                return None
+            for name, target in targets.items():
+                self._link(blobs[name], target)
+            os.utime(manifest_path)
+            logging.info(f"stage {stage} reused from cache ({fingerprint[:12]})")
+            return manifest.get("meta", {})
+        except Exception as e:
+            raise myexception(e, sys)
+
+    def record(self, stage: str, fingerprint: str, files: Dict[str, str], meta: Optional[dict] = None) -> None:
+        """
+        remembers a computed stage; its files are stored by commit(), once they are all on disk
+        """
+        self._pending.append((stage, fingerprint, dict(files), meta or {}))
+
+    def commit(self) -> None:
+        """
+        stores the recorded stage outputs (hard linked, deduplicated by content) and applies retention
+        """
+        try:
+            pending, self._pending = self._pending, []
+            for stage, fingerprint, files, meta in pending:
+                missing = [path for path in files.values() if not os.path.exists(path)]
+                if missing:
+                    logging.warning(f"not caching stage {stage}, outputs missing: {missing}")
+                    continue
+                hashes = {}
+                for name, path in files.items():
+                    content_hash = hash_file(path)
+                    blob_path = self._blob_path(content_hash)
+                    if not os.path.exists(blob_path):
+                        self._link(path, blob_path)
+                    hashes[name] = content_hash
+                manifest_path = self._manifest_path(stage, fingerprint)
+                os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+                tmp_path = manifest_path + ".tmp"
+                with open(tmp_path, "w") as file:
+                    json.dump({"stage": stage, "fingerprint": fingerprint, "files": hashes, "meta": meta}, file)
+                os.replace(tmp_path, manifest_path)
+                logging.info(f"stage {stage} cached ({fingerprint[:12]})")
+            if pending:
+                self.apply_retention()
+        except Exception as e:
+            raise myexception(e, sys)
+
+    def apply_retention(self) -> None:
+        """
+        keeps the newest max_entries_per_stage manifests of every stage and deletes unreferenced blobs
+        """
+        if not os.path.isdir(self.manifest_dir):
+            return
+        referenced = set()
+        for stage in os.listdir(self.manifest_dir):
+            stage_dir = os.path.join(self.manifest_dir, stage)
+            manifests = sorted((os.path.join(stage_dir, name) for name in os.listdir(stage_dir)
+                                if name.endswith(".json")), key=os.path.getmtime, reverse=True)
+            for manifest_path in manifests[self.max_entries_per_stage:]:
+                os.remove(manifest_path)
+            for manifest_path in manifests[:self.max_entries_per_stage]:
+                with open(manifest_path) as file:
+                    referenced.update(json.load(file)["files"].values())
+        for prefix in os.listdir(self.blob_dir) if os.path.isdir(self.blob_dir) else []:
+            prefix_dir = os.path.join(self.blob_dir, prefix)
+            for content_hash in os.listdir(prefix_dir):
+                if content_hash not in referenced:
+                    os.remove(os.path.join(prefix_dir, content_hash))
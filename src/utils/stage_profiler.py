@@ -0,0 +1,171 @@
+import os
+import sys
+import json
+import time
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Iterator, List, Optional
+
+from src.constants import PIPELINE_PROFILE_RSS_SAMPLE_SECONDS, PIPELINE_PROFILE_TRACEMALLOC
+from src.exception import myexception
+from src.logger import logging
+from src.utils.main_utils import peak_rss_mb
+
+
+def current_rss_mb() -> Optional[float]:
+    """
+    resident memory of this process right now in MB, None where /proc is missing (macos, windows)
+    """
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class _RssSampler(threading.Thread):
+    """
+    samples the resident memory every interval seconds until stopped, keeping the highest
+    """
+    def __init__(self, interval: float) -> None:
+        super().__init__(name="rss-sampler", daemon=True)
+        self.interval = interval
+        self.peak = current_rss_mb()
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while self.peak is not None and not self._stopped.wait(self.interval):
+            self.peak = max(self.peak, current_rss_mb() or 0.0)
+
+    def stop(self) -> Optional[float]:
+        self._stopped.set()
+        self.join()
+        rss = current_rss_mb()
+        return None if self.peak is None else max(self.peak, rss or 0.0)
+
+
+def _mb(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 1)
+
+
+def _total_rows(rows: Optional[dict]) -> Optional[int]:
+    counts = [count for count in (rows or {}).values() if count is not None]
+    return sum(counts) if counts else None
+
+
+class StageProfiler:
+    """
+    Measures every stage of a pipeline run: wall time, cpu time, peak resident memory while the
+    stage ran, rows in / out and whatever else the stage annotates (e.g. a stage cache hit).
+
+    Peak memory is sampled from /proc every rss_sample_seconds (the process high-water mark from
+    the resource module where /proc is missing); with trace_allocations the peak of the python /
+    numpy allocations tracemalloc sees is recorded too. cpu time counts every thread of this
+    process but not worker processes (e.g. the hyperparameter search pool).
+
+    Listeners get a copy of a stage's record when it starts and when it ends, so a client can
+    follow the run live; save() writes the whole run as one json profile.
+    """
+    def __init__(self, rss_sample_seconds: float = PIPELINE_PROFILE_RSS_SAMPLE_SECONDS,
+                 trace_allocations: bool = PIPELINE_PROFILE_TRACEMALLOC) -> None:
+        self.rss_sample_seconds = rss_sample_seconds
+        self.trace_allocations = trace_allocations
+        self.listeners: List[Callable[[dict], None]] = []
+        self.stages: List[dict] = []
+        self.started_at = datetime.now()
+        self._started = time.perf_counter()
+        self._current: Optional[dict] = None
+
+    def subscribe(self, listener: Callable[[dict], None]) -> None:
+        self.listeners.append(listener)
+
+    def reset(self) -> None:
+        """
+        forgets the stages of the previous run
+        """
+        self.stages = []
+        self.started_at = datetime.now()
+        self._started = time.perf_counter()
+
+    def _notify(self, record: dict) -> None:
+        for listener in self.listeners:
+            try:
+                listener(dict(record))
+            except Exception as e:
+                # a client that went away must not fail the run
+                logging.warning(f"stage profile listener failed: {e}")
+
+    def annotate(self, **fields) -> None:
+        """
+        adds fields (e.g. rows_in, rows_out, cached) to the record of the running stage
+        """
+        if self._current is not None:
+            self._current.update(fields)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[dict]:
+        record = {"stage": name, "status": "running",
+                  "started_at": datetime.now().isoformat(timespec="milliseconds"),
+                  "rows_in": None, "rows_out": None}
+        self.stages.append(record)
+        self._current = record
+        self._notify(record)
+
+        started_tracing = self.trace_allocations and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if self.trace_allocations:
+            tracemalloc.reset_peak()
+        rss_start = current_rss_mb()
+        sampler = _RssSampler(self.rss_sample_seconds)
+        sampler.start()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield record
+            record["status"] = "done"
+        except BaseException as e:
+            record["status"] = "failed"
+            record["error"] = str(e)
+            raise
+        finally:
+            record["wall_seconds"] = round(time.perf_counter() - wall_start, 4)
+            record["cpu_seconds"] = round(time.process_time() - cpu_start, 4)
+            peak = sampler.stop()
+            process_peak = peak_rss_mb()
+            rss_end = current_rss_mb()
+            # the samples can miss the start / end reading (memory moves between the reads)
+            readings = [rss for rss in (peak if peak is not None else process_peak, rss_start, rss_end)
+                        if rss is not None]
+            record["rss_start_mb"] = _mb(rss_start)
+            record["rss_end_mb"] = _mb(rss_end)
+            record["peak_rss_mb"] = _mb(max(readings) if readings else None)
+            record["process_peak_rss_mb"] = _mb(process_peak)
+            if self.trace_allocations:
+                record["traced_peak_mb"] = _mb(tracemalloc.get_traced_memory()[1] / 2**20)
+                if started_tracing:
+                    tracemalloc.stop()
+            self._current = None
+            logging.info(f"stage {name} {record['status']}: {record['wall_seconds']}s wall, "
+                         f"{record['cpu_seconds']}s cpu, peak rss {record['peak_rss_mb']} MB, "
+                         f"rows in {_total_rows(record['rows_in'])} out {_total_rows(record['rows_out'])}")
+            self._notify(record)
+
+    def profile(self, **run_info) -> dict:
+        return {"started_at": self.started_at.isoformat(timespec="seconds"),
+                "wall_seconds": round(time.perf_counter() - self._started, 4),
+                **run_info,
+                "stages": self.stages}
+
+    def save(self, file_path: str, **run_info) -> None:
+        """
+        writes the profile of the run, run_info (e.g. the pipeline settings) included at the top
+        """
+        try:
+            os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+            with open(file_path, "w") as file:
+                json.dump(self.profile(**run_info), file, indent=2, default=str)
+            logging.info(f"pipeline profile saved to {file_path}")
+        except Exception as e:
+            raise myexception(e, sys)
@@ -189,6 +189,20 @@ trainBtn.addEventListener('click', async () => {
         logContainer.scrollTop = logContainer.scrollHeight;
     };
     
+    eventSource.addEventListener('stage_profile', (event) => {
+        const stage = JSON.parse(event.data);
+        if (stage.status === 'running') {
+            return;
+        }
+        const sumRows = (rows) => rows ? Object.values(rows).reduce((total, count) => total + (count || 0), 0) : '-';
+        const profileMsg = document.createElement('div');
+        profileMsg.className = 'log-message ' + (stage.status === 'failed' ? 'error' : 'info');
+        profileMsg.textContent = `⏱ ${stage.stage}${stage.cached ? ' (cached)' : ''}: ${stage.wall_seconds}s wall, ` +
+            `${stage.cpu_seconds}s cpu, peak ${stage.peak_rss_mb} MB, rows ${sumRows(stage.rows_in)} → ${sumRows(stage.rows_out)}`;
+        logContainer.appendChild(profileMsg);
+        logContainer.scrollTop = logContainer.scrollHeight;
+    });
+
     eventSource.onerror = (error) => {
         console.error('SSE Error:', error);
         eventSource.close();
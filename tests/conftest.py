@@ -0,0 +1,26 @@
+import os
+
+import pytest
+
+from tests.helpers import make_model
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="session")
+def trained_model():
+    return make_model()
+
+
+@pytest.fixture
+def mongo_client(monkeypatch):
+    """
+    in-memory mongomock client behind mongoDB_connection, the schema is read relative to the repo root
+    """
+    mongomock = pytest.importorskip("mongomock")
+    from src.configuration.mongo_db_connection import mongoDB_connection
+
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(mongoDB_connection, "clint", client)
+    monkeypatch.chdir(REPO_ROOT)
+    return client
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+from imblearn.pipeline import Pipeline
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import MinMaxScaler, StandardScaler
+
+from src.constants import PREDICTION_INPUT_COLUMNS
+from src.entity.estimator import MyModel
+from src.utils.main_utils import precision_dtype
+
+
+def make_applicants(n_rows, seed=0):
+    """
+    raw applicants in PREDICTION_INPUT_COLUMNS order, with a target that depends on them
+    """
+    rng = np.random.default_rng(seed)
+    dataframe = pd.DataFrame({
+        "Gender": rng.integers(0, 2, n_rows),
+        "Age": rng.integers(20, 85, n_rows),
+        "Driving_License": rng.integers(0, 2, n_rows),
+        "Region_Code": rng.integers(0, 53, n_rows).astype(float),
+        "Previously_Insured": rng.integers(0, 2, n_rows),
+        "Annual_Premium": rng.uniform(2630, 100000, n_rows).round(0),
+        "Policy_Sales_Channel": rng.integers(1, 164, n_rows).astype(float),
+        "Vintage": rng.integers(10, 300, n_rows),
+        "Vehicle_Age_lt_1_Year": rng.integers(0, 2, n_rows),
+        "Vehicle_Age_gt_2_Years": rng.integers(0, 2, n_rows),
+        "Vehicle_Damage_Yes": rng.integers(0, 2, n_rows),
+    }, columns=PREDICTION_INPUT_COLUMNS)
+    target = (((dataframe["Vehicle_Damage_Yes"] == 1) & (dataframe["Previously_Insured"] == 0)
+               & (rng.random(n_rows) < 0.6)) | (rng.random(n_rows) < 0.1)).astype(int).to_numpy()
+    return dataframe, target
+
+
+def make_raw_records(n_rows, seed=0, first_id=1):
+    """
+    documents shaped like the source collection (config/schema.yaml columns, raw category strings)
+    """
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "id": np.arange(first_id, first_id + n_rows),
+        "Gender": rng.choice(["Male", "Female"], n_rows),
+        "Age": rng.integers(20, 85, n_rows),
+        "Driving_License": rng.integers(0, 2, n_rows),
+        "Region_Code": rng.integers(0, 53, n_rows).astype(float),
+        "Previously_Insured": rng.integers(0, 2, n_rows),
+        "Vehicle_Age": rng.choice(["< 1 Year", "1-2 Year", "> 2 Years"], n_rows),
+        "Vehicle_Damage": rng.choice(["No", "Yes"], n_rows),
+        "Annual_Premium": rng.uniform(2630, 100000, n_rows).round(0),
+        "Policy_Sales_Channel": rng.integers(1, 164, n_rows).astype(float),
+        "Vintage": rng.integers(10, 300, n_rows),
+        "Response": (rng.random(n_rows) < 0.15).astype(int),
+    })
+
+
+def make_preprocessor():
+    """
+    the unfitted preprocessor data transformation builds from config/schema.yaml
+    """
+    return Pipeline(steps=[("final", ColumnTransformer(
+        transformers=[("standrad", StandardScaler(), ["Age", "Vintage"]),
+                      ("min_max", MinMaxScaler(), ["Annual_Premium"])],
+        remainder="passthrough"))])
+
+
+def make_model(n_rows=20000, precision="float64", **forest_params):
+    """
+    MyModel shaped like a trained one: the data transformation preprocessor and config/model.yaml's forest
+    """
+    dataframe, target = make_applicants(n_rows)
+    # cast before fitting, as data transformation does, so the scalers run in that precision
+    dataframe = dataframe.astype(precision_dtype(precision))
+    preprocessor = make_preprocessor()
+    features = preprocessor.fit_transform(dataframe)
+    params = dict(n_estimators=200, min_samples_split=7, min_samples_leaf=6, max_depth=10,
+                  criterion="entropy", random_state=101)
+    params.update(forest_params)
+    forest = RandomForestClassifier(**params).fit(features, target)
+    return MyModel(preprocessor, forest, precision=precision)
@@ -0,0 +1,96 @@
+import threading
+
+import numpy as np
+import pytest
+
+from src.utils.artifact_store import ArtifactStore
+from src.utils.main_utils import load_mapped_array, load_numpy_array_data, save_numpy_array_data
+
+
+@pytest.fixture
+def store():
+    store = ArtifactStore(in_memory=True)
+    yield store
+    store._writer.shutdown(wait=True)
+
+
+def gated_writer(gate):
+    """
+    save_numpy_array_data that only starts once gate is set, holds the write in flight
+    """
+    def write(file_path, array):
+        assert gate.wait(5)
+        save_numpy_array_data(file_path, array)
+    return write
+
+
+def test_loads_after_the_consumers_read_the_file(store, tmp_path):
+    path = str(tmp_path / "train.npy")
+    array = np.arange(10.0)
+    loaded = []
+    store.save(path, array, save_numpy_array_data, consumers=2)
+    for _ in range(2):
+        assert store.load(path, lambda file_path: loaded.append(file_path)) is array
+    store.flush()
+    assert store.peek(path) is None
+    from_file = store.load(path, load_numpy_array_data)
+    assert from_file is not array
+    np.testing.assert_array_equal(from_file, array)
+
+
+def test_consumed_object_is_kept_until_it_is_written(store, tmp_path):
+    path = str(tmp_path / "train.npy")
+    gate = threading.Event()
+    array = np.arange(10.0)
+    store.save(path, array, gated_writer(gate), consumers=1)
+    assert store.load(path, load_numpy_array_data) is array
+    # nothing on disk yet, a later load still gets the object
+    assert store.peek(path) is array
+    gate.set()
+    store.flush()
+    assert store.peek(path) is None
+
+
+def test_prefer_file_maps_the_file_once_written(store, tmp_path):
+    path = str(tmp_path / "train.npy")
+    gate = threading.Event()
+    array = np.arange(1000.0)
+    store.save(path, array, gated_writer(gate), consumers=2)
+    threading.Timer(0.1, gate.set).start()
+    mapped = store.load(path, load_mapped_array, prefer_file=True)
+    assert isinstance(mapped, np.memmap)
+    np.testing.assert_array_equal(mapped, array)
+    assert store.peek(path) is None
+    assert isinstance(store.load(path, load_mapped_array), np.memmap)
+
+
+def failing_writer(file_path, obj):
+    raise OSError("disk full")
+
+
+def test_failed_write_is_raised_not_swallowed(store, tmp_path):
+    path = str(tmp_path / "train.npy")
+    array = np.arange(10.0)
+    store.save(path, array, failing_writer, consumers=1)
+    with pytest.raises(Exception, match="disk full"):
+        store.flush()
+    # every consumer has loaded it, but there is no file to fall back to
+    assert store.load(path, load_numpy_array_data) is array
+    assert store.peek(path) is array
+
+    store.save(path, array, failing_writer, consumers=1)
+    with pytest.raises(Exception, match="disk full"):
+        store.load(path, load_mapped_array, prefer_file=True)
+    with pytest.raises(Exception, match="disk full"):
+        store.close()
+    assert store.peek(path) is None
+
+
+def test_file_mode_writes_at_once(tmp_path):
+    store = ArtifactStore(in_memory=False)
+    path = str(tmp_path / "train.npy")
+    store.save(path, np.arange(3.0), save_numpy_array_data)
+    assert store.peek(path) is None
+    np.testing.assert_array_equal(store.load(path, load_numpy_array_data), np.arange(3.0))
+    with pytest.raises(Exception, match="disk full"):
+        store.save(path, np.arange(3.0), failing_writer)
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from imblearn.pipeline import Pipeline
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import MinMaxScaler, OneHotEncoder, StandardScaler
+
+from src.constants import PREDICTION_INPUT_COLUMNS
+from src.entity.compiled_preprocessor import CompiledPreprocessor
+from src.entity.estimator import MyModel
+from tests.helpers import make_applicants, make_preprocessor
+
+
+def with_unseen_values(dataframe):
+    """
+    codes and dummy values never seen in fit, values outside the fitted ranges and missing values
+    """
+    dataframe = dataframe.astype(np.float64)
+    dataframe.loc[0:9, "Region_Code"] = [53, 99, -1, 1e6, 52.5, 53, 60, 70, 80, 90]
+    dataframe.loc[10:19, "Policy_Sales_Channel"] = [0, 164, 200, -5, 1e4, 0.5, 300, 400, 500, 600]
+    dataframe.loc[20:24, "Vehicle_Damage_Yes"] = [2, -1, 3, 0.5, 7]
+    dataframe.loc[25:29, "Gender"] = [2, 3, -1, 9, 0.5]
+    dataframe.loc[30:34, "Age"] = [0, 5, 120, 200, -10]
+    dataframe.loc[35:39, "Annual_Premium"] = [0, 1, 1e7, -100, 2629]
+    dataframe.loc[40:44, "Vintage"] = [0, 1, 400, 1e5, -3]
+    dataframe.loc[45:49, ["Age", "Annual_Premium", "Region_Code", "Vintage", "Gender"]] = np.nan
+    return dataframe
+
+
+@pytest.fixture(scope="module")
+def applicants():
+    return make_applicants(5000)
+
+
+@pytest.mark.parametrize("precision", ["float64", "float32"])
+def test_matches_column_transformer_with_unseen_values(precision, applicants):
+    dataframe, _ = applicants
+    preprocessor = make_preprocessor().fit(dataframe.astype(precision))
+    compiled = CompiledPreprocessor(preprocessor, dtype=precision)
+
+    scored = with_unseen_values(make_applicants(2000, seed=3)[0]).astype(precision)
+    expected = preprocessor.transform(scored)
+    np.testing.assert_array_equal(compiled.transform_frame(scored), expected)
+    np.testing.assert_array_equal(compiled.transform(scored.to_numpy()), expected)
+
+    # raw request rows are float64 in any column order
+    shuffled = list(reversed(PREDICTION_INPUT_COLUMNS))
+    np.testing.assert_array_equal(compiled.transform(scored[shuffled].to_numpy(np.float64), columns=shuffled),
+                                  expected)
+    for i in (0, 20, 30, 45):
+        np.testing.assert_array_equal(compiled.transform_values(scored.iloc[i].to_numpy()), expected[i:i + 1])
+
+
+def test_clipping_min_max_scaler_matches(applicants):
+    dataframe, _ = applicants
+    preprocessor = Pipeline(steps=[("final", ColumnTransformer(
+        transformers=[("standrad", StandardScaler(), ["Age", "Vintage"]),
+                      ("min_max", MinMaxScaler(clip=True), ["Annual_Premium"]),
+                      ("drop_region", "drop", ["Region_Code"])],
+        remainder="passthrough"))]).fit(dataframe)
+    compiled = CompiledPreprocessor(preprocessor)
+    scored = with_unseen_values(make_applicants(2000, seed=3)[0])
+    np.testing.assert_array_equal(compiled.transform_frame(scored), preprocessor.transform(scored))
+    np.testing.assert_array_equal(compiled.transform_values(scored.iloc[35].to_numpy()),
+                                  preprocessor.transform(scored.iloc[35:36]))
+
+
+def test_encoder_pipeline_falls_back_to_sklearn(applicants):
+    dataframe, target = applicants
+    dataframe = dataframe.assign(Region_Code=dataframe["Region_Code"].astype(int).astype(str))
+    preprocessor = Pipeline(steps=[("final", ColumnTransformer(
+        transformers=[("standrad", StandardScaler(), ["Age", "Vintage"]),
+                      ("one_hot", OneHotEncoder(handle_unknown="ignore", sparse_output=False), ["Region_Code"])],
+        remainder="passthrough"))])
+    features = preprocessor.fit_transform(dataframe)
+    with pytest.raises(Exception, match="can not be compiled"):
+        CompiledPreprocessor(preprocessor)
+
+    model = MyModel(preprocessor, RandomForestClassifier(n_estimators=10, random_state=0).fit(features, target))
+    assert model.compiled_preprocessor is None
+    # a region the encoder never saw is encoded as all zeros by sklearn, not rejected
+    scored = dataframe.head(50).assign(Region_Code=["unseen"] * 25 + list(dataframe["Region_Code"].head(25)))
+    np.testing.assert_array_equal(model.transform(scored), preprocessor.transform(scored))
+    np.testing.assert_array_equal(model.prediction(scored),
+                                  model.model_obj.predict(preprocessor.transform(scored)))
@@ -0,0 +1,85 @@
+import struct
+
+import pytest
+from bson import ObjectId
+
+from src.components.data_ingestion import dataIngestion
+from src.constants import DB_NAME
+from src.data_access.feature_store import FeatureStore
+from src.entity.config_entity import DataIngestionConfig
+from tests.helpers import make_raw_records
+
+START = 1700000000
+
+
+def object_id(seconds, counter):
+    # the leading 4 bytes of an ObjectId are the writer's clock in seconds
+    return ObjectId(struct.pack(">I", seconds) + counter.to_bytes(8, "big"))
+
+
+def insert(collection, first_id, n_rows, seconds):
+    documents = make_raw_records(n_rows, seed=first_id, first_id=first_id).to_dict(orient="records")
+    for i, document in enumerate(documents):
+        document["_id"] = object_id(seconds, first_id + i)
+    collection.insert_many(documents)
+    return documents
+
+
+@pytest.fixture
+def ingestion(mongo_client, tmp_path):
+    config = DataIngestionConfig(feature_store_root=str(tmp_path), collection_name="applicants", read_parallelism=1)
+    return dataIngestion(config)
+
+
+def test_incremental_sync_dedup_and_compaction(mongo_client, ingestion, tmp_path):
+    collection = mongo_client[DB_NAME]["applicants"]
+    for i in range(10):
+        insert(collection, 1 + 10 * i, 10, START + i)
+
+    store = ingestion.update_feature_store()
+    assert sorted(store.load()["id"]) == list(range(1, 101))
+    watermark = store.read_watermark("_id")
+    assert watermark == object_id(START + 9, 100)
+
+    # a writer with a clock 10 s behind commits after the watermark passed its _id, one 100 s behind
+    # is beyond the overlap window and is missed
+    insert(collection, 101, 1, START + 9 - 10)
+    insert(collection, 102, 1, START + 9 - 100)
+    insert(collection, 103, 5, START + 12)
+    store = ingestion.update_feature_store()
+    dataframe = store.load()
+    assert sorted(dataframe["id"]) == list(range(1, 102)) + list(range(103, 108))
+    # the overlap re-read the rows it already had, they are stored once
+    assert dataframe["id"].is_unique
+    assert store.read_watermark("_id") == object_id(START + 12, 107)
+
+    # the same id written again: the newest copy replaces the stored one
+    updated = insert(collection, 5, 1, START + 20)[0]
+    updated_age = collection.find_one({"_id": updated["_id"]})["Age"]
+    store = ingestion.update_feature_store()
+    dataframe = store.load()
+    assert dataframe["id"].is_unique and len(dataframe) == 106
+    assert dataframe.loc[dataframe["id"] == 5, "Age"].item() == updated_age
+
+    # past max_parts the parts are rewritten as one, with the same rows
+    parts, content_hash = store.part_files(), store.content_hash()
+    assert len(parts) == 3
+    compacting = FeatureStore(str(tmp_path), "applicants", max_parts=2)
+    compacted = compacting.load()
+    assert compacted.equals(dataframe)
+    assert len(compacting.part_files()) == 1 and compacting.part_files()[0] not in parts
+    assert compacting.content_hash() != content_hash
+    assert compacting.load().equals(dataframe)
+
+    # syncing goes on from the same watermark after compaction
+    insert(collection, 200, 3, START + 30)
+    assert sorted(ingestion.update_feature_store().load()["id"])[-3:] == [200, 201, 202]
+
+
+def test_since_query():
+    watermark = object_id(START, 7)
+    assert FeatureStore.since_query("_id", None) is None
+    assert FeatureStore.since_query("_id", watermark, 0) == {"_id": {"$gt": watermark}}
+    query = FeatureStore.since_query("_id", watermark, 30)
+    assert query["_id"]["$gt"].generation_time.timestamp() == START - 30
+    assert FeatureStore.since_query("id", 500, 30) == {"id": {"$gt": 500}}
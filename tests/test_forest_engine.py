@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+
+from src.entity.forest_engine import FlatForest
+
+
+def make_data(n_rows=3000, n_features=6, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, n_features))
+    y = ((X[:, 0] + 0.5 * X[:, 1] + rng.normal(scale=0.5, size=n_rows)) > 0.3).astype(int)
+    return X, y
+
+
+def with_missing(X, rate=0.2, seed=1):
+    X = X.copy()
+    X[np.random.default_rng(seed).random(X.shape) < rate] = np.nan
+    return X
+
+
+def assert_same_predictions(forest, X):
+    engine = FlatForest(forest, chunk_size=257)
+    np.testing.assert_array_equal(engine.predict_proba(X), forest.predict_proba(X))
+    np.testing.assert_array_equal(engine.predict(X), forest.predict(X))
+
+
+@pytest.mark.parametrize("forest_class", [RandomForestClassifier, ExtraTreesClassifier])
+def test_matches_sklearn_on_finite_input(forest_class):
+    X, y = make_data()
+    forest = forest_class(n_estimators=30, max_depth=8, min_samples_leaf=3, random_state=0).fit(X, y)
+    assert_same_predictions(forest, make_data(seed=2)[0])
+    assert_same_predictions(forest, make_data(seed=2)[0].astype(np.float32))
+
+
+def test_matches_sklearn_with_missing_values_unseen_in_training():
+    X, y = make_data()
+    forest = RandomForestClassifier(n_estimators=30, max_depth=8, random_state=0).fit(X, y)
+    assert_same_predictions(forest, with_missing(make_data(seed=2)[0]))
+
+
+def test_matches_sklearn_with_missing_values_seen_in_training():
+    # splits learn missing_go_to_left in both directions
+    X, y = make_data()
+    forest = RandomForestClassifier(n_estimators=30, max_depth=8, random_state=0).fit(with_missing(X, seed=3), y)
+    assert_same_predictions(forest, with_missing(make_data(seed=2)[0]))
+
+
+def test_missing_first_feature_stays_on_leaf():
+    # leaves store feature 0, a NaN there must not move a row off its leaf (or past the last node)
+    X, y = make_data()
+    forest = RandomForestClassifier(n_estimators=10, max_depth=3, random_state=0).fit(X, y)
+    X_test = make_data(n_rows=200, seed=4)[0]
+    X_test[:, 0] = np.nan
+    assert_same_predictions(forest, X_test)
+    X_test[:] = np.nan
+    assert_same_predictions(forest, X_test)
@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.logger.log_stream import AsyncLogChannel, LogStreamRouter, bind_log_stream
+
+
+N_STREAMS = 100
+LINES_PER_STREAM = 200
+
+
+@pytest.fixture
+def logger():
+    router = LogStreamRouter()
+    test_logger = logging.getLogger("test_log_stream")
+    test_logger.setLevel(logging.INFO)
+    test_logger.propagate = False
+    test_logger.addHandler(router)
+    yield test_logger, router
+    test_logger.removeHandler(router)
+
+
+def open_streams(router, n_streams):
+    channels, stream_ids = [], []
+    for _ in range(n_streams):
+        channel = AsyncLogChannel()
+        channel.setFormatter(logging.Formatter("%(message)s"))
+        channels.append(channel)
+        stream_ids.append(router.register(channel))
+    return channels, stream_ids
+
+
+async def receive(channel):
+    messages = []
+    async for batch in channel.batches():
+        messages.extend(batch)
+    return messages
+
+
+def expected_lines(stream):
+    return [f"stream {stream} line {line}" for line in range(LINES_PER_STREAM)]
+
+
+def test_parallel_streams_get_only_their_own_lines(logger):
+    test_logger, router = logger
+
+    def work(stream, channel, start):
+        start.wait()
+        for line in range(LINES_PER_STREAM):
+            test_logger.info(f"stream {stream} line {line}")
+        channel.finish()
+
+    async def run():
+        channels, stream_ids = open_streams(router, N_STREAMS)
+        start = threading.Barrier(N_STREAMS)
+        threads = [threading.Thread(target=bind_log_stream(stream_id, work), args=(stream, channel, start))
+                   for stream, (channel, stream_id) in enumerate(zip(channels, stream_ids))]
+        for thread in threads:
+            thread.start()
+        received = await asyncio.wait_for(asyncio.gather(*(receive(channel) for channel in channels)), timeout=60)
+        for thread in threads:
+            thread.join()
+        for stream_id in stream_ids:
+            router.unregister(stream_id)
+        return received
+
+    received = asyncio.run(run())
+    assert len(received) == N_STREAMS
+    for stream, messages in enumerate(received):
+        # nothing from another stream, nothing lost, in logging order
+        assert messages == expected_lines(stream)
+    assert router.open_streams == 0
+
+
+def test_streams_sharing_pool_threads_stay_apart(logger):
+    test_logger, router = logger
+
+    def log_line(stream, line):
+        test_logger.info(f"stream {stream} line {line}")
+
+    async def run():
+        channels, stream_ids = open_streams(router, N_STREAMS)
+        # far fewer threads than streams, every pool thread runs work of many streams in turn
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [executor.submit(bind_log_stream(stream_ids[stream], log_line), stream, line)
+                       for line in range(LINES_PER_STREAM) for stream in range(N_STREAMS)]
+            receivers = asyncio.gather(*(receive(channel) for channel in channels))
+            await asyncio.get_running_loop().run_in_executor(None, lambda: [future.result() for future in futures])
+            # logged outside any stream, must reach none of them
+            test_logger.info("no stream")
+            for channel in channels:
+                channel.finish()
+            return await asyncio.wait_for(receivers, timeout=60)
+
+    received = asyncio.run(run())
+    for stream, messages in enumerate(received):
+        # the pool runs one stream's lines in any order, but every one of them exactly once
+        assert sorted(messages) == sorted(expected_lines(stream))
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.constants import SCHEMA_FILE_PATH
+from src.utils.main_utils import compact_dataframe, load_dataframe, read_yaml_file, save_dataframe
+from tests.helpers import make_raw_records
+
+
+@pytest.fixture(scope="module")
+def compact_frame():
+    storage_dtypes = read_yaml_file(SCHEMA_FILE_PATH)["storage_dtypes"]
+    dataframe = make_raw_records(500)
+    # an integer column with a missing value is stored as float32
+    dataframe["Age"] = dataframe["Age"].astype("float64")
+    dataframe.loc[3, "Age"] = np.nan
+    return compact_dataframe(dataframe, storage_dtypes)
+
+
+def test_compact_frame_uses_storage_dtypes(compact_frame):
+    dtypes = compact_frame.dtypes
+    assert isinstance(dtypes["Gender"], pd.CategoricalDtype)
+    assert dtypes["Driving_License"] == np.uint8
+    assert dtypes["Vintage"] == np.int16
+    assert dtypes["Annual_Premium"] == np.float32
+    assert dtypes["Age"] == np.float32
+
+
+@pytest.mark.parametrize("extension", [".parquet", ".feather"])
+def test_columnar_round_trip_keeps_storage_dtypes(tmp_path, compact_frame, extension):
+    file_path = str(tmp_path / "artifact" / f"data{extension}")
+    save_dataframe(file_path, compact_frame)
+    loaded = load_dataframe(file_path)
+    pd.testing.assert_frame_equal(loaded, compact_frame)
+    assert list(loaded["Gender"].cat.categories) == ["Female", "Male"]
+
+
+@pytest.mark.parametrize("extension", [".parquet", ".feather", ".csv"])
+def test_columns_projection(tmp_path, compact_frame, extension):
+    file_path = str(tmp_path / f"data{extension}")
+    save_dataframe(file_path, compact_frame)
+    columns = ["Vintage", "Gender", "Response"]
+    loaded = load_dataframe(file_path, columns=columns)
+    assert sorted(loaded.columns) == sorted(columns)
+    assert len(loaded) == len(compact_frame)
+    np.testing.assert_array_equal(loaded["Vintage"].to_numpy(), compact_frame["Vintage"].to_numpy())
+    np.testing.assert_array_equal(loaded["Gender"].astype(str).to_numpy(),
+                                  compact_frame["Gender"].astype(str).to_numpy())
+
+
+def test_unknown_extension_raises(tmp_path, compact_frame):
+    with pytest.raises(Exception, match="unknown artifact format"):
+        save_dataframe(str(tmp_path / "data.xlsx"), compact_frame)
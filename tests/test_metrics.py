@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
+
+from src.utils.metrics import classification_metrics, oob_predict
+
+
+def sklearn_metrics(y_true, y_pred, pos_label):
+    kwargs = {"pos_label": pos_label, "zero_division": 0}
+    return (accuracy_score(y_true, y_pred), f1_score(y_true, y_pred, **kwargs),
+            precision_score(y_true, y_pred, **kwargs), recall_score(y_true, y_pred, **kwargs))
+
+
+rng = np.random.default_rng(0)
+Y_TRUE = rng.integers(0, 2, 1000)
+
+
+@pytest.mark.parametrize("pos_label", [0, 1])
+@pytest.mark.parametrize("y_pred", [rng.integers(0, 2, 1000), np.zeros(1000, dtype=int),
+                                    np.ones(1000, dtype=int), Y_TRUE],
+                         ids=["random", "all_negative", "all_positive", "perfect"])
+def test_classification_metrics_match_sklearn(y_pred, pos_label):
+    metrics = classification_metrics(Y_TRUE, y_pred, pos_label=pos_label)
+    expected = sklearn_metrics(Y_TRUE, y_pred, pos_label)
+    np.testing.assert_allclose((metrics.accuracy, metrics.f1_score, metrics.precision_score, metrics.recall_score),
+                               expected, rtol=1e-12)
+
+
+def test_no_positive_labels_at_all():
+    y_true = y_pred = np.zeros(10, dtype=int)
+    metrics = classification_metrics(y_true, y_pred)
+    assert (metrics.accuracy, metrics.f1_score, metrics.precision_score, metrics.recall_score) == (1.0, 0.0, 0.0, 0.0)
+
+
+@pytest.fixture(scope="module")
+def bagged():
+    x = rng.normal(size=(600, 5)).astype(np.float32)
+    y = (x[:, 0] + x[:, 1] * x[:, 2] + rng.normal(scale=0.5, size=600) > 0).astype(int)
+    forest = RandomForestClassifier(n_estimators=60, max_depth=6, oob_score=True, random_state=3).fit(x, y)
+    return forest, x
+
+
+def test_oob_predict_matches_sklearn_oob_decision_function(bagged):
+    forest, x = bagged
+    labels, voted = oob_predict(forest, x)
+    assert voted.all()
+    np.testing.assert_array_equal(labels, forest.classes_.take(np.argmax(forest.oob_decision_function_, axis=1)))
+
+
+def test_unseen_trees_vote_on_every_row(bagged):
+    forest, x = bagged
+    unseen_trees = 20
+    labels, voted = oob_predict(forest, x, unseen_trees=unseen_trees)
+
+    proba = np.zeros((len(x), 2))
+    for i, tree in enumerate(forest.estimators_):
+        rows = np.arange(len(x))
+        if i >= unseen_trees:
+            # only the trees after the unseen ones are limited to their out of bag rows
+            rows = np.setdiff1d(rows, forest.estimators_samples_[i])
+        proba[rows] += tree.predict_proba(x[rows])
+    assert voted.all()
+    np.testing.assert_array_equal(labels, np.argmax(proba, axis=1))
+    # with every tree voting on every row it is the plain forest prediction
+    np.testing.assert_array_equal(oob_predict(forest, x, unseen_trees=len(forest.estimators_))[0], forest.predict(x))
+
+
+def test_oob_predict_needs_a_bagged_forest():
+    forest = RandomForestClassifier(n_estimators=3, bootstrap=False).fit([[0], [1]], [0, 1])
+    with pytest.raises(Exception, match="not bagged"):
+        oob_predict(forest, np.array([[0.0], [1.0]]))
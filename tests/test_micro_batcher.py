@@ -0,0 +1,49 @@
+import threading
+import time
+
+import numpy as np
+
+from src.entity.config_entity import MicroBatcherConfig
+from src.pipline.micro_batcher import MicroBatcher
+
+
+def row_sums(rows):
+    return rows.sum(axis=1)
+
+
+def test_lone_request_is_scored_without_waiting():
+    batcher = MicroBatcher(row_sums)
+    try:
+        batcher.predict(np.ones((1, 3)))
+        start = time.perf_counter()
+        for i in range(50):
+            assert batcher.predict(np.full((1, 3), i, dtype=float))[0] == 3 * i
+        # nothing to wait for, so no window is waited out per request
+        assert (time.perf_counter() - start) / 50 < 0.002
+        assert batcher.stats()["batch_size_histogram"] == {"1": 51}
+    finally:
+        batcher.stop()
+
+
+def test_requests_queued_while_a_batch_is_scored_go_out_together():
+    scoring, release = threading.Event(), threading.Event()
+    batches = []
+
+    def blocking_row_sums(rows):
+        batches.append(len(rows))
+        scoring.set()
+        release.wait(5)
+        return row_sums(rows)
+
+    batcher = MicroBatcher(blocking_row_sums, MicroBatcherConfig(max_batch_size=8))
+    try:
+        first = batcher.submit(np.zeros((1, 3)))
+        assert scoring.wait(5)
+        futures = [batcher.submit(np.full((1, 3), i, dtype=float)) for i in range(10)]
+        release.set()
+        assert first.result(5)[0] == 0
+        assert [future.result(5)[0] for future in futures] == [3 * i for i in range(10)]
+        # the 10 queued requests fill a batch of max_batch_size, the rest go in the next one
+        assert batches == [1, 8, 2]
+    finally:
+        batcher.stop()
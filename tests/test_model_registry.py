@@ -0,0 +1,72 @@
+import pytest
+
+from src.constants import MODEL_REGISTRY_LOAD_ATTEMPTS
+from src.entity import model_registry
+from src.entity.model_registry import ModelRegistry
+
+
+class FakeBucket:
+    """
+    one model key: every head request returns the current etag, every download the current model,
+    pushes scripted to land between the head request and the nth download
+    """
+    def __init__(self, pushes_before_download=()):
+        self.version = 1
+        self.downloads = 0
+        self.pushes_before_download = set(pushes_before_download)
+
+    def get_object_etag(self, s3_key, bucket_name):
+        return f"etag-{self.version}"
+
+    def load_model(self):
+        self.downloads += 1
+        if self.downloads in self.pushes_before_download:
+            self.version += 1
+        return f"model-{self.version}"
+
+
+@pytest.fixture
+def bucket(monkeypatch):
+    bucket = FakeBucket()
+
+    class FakeEstimator:
+        def __init__(self, bucket_name, model_path):
+            self.s3 = bucket
+            self.loaded_model = None
+
+        def load_model(self):
+            return bucket.load_model()
+
+    monkeypatch.setattr(model_registry, "Proj1Estimator", FakeEstimator)
+    return bucket
+
+
+def make_registry():
+    return ModelRegistry(bucket_name="bucket", model_path="model.pkl", refresh_interval=0)
+
+
+def test_model_and_etag_come_from_the_same_version(bucket):
+    estimator = make_registry().get_estimator()
+    assert (estimator.loaded_model, bucket.downloads) == ("model-1", 1)
+
+
+def test_push_during_download_is_retried(bucket):
+    # etag-1 was read, but the download already got model-2
+    bucket.pushes_before_download = {1}
+    registry = make_registry()
+    estimator = registry.get_estimator()
+    assert bucket.downloads == 2
+    assert (estimator.loaded_model, registry.model_version) == ("model-2", "etag-2")
+    assert registry.refresh() is False
+
+
+def test_model_that_keeps_changing_keeps_the_older_etag(bucket):
+    bucket.pushes_before_download = set(range(1, MODEL_REGISTRY_LOAD_ATTEMPTS + 1))
+    registry = make_registry()
+    estimator = registry.get_estimator()
+    assert bucket.downloads == MODEL_REGISTRY_LOAD_ATTEMPTS
+    # never labelled with a version newer than the model it holds, so the next check reloads
+    assert estimator.loaded_model == f"model-{MODEL_REGISTRY_LOAD_ATTEMPTS + 1}"
+    assert registry.model_version == f"etag-{MODEL_REGISTRY_LOAD_ATTEMPTS}"
+    assert registry.refresh() is True
+    assert registry.get_estimator().loaded_model == f"model-{MODEL_REGISTRY_LOAD_ATTEMPTS + 1}"
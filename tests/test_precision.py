@@ -0,0 +1,51 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from src.constants import PREDICTION_INPUT_COLUMNS
+from src.entity.estimator import MyModel
+from tests.helpers import make_applicants, make_model
+
+
+@pytest.fixture(scope="module")
+def float32_model():
+    return make_model(precision="float32")
+
+
+@pytest.fixture(scope="module")
+def holdout():
+    return make_applicants(20000, seed=7)[0]
+
+
+def test_float32_predictions_match_float64(trained_model, float32_model, holdout):
+    # same rows and seeds, only the precision of preprocessing, training and serving differs
+    float64_predictions = trained_model.prediction(holdout)
+    float32_predictions = float32_model.prediction(holdout)
+    assert np.mean(float32_predictions == float64_predictions) >= 0.999
+
+    float64_proba = trained_model.model_obj.predict_proba(trained_model.transform(holdout))[:, 1]
+    float32_proba = float32_model.model_obj.predict_proba(float32_model.transform(holdout))[:, 1]
+    assert np.abs(float32_proba - float64_proba).mean() < 1e-3
+
+
+@pytest.mark.parametrize("precision", ["float32", "float64"])
+def test_serving_paths_agree_in_each_precision(precision, trained_model, float32_model, holdout):
+    model = float32_model if precision == "float32" else trained_model
+    features = model.transform(holdout)
+    assert features.dtype == np.dtype(precision)
+    np.testing.assert_array_equal(features, model.preprocessing_obj.transform(holdout.astype(precision)))
+
+    expected = model.model_obj.predict(model.preprocessing_obj.transform(holdout.astype(precision)))
+    raw = holdout.to_numpy(dtype=np.float64)
+    np.testing.assert_array_equal(model.prediction(holdout), expected)
+    np.testing.assert_array_equal(model.prediction_with_raw_array(raw, PREDICTION_INPUT_COLUMNS), expected)
+
+
+def test_models_pickled_before_precision_load_as_float64(trained_model):
+    state = dict(trained_model.__getstate__())
+    state.pop("precision")
+    old_model = MyModel.__new__(MyModel)
+    old_model.__setstate__(state)
+    assert old_model.precision == "float64"
+    assert pickle.loads(pickle.dumps(old_model)).precision == "float64"
@@ -0,0 +1,99 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.constants import (PREDICT_EXECUTOR_MAX_WORKERS, PREDICT_LATENCY_BUDGET_P50_MS,
+                           PREDICT_LATENCY_BUDGET_P99_MS)
+from src.entity.model_registry import ModelRegistry
+from src.entity.s3_estimator import Proj1Estimator
+from src.pipline.micro_batcher import MicroBatcher
+from src.pipline.prediction_cache import PredictionCache
+from src.utils.latency_tracker import LatencyTracker
+from tests.conftest import REPO_ROOT
+from tests.helpers import make_applicants
+
+WARMUP_REQUESTS = 50
+MEASURED_REQUESTS = 1000
+# concurrent callers; on one core they also queue behind each other and the test client
+CONCURRENCY = 4
+
+
+@pytest.fixture
+def client(monkeypatch, trained_model):
+    """
+    the app with trained_model served from the registry instead of s3, warmed by its own lifespan
+    """
+    def load(registry):
+        estimator = Proj1Estimator.__new__(Proj1Estimator)
+        estimator.bucket_name, estimator.model_path = registry.bucket_name, registry.model_path
+        estimator.loaded_model = trained_model
+        return estimator, "test-model", 0.0
+
+    # fresh shared registry, batcher and cache for this test only
+    monkeypatch.setattr(ModelRegistry, "_registries", {})
+    monkeypatch.setattr(MicroBatcher, "_batchers", {})
+    monkeypatch.setattr(PredictionCache, "_caches", {})
+    monkeypatch.setattr(ModelRegistry, "_load", load)
+    monkeypatch.setattr(ModelRegistry, "_start_watcher", lambda registry: None)
+    # static files and templates are mounted relative to the repo root
+    monkeypatch.chdir(REPO_ROOT)
+    import app as app_module
+    monkeypatch.setattr(app_module, "s3client", lambda: None)
+    monkeypatch.setattr(app_module, "mongoDB_connection", lambda: None)
+    # the lifespan shuts the pool down on exit, every test starts the app with its own
+    monkeypatch.setattr(app_module, "predict_executor",
+                        ThreadPoolExecutor(max_workers=PREDICT_EXECUTOR_MAX_WORKERS, thread_name_prefix="predict"))
+    with TestClient(app_module.app) as test_client:
+        assert test_client.get("/readyz").status_code == 200
+        yield test_client, app_module
+    for batcher in MicroBatcher._batchers.values():
+        batcher.stop()
+
+
+def records(n_rows, seed):
+    # distinct applicants, so every request is really scored instead of served from the cache
+    dataframe, _ = make_applicants(n_rows, seed=seed)
+    return dataframe.to_dict(orient="records")
+
+
+def measure(test_client, app_module, monkeypatch, bodies, concurrency=1):
+    for body in records(WARMUP_REQUESTS, seed=100):
+        assert test_client.post("/predict", json=body).status_code == 200
+    tracker = LatencyTracker(p50_budget_ms=PREDICT_LATENCY_BUDGET_P50_MS,
+                             p99_budget_ms=PREDICT_LATENCY_BUDGET_P99_MS)
+    monkeypatch.setattr(app_module, "predict_latency", tracker)
+
+    def post(body):
+        response = test_client.post("/predict", json=body)
+        assert response.status_code == 200
+        assert response.json()["prediction"] in (0, 1)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(post, bodies))
+    report = test_client.get("/metrics/predict").json()
+    print(f"/predict x{len(bodies)} at concurrency {concurrency}: "
+          f"p50 {report['p50_ms']:.2f} ms, p99 {report['p99_ms']:.2f} ms", file=sys.stderr)
+    return report
+
+
+def assert_within_budget(report, n_requests):
+    assert report["samples"] == n_requests
+    assert report["p50_ms"] <= PREDICT_LATENCY_BUDGET_P50_MS
+    assert report["p99_ms"] <= PREDICT_LATENCY_BUDGET_P99_MS
+    assert report["within_budget"] is True
+
+
+def test_predict_meets_latency_budget(client, monkeypatch):
+    test_client, app_module = client
+    report = measure(test_client, app_module, monkeypatch, records(MEASURED_REQUESTS, seed=1))
+    assert_within_budget(report, MEASURED_REQUESTS)
+
+
+def test_concurrent_predict_meets_latency_budget(client, monkeypatch):
+    test_client, app_module = client
+    report = measure(test_client, app_module, monkeypatch, records(MEASURED_REQUESTS, seed=2),
+                     concurrency=CONCURRENCY)
+    assert_within_budget(report, MEASURED_REQUESTS)
@@ -0,0 +1,241 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.constants import DB_NAME
+from src.data_access import proj1_data
+from src.data_access.proj1_data import proj1
+from tests.helpers import make_raw_records
+
+
+N_PARTITIONS = 4
+CHUNKS_PER_PARTITION = 20
+
+
+class FakeRangeReads:
+    """
+    stands in for the range cursors: every partition query yields numbered chunks,
+    counting how many were read and how many cursors are still open
+    """
+    def __init__(self, fail_partition=None):
+        self.fail_partition = fail_partition
+        self.lock = threading.Lock()
+        self.read = 0
+        self.open_cursors = 0
+
+    def __call__(self, collection_name, database_name, chunk_size, batch_size, columns, query, include_id=False):
+        with self.lock:
+            self.open_cursors += 1
+        try:
+            for i in range(CHUNKS_PER_PARTITION):
+                if query == self.fail_partition and i == 3:
+                    raise RuntimeError("cursor lost")
+                with self.lock:
+                    self.read += 1
+                yield {"partition": np.full(chunk_size, query), "chunk": np.full(chunk_size, i)}
+        finally:
+            with self.lock:
+                self.open_cursors -= 1
+
+
+def make_reader(monkeypatch, reads):
+    data = proj1.__new__(proj1)
+    monkeypatch.setattr(data, "partition_queries", lambda *args, **kwargs: list(range(N_PARTITIONS)))
+    monkeypatch.setattr(data, "_iter_column_chunks", reads)
+    return data
+
+
+def iter_partitions(data, queue_chunks=2):
+    return data._iter_partitions("collection", None, 5, 5, None, None, False, N_PARTITIONS, "_id",
+                                 queue_chunks=queue_chunks)
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_chunks_come_in_range_order(monkeypatch):
+    data = make_reader(monkeypatch, FakeRangeReads())
+    order = [(int(chunk["partition"][0]), int(chunk["chunk"][0])) for chunk in iter_partitions(data)]
+    assert order == [(partition, i) for partition in range(N_PARTITIONS) for i in range(CHUNKS_PER_PARTITION)]
+
+
+def test_read_ahead_is_bounded(monkeypatch):
+    reads = FakeRangeReads()
+    data = make_reader(monkeypatch, reads)
+    queue_chunks = 2
+    # a range holds its queue plus the chunk it waits to put
+    bound = N_PARTITIONS * (queue_chunks + 1)
+    consumed, ahead = 0, []
+    for _ in iter_partitions(data, queue_chunks=queue_chunks):
+        consumed += 1
+        # slow consumer, gives the readers time to run ahead as far as they can
+        time.sleep(0.005)
+        with reads.lock:
+            ahead.append(reads.read - consumed)
+    assert consumed == N_PARTITIONS * CHUNKS_PER_PARTITION
+    assert max(ahead) <= bound
+
+
+def test_stopping_early_closes_every_cursor(monkeypatch):
+    reads = FakeRangeReads()
+    data = make_reader(monkeypatch, reads)
+    chunks = iter_partitions(data)
+    next(chunks)
+    chunks.close()
+    assert wait_for(lambda: reads.open_cursors == 0)
+    assert reads.read < N_PARTITIONS * CHUNKS_PER_PARTITION
+
+
+def test_failed_range_raises(monkeypatch):
+    reads = FakeRangeReads(fail_partition=2)
+    data = make_reader(monkeypatch, reads)
+    with pytest.raises(RuntimeError, match="cursor lost"):
+        for _ in iter_partitions(data):
+            pass
+    assert wait_for(lambda: reads.open_cursors == 0)
+
+
+N_DOCUMENTS = 3000
+
+
+@pytest.fixture
+def collection(mongo_client, monkeypatch):
+    # small enough for mongomock, big enough for the default sample size
+    monkeypatch.setattr(proj1_data, "MONGO_PARALLEL_MIN_DOCUMENTS", 1000)
+    collection = mongo_client[DB_NAME]["applicants"]
+    collection.insert_many(make_raw_records(N_DOCUMENTS).to_dict(orient="records"))
+    return collection
+
+
+def matched_ids(collection, queries):
+    return [{document["_id"] for document in collection.find(query or {}, {"_id": 1})} for query in queries]
+
+
+@pytest.mark.parametrize("field", ["_id", "id"])
+def test_partition_ranges_are_disjoint_and_cover_every_document(collection, field):
+    queries = proj1().partition_queries("applicants", 4, field=field)
+    assert len(queries) == 4
+    partitions = matched_ids(collection, queries)
+    assert sum(len(ids) for ids in partitions) == N_DOCUMENTS
+    assert set().union(*partitions) == {document["_id"] for document in collection.find({}, {"_id": 1})}
+    # roughly even, the points are quantiles of a sample
+    assert min(len(ids) for ids in partitions) > N_DOCUMENTS / 4 / 2
+
+
+def test_partition_ranges_keep_the_query(collection):
+    query = {"id": {"$gt": 1000}}
+    queries = proj1().partition_queries("applicants", 4, field="_id", query=query)
+    partitions = matched_ids(collection, queries)
+    assert sum(len(ids) for ids in partitions) == collection.count_documents(query)
+    assert set().union(*partitions) == matched_ids(collection, [query])[0]
+
+
+def test_small_collection_is_read_with_one_query(mongo_client):
+    mongo_client[DB_NAME]["applicants"].insert_many(make_raw_records(50).to_dict(orient="records"))
+    data = proj1()
+    assert data.split_points("applicants", 4) == []
+    assert data.partition_queries("applicants", 4) == [None]
+    assert data.partition_queries("applicants", 1, query={"id": 3}) == [{"id": 3}]
+
+
+def test_duplicate_split_points_collapse(collection):
+    # 7 quantiles of a 0/1 field are only ever 0 or 1, each kept once
+    points = proj1().split_points("applicants", 8, field="Driving_License")
+    assert points == [0, 1]
+    queries = proj1().partition_queries("applicants", 8, field="Driving_License")
+    assert len(queries) <= 3
+    assert sum(len(ids) for ids in matched_ids(collection, queries)) == N_DOCUMENTS
+
+
+@pytest.mark.parametrize("field", ["_id", "id"])
+def test_parallel_read_equals_single_cursor_read(collection, field):
+    data = proj1()
+    single = data.collect_in_df("applicants", parallelism=1, chunk_size=700)
+    parallel = data.collect_in_df("applicants", parallelism=4, partition_field=field, chunk_size=700)
+    assert len(single) == N_DOCUMENTS
+    pd.testing.assert_frame_equal(parallel, single)
+
+
+@pytest.fixture
+def typed_reader():
+    data = proj1.__new__(proj1)
+    data.schema_dtypes = {"Age": "int", "Annual_Premium": "float", "Gender": "category"}
+    data.storage_dtypes = {}
+    return data
+
+
+def test_missing_markers_become_nan(typed_reader):
+    premium = typed_reader._typed_array("Annual_Premium", [1.5, "na", "", None, 2])
+    assert premium.dtype == np.float64
+    np.testing.assert_array_equal(premium, [1.5, np.nan, np.nan, np.nan, 2.0])
+
+    gender = typed_reader._typed_array("Gender", ["Male", "na", "", None, "Female"])
+    assert gender.dtype == object
+    assert gender[0] == "Male" and gender[4] == "Female"
+    assert pd.isna(gender[1:4]).all()
+
+    untyped = typed_reader._typed_array("not_in_schema", ["x", "na"])
+    assert untyped[0] == "x" and pd.isna(untyped[1])
+
+
+def test_int_column_is_int64_unless_values_are_missing(typed_reader):
+    assert typed_reader._typed_array("Age", [20, 30]).dtype == np.int64
+    for missing in ("na", "", None):
+        ages = typed_reader._typed_array("Age", [20, missing, 30])
+        assert ages.dtype == np.float64
+        np.testing.assert_array_equal(ages, [20.0, np.nan, 30.0])
+
+
+def test_storage_dtype_is_applied_per_chunk(typed_reader):
+    typed_reader.storage_dtypes = {"Age": "uint8", "Gender": "category"}
+    assert typed_reader._column_array("Age", [20, 30]).dtype == np.uint8
+    # missing values keep an integer column as float32
+    assert typed_reader._column_array("Age", [20, None]).dtype == np.float32
+    gender = typed_reader._column_array("Gender", ["Male", "Female", "na"])
+    assert isinstance(gender, pd.Categorical)
+    assert list(gender.categories) == ["Female", "Male"]
+
+
+def test_column_missing_from_some_chunks_is_nan_filled():
+    chunks = [{"a": np.array([1.0, 2.0])},
+              {"a": np.array([3.0]), "b": np.array(["x"], dtype=object)},
+              {"a": np.array([4.0, 5.0])}]
+    columns = proj1._concat_column_chunks(chunks)
+    np.testing.assert_array_equal(columns["a"], [1.0, 2.0, 3.0, 4.0, 5.0])
+    assert len(columns["b"]) == 5
+    assert columns["b"][2] == "x"
+    assert pd.isna(columns["b"][[0, 1, 3, 4]]).all()
+
+
+def test_categorical_chunks_with_different_categories_are_unioned():
+    chunks = [{"Gender": pd.Categorical(["Male", "Male"])},
+              {"Gender": pd.Categorical(["Female", "Male"])},
+              {"Gender": pd.Categorical(["Other"])}]
+    gender = proj1._concat_column_chunks(chunks)["Gender"]
+    assert isinstance(gender, pd.Categorical)
+    assert list(gender.categories) == ["Female", "Male", "Other"]
+    assert list(gender) == ["Male", "Male", "Female", "Male", "Other"]
+
+
+def test_chunked_read_matches_one_frame_of_every_document(mongo_client):
+    records = make_raw_records(500)
+    documents = records.to_dict(orient="records")
+    for document in documents[::7]:
+        document["Age"] = "na"
+    del documents[3]["Vintage"]
+    mongo_client[DB_NAME]["applicants"].insert_many(documents)
+
+    dataframe = proj1().collect_in_df("applicants", chunk_size=64, parallelism=1)
+    assert len(dataframe) == 500
+    assert dataframe["Age"].isna().sum() == len(documents[::7])
+    assert dataframe["Vintage"].isna().sum() == 1
+    expected = records.drop(index=list(range(0, 500, 7)))
+    np.testing.assert_array_equal(dataframe["Age"].dropna().to_numpy(), expected["Age"].to_numpy())
+    assert list(dataframe["Gender"].astype(str)) == list(records["Gender"])
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from src.utils.resampling import chunked_smote, resample
+
+
+def make_imbalanced(n_rows=2000, positive_rate=0.15, seed=0):
+    rng = np.random.default_rng(seed)
+    y = (rng.random(n_rows) < positive_rate).astype(np.int8)
+    x = (rng.normal(size=(n_rows, 4)) + y[:, None] * 2).astype(np.float32)
+    return x, y
+
+
+@pytest.mark.parametrize("chunk_size", [50000, 100, 1])
+def test_chunked_smote_balances_and_keeps_original_rows(chunk_size):
+    x, y = make_imbalanced()
+    x_resampled, y_resampled = chunked_smote(x, y, chunk_size=chunk_size, random_state=0)
+    assert np.bincount(y_resampled).tolist() == [np.sum(y == 0)] * 2
+    np.testing.assert_array_equal(x_resampled[:len(x)], x)
+    np.testing.assert_array_equal(y_resampled[:len(y)], y)
+    assert x_resampled.dtype == x.dtype and y_resampled.dtype == y.dtype
+
+    # synthetic rows lie between two minority rows, so inside the minority's bounding box
+    minority = x[y == 1]
+    synthetic = x_resampled[len(x):]
+    assert (synthetic >= minority.min(axis=0)).all() and (synthetic <= minority.max(axis=0)).all()
+
+
+def test_chunked_smote_is_seeded_and_leaves_balanced_data_alone():
+    x, y = make_imbalanced()
+    first, second = chunked_smote(x, y, random_state=3), chunked_smote(x, y, random_state=3)
+    np.testing.assert_array_equal(first[0], second[0])
+
+    balanced_y = np.tile(np.array([0, 1], dtype=np.int8), 100)
+    balanced_x = np.arange(400, dtype=np.float32).reshape(200, 2)
+    x_resampled, y_resampled = chunked_smote(balanced_x, balanced_y)
+    assert x_resampled is balanced_x and y_resampled is balanced_y
+
+
+@pytest.mark.parametrize("strategy", ["none", "class_weight"])
+def test_unchanged_strategies_return_the_rows_as_is(strategy):
+    x, y = make_imbalanced()
+    x_resampled, y_resampled = resample(x, y, strategy=strategy)
+    assert x_resampled is x and y_resampled is y
+
+
+def test_random_over_and_under_sampling_balance_by_copying_or_dropping_rows():
+    x, y = make_imbalanced()
+    majority, minority = np.sum(y == 0), np.sum(y == 1)
+
+    x_over, y_over = resample(x, y, strategy="random_over", random_state=0)
+    assert np.bincount(y_over).tolist() == [majority, majority]
+    # only copies of existing rows
+    assert set(map(bytes, x_over)) == set(map(bytes, x))
+
+    x_under, y_under = resample(x, y, strategy="random_under", random_state=0)
+    assert np.bincount(y_under).tolist() == [minority, minority]
+    assert set(map(bytes, x_under)) <= set(map(bytes, x))
+
+
+def test_chunked_smote_strategy_is_chunked_smote():
+    x, y = make_imbalanced()
+    expected = chunked_smote(x, y, k_neighbors=3, chunk_size=100, random_state=5)
+    x_resampled, y_resampled = resample(x, y, strategy="chunked_smote", k_neighbors=3, chunk_size=100,
+                                        random_state=5)
+    np.testing.assert_array_equal(x_resampled, expected[0])
+    np.testing.assert_array_equal(y_resampled, expected[1])
+
+
+def test_smoteenn_oversamples_the_minority_then_cleans():
+    x, y = make_imbalanced()
+    x_resampled, y_resampled = resample(x, y, strategy="smoteenn", random_state=0)
+    assert len(x_resampled) == len(y_resampled)
+    # SMOTE brings the minority up to the majority, ENN then only removes rows
+    assert np.sum(y_resampled == 1) > np.sum(y == 1)
+    assert np.sum(y_resampled == 0) <= np.sum(y == 0)
+    assert np.sum(y_resampled == 1) <= np.sum(y == 0)
+
+
+def test_unknown_strategy_raises():
+    x, y = make_imbalanced()
+    with pytest.raises(Exception, match="resampling must be one of"):
+        resample(x, y, strategy="smote")
@@ -0,0 +1,103 @@
+import os
+from dataclasses import dataclass
+
+import pytest
+
+from src.utils.stage_cache import StageCache, config_key
+
+
+@dataclass
+class StageConfig:
+    ratio: float = 0.25
+    n_jobs: int = 1
+    output_file_path: str = "artifact/run/train.parquet"
+    output_dir: str = "artifact/run"
+
+
+def fingerprint(input_hash="data-v1", config=None):
+    return StageCache.fingerprint("transformation", input_hash, config_key(config or StageConfig(), exclude=("n_jobs",)),
+                                  "code-v1")
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(content)
+    return path
+
+
+def read(path):
+    with open(path, "rb") as file:
+        return file.read()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return StageCache(str(tmp_path / "cache"), max_entries_per_stage=2)
+
+
+def run_stage(cache, tmp_path, run, key, content=b"features"):
+    files = {"features": str(tmp_path / run / "features.npy"), "target": str(tmp_path / run / "target.npy")}
+    write(files["features"], content)
+    write(files["target"], content + b"-target")
+    cache.record("transformation", key, files, meta={"rows": 3})
+    cache.commit()
+    return files
+
+
+def test_same_inputs_hit_and_restore_identical_files(cache, tmp_path):
+    outputs = run_stage(cache, tmp_path, "run1", fingerprint())
+    targets = {name: str(tmp_path / "run2" / os.path.basename(path)) for name, path in outputs.items()}
+    assert cache.restore("transformation", fingerprint(), targets) == {"rows": 3}
+    for name, path in outputs.items():
+        assert read(targets[name]) == read(path)
+
+
+def test_changed_config_or_input_misses(cache, tmp_path):
+    run_stage(cache, tmp_path, "run1", fingerprint())
+    targets = {"features": str(tmp_path / "run2" / "features.npy")}
+    assert cache.restore("transformation", fingerprint(input_hash="data-v2"), targets) is None
+    assert cache.restore("transformation", fingerprint(config=StageConfig(ratio=0.3)), targets) is None
+    assert not os.path.exists(targets["features"])
+    # paths of the run and excluded knobs do not change the output, so not the key either
+    same = StageConfig(n_jobs=8, output_file_path="artifact/other/train.parquet", output_dir="artifact/other")
+    assert fingerprint(config=same) == fingerprint()
+    assert cache.restore("transformation", fingerprint(config=same), targets) is not None
+
+
+def test_incomplete_entry_is_a_miss(cache, tmp_path):
+    run_stage(cache, tmp_path, "run1", fingerprint())
+    assert cache.restore("transformation", fingerprint(), {"other": str(tmp_path / "run2" / "other.npy")}) is None
+    for prefix in os.listdir(cache.blob_dir):
+        for blob in os.listdir(os.path.join(cache.blob_dir, prefix)):
+            os.remove(os.path.join(cache.blob_dir, prefix, blob))
+    assert cache.restore("transformation", fingerprint(), {"features": str(tmp_path / "run2" / "f.npy")}) is None
+
+
+def test_retention_keeps_the_newest_entries(cache, tmp_path):
+    keys = [fingerprint(input_hash=f"data-v{i}") for i in range(4)]
+    for i, key in enumerate(keys):
+        run_stage(cache, tmp_path, f"run{i}", key, content=f"features-{i}".encode())
+        # distinct, increasing mtimes whatever the file system's resolution
+        os.utime(cache._manifest_path("transformation", key), (i, i))
+
+    manifests = sorted(os.listdir(os.path.join(cache.manifest_dir, "transformation")))
+    assert manifests == sorted(f"{key}.json" for key in keys[-2:])
+    # the blobs of dropped entries are deleted, 2 files per kept entry remain
+    assert sum(len(files) for _, _, files in os.walk(cache.blob_dir)) == 4
+    targets = {"features": str(tmp_path / "restored" / "features.npy")}
+    assert cache.restore("transformation", keys[0], targets) is None
+    assert cache.restore("transformation", keys[3], targets) is not None
+    assert read(targets["features"]) == b"features-3"
+
+
+def test_restored_entry_counts_as_newest(cache, tmp_path):
+    keys = [fingerprint(input_hash=f"data-v{i}") for i in range(2)]
+    for i, key in enumerate(keys):
+        run_stage(cache, tmp_path, f"run{i}", key, content=f"features-{i}".encode())
+        os.utime(cache._manifest_path("transformation", key), (i, i))
+    # reusing the older entry keeps it over the newer one that was not reused
+    assert cache.restore("transformation", keys[0], {"features": str(tmp_path / "restored" / "features.npy")})
+    cache.max_entries_per_stage = 1
+    cache.apply_retention()
+    assert os.listdir(os.path.join(cache.manifest_dir, "transformation")) == [f"{keys[0]}.json"]
@@ -0,0 +1,47 @@
+import time
+
+import numpy as np
+import pytest
+
+from src.utils import stage_profiler
+from src.utils.stage_profiler import StageProfiler, current_rss_mb
+
+pytestmark = pytest.mark.skipif(current_rss_mb() is None, reason="no /proc to read the resident memory from")
+
+MB = 2**20
+
+
+def test_peak_covers_a_stage_that_keeps_its_memory():
+    profiler = StageProfiler(rss_sample_seconds=0.01, trace_allocations=False)
+    with profiler.stage("allocate"):
+        kept = np.ones(50 * MB // 8)
+    record = profiler.stages[0]
+    assert record["status"] == "done"
+    assert record["peak_rss_mb"] >= record["rss_start_mb"]
+    assert record["peak_rss_mb"] >= record["rss_end_mb"]
+    assert record["rss_end_mb"] - record["rss_start_mb"] >= 40
+    del kept
+
+
+def test_peak_covers_memory_freed_before_the_stage_ends():
+    profiler = StageProfiler(rss_sample_seconds=0.01, trace_allocations=True)
+    with profiler.stage("allocate_and_free"):
+        freed = np.ones(50 * MB // 8)
+        time.sleep(0.1)
+        del freed
+    record = profiler.stages[0]
+    assert record["peak_rss_mb"] >= max(record["rss_start_mb"], record["rss_end_mb"])
+    assert record["peak_rss_mb"] - record["rss_start_mb"] >= 40
+    assert record["traced_peak_mb"] >= 49
+
+
+def test_peak_is_never_below_the_end_reading(monkeypatch):
+    # a sampler that missed the allocation, e.g. one made right before the stage ends
+    monkeypatch.setattr(stage_profiler._RssSampler, "stop", lambda self: 1.0)
+    profiler = StageProfiler(rss_sample_seconds=10, trace_allocations=False)
+    with profiler.stage("allocate"):
+        kept = np.ones(50 * MB // 8)
+    record = profiler.stages[0]
+    assert record["peak_rss_mb"] == record["rss_end_mb"]
+    assert record["peak_rss_mb"] >= record["rss_start_mb"]
+    del kept